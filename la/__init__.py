@@ -3,11 +3,17 @@
 # Classes
 from la.deflarry import larry
 
+from la.npyio import NpyIO
+from la.sparse import SparseLarry
+from la.lazy import lazy
+from la.threads import set_num_threads, get_num_threads
+from la import shared
+
 try:
     from la.io import IO
     from la.io import *
 except:
-    # Cannot import h5py; no archiving available.
+    # Cannot import h5py; no HDF5 archiving available (NpyIO still works).
     pass        
 
 from numpy import nan, inf
@@ -26,6 +32,7 @@ except (ImportError, ValueError):
     
 try:
     # Namespace cleaning
-    del deflarry, flabel, func, io, missing, testing, util, version
+    del deflarry, flabel, func, io, missing, npyio, sparse, testing, threads, \
+        util, version
 except:
     pass     
@@ -1,23 +1,42 @@
 "Labeled array class"
 
 import csv
+import json
+import struct
+import cPickle
+import datetime
+import weakref
+from itertools import islice, imap
 
 import numpy as np
 import bottleneck as bn
 
-from la.missing import ismissing, missing_marker, nans  
-from la.flabel import listmap, listmap_fill, flattenlabel
+from la.missing import ismissing, missing_marker, nans, float_dtype
+from la.flabel import (listmap, listmap_fill, flattenlabel, encodelabel,
+                       label2array, array2label)
 from la.util.misc import isscalar, fromlists
-from la.farray import (group_ranking, group_mean, group_median, shuffle,
+from la.farray import (group_ranking, group_median, shuffle,
                        push, quantile, ranking, lastrank, movingsum_forward,
                        movingsum, geometric_mean, demean, demedian, zscore)
 from la.farray import (move_nanmedian, move_nanranking, move_func)
+from la.farray.normalize import _ranking
+from la.farray.group import _group_mean
+from la.threads import elementwise, alongaxis
+from la.parallel import apply_along_axis
 
 
 class larry(object):
     "Labeled array"
 
-    def __init__(self, x, label=None, dtype=None, validate=True):
+    # Validity mask of x (see __init__); None means that no element of x is
+    # marked missing by a mask
+    valid = None
+
+    # Cache of has_missing: (weakref to x, weakref to valid or None, flag).
+    # The flag applies only while x and valid are the same objects
+    _missing = None
+
+    def __init__(self, x, label=None, dtype=None, validate=True, valid=None):
         """
         Meet larry, he's a labeled array.
         
@@ -39,6 +58,12 @@ class larry(object):
             of the data match the dimension of the label, that the labels are
             unique along each axis, and so on. This check adds time to the
             creation of a larry. The default is the check the integrity.
+        valid : {bool array_like, None}, optional
+            Validity mask of x, with the shape of x: True where an element of
+            x is present and False where it is missing. The mask lets int and
+            bool larrys, which have no missing value marker such as NaN,
+            carry missing values without being cast to float. By default
+            (None) there is no mask.
                         
         Raises
         ------
@@ -47,7 +72,7 @@ class larry(object):
             elements in label does not match the dimensions of x, or if the
             elements in label are not unique along each dimension, or if the
             elements of label are not lists, or if the number of dimensions
-            is zero.
+            is zero, or if `valid` does not have the shape of x.
             
         Notes
         -----
@@ -91,6 +116,18 @@ class larry(object):
         x
         array([False,  True,  True], dtype=bool)            
 
+        An int larry with a missing value:
+        
+        >>> larry([1, 0, 3], valid=[True, False, True])
+        label_0
+            0
+            1
+            2
+        x
+        array([1, 0, 3])
+        valid
+        array([ True, False,  True], dtype=bool)
+
         """
         if type(x) is not np.ndarray:
             # The if statement above is faster than asarray. When you add two
@@ -132,19 +169,31 @@ class larry(object):
                     raise ValueError, msg % (i, value, key)
                 if type(l) is not list:
                     raise ValueError, 'label must be a list of lists'          
+        if valid is not None:
+            valid = np.asarray(valid, dtype=bool)
+            if valid.shape != x.shape:
+                raise ValueError, 'valid must have the same shape as x'
+            self.valid = valid
         self.x = x
         self.label = label
 
     # Unary functions --------------------------------------------------------  
 
-    def log(self):
+    def log(self, out=None):
         """
         Element by element base e logarithm.
         
+        Parameters
+        ----------
+        out : larry, optional
+            A larry with the same label as this larry in which to place the
+            result; it may be this larry itself (in-place). By default
+            (None) a new larry is returned.
+            
         Returns
         -------
         out : larry
-            Returns a copy with log of x values.
+            Returns a copy (or `out`) with log of x values.
         
         Examples
         --------
@@ -159,18 +208,30 @@ class larry(object):
         >>>
         
         """
-        x = np.log(self.x)
+        if out is not None:
+            self.__checkout(out)
+            elementwise(np.log, [self.x], out.x)
+            _setvalid(out, self.valid)
+            return out
+        x = elementwise(np.log, [self.x])
         label = self.copylabel()
-        return larry(x, label, validate=False) 
+        return _withvalid(x, label, _validcopy(self)) 
 
-    def exp(self):
+    def exp(self, out=None):
         """
         Element by element exponential.
         
+        Parameters
+        ----------
+        out : larry, optional
+            A larry with the same label as this larry in which to place the
+            result; it may be this larry itself (in-place). By default
+            (None) a new larry is returned.
+            
         Returns
         -------
         out : larry
-            Returns a copy with exp of x values.
+            Returns a copy (or `out`) with exp of x values.
 
         Examples
         --------            
@@ -184,18 +245,30 @@ class larry(object):
         array([  2.71828183,   7.3890561 ,  20.08553692])            
                 
         """
-        x = np.exp(self.x)
+        if out is not None:
+            self.__checkout(out)
+            elementwise(np.exp, [self.x], out.x)
+            _setvalid(out, self.valid)
+            return out
+        x = elementwise(np.exp, [self.x])
         label = self.copylabel()
-        return larry(x, label, validate=False)
+        return _withvalid(x, label, _validcopy(self))
         
-    def sqrt(self):
+    def sqrt(self, out=None):
         """
         Element by element square root.
         
+        Parameters
+        ----------
+        out : larry, optional
+            A larry with the same label as this larry in which to place the
+            result; it may be this larry itself (in-place). By default
+            (None) a new larry is returned.
+            
         Returns
         -------
         out : larry
-            Returns a copy with square root of x values.
+            Returns a copy (or `out`) with square root of x values.
 
         Examples
         --------            
@@ -209,9 +282,14 @@ class larry(object):
         array([ 1.,  2.,  3.])
                 
         """
-        x = np.sqrt(self.x)
+        if out is not None:
+            self.__checkout(out)
+            elementwise(np.sqrt, [self.x], out.x)
+            _setvalid(out, self.valid)
+            return out
+        x = elementwise(np.sqrt, [self.x])
         label = self.copylabel()
-        return larry(x, label, validate=False)
+        return _withvalid(x, label, _validcopy(self))
 
     def sign(self):
         """
@@ -239,7 +317,7 @@ class larry(object):
         """
         x = np.sign(self.x)
         label = self.copylabel()
-        return larry(x, label, validate=False)
+        return _keepnomissing(_withvalid(x, label, _validcopy(self)), self)
         
     def power(self, q):               
         """
@@ -269,7 +347,7 @@ class larry(object):
         """
         x = np.power(self.x, q)
         label = self.copylabel()
-        return larry(x, label, validate=False)
+        return _withvalid(x, label, _validcopy(self))
         
     def __pow__(self, q):
         """
@@ -346,10 +424,10 @@ class larry(object):
         if axis == None:
             raise ValueError, 'axis cannot be None'
         y = self.copy()
-        idx = np.isnan(y.x)
+        idx = ismissing(y)
         np.putmask(y.x, idx, 0)
         y.x.cumsum(axis, out=y.x)
-        if idx.any():
+        if idx.any() and y.valid is None:
             np.putmask(y.x, idx, np.nan)
         return y        
 
@@ -412,14 +490,14 @@ class larry(object):
         if axis == None:
             raise ValueError, 'axis cannot be None'
         y = self.copy()
-        idx = np.isnan(y.x)
+        idx = ismissing(y)
         np.putmask(y.x, idx, 1)
         y.x.cumprod(axis, out=y.x)
-        if idx.any():
+        if idx.any() and y.valid is None:
             np.putmask(y.x, idx, np.nan)
         return y
 
-    def clip(self, lo, hi):
+    def clip(self, lo, hi, out=None):
         """
         Clip x values.
 
@@ -429,11 +507,15 @@ class larry(object):
             All data values less than `lo` are set to `lo`.
         hi : scalar    
             All data values greater than `hi` are set to `hi`.
+        out : larry, optional
+            A larry with the same label as this larry in which to place the
+            result; it may be this larry itself (in-place). By default
+            (None) a new larry is returned.
                         
         Returns
         -------
         out : larry
-            Returns a copy with x values clipped.       
+            Returns a copy (or `out`) with x values clipped.       
             
         Raises
         ------
@@ -455,6 +537,11 @@ class larry(object):
         """
         if lo > hi:
             raise ValueError, 'lo should be less than or equal to hi'
+        if out is not None:
+            self.__checkout(out)
+            self.x.clip(lo, hi, out.x)
+            _setvalid(out, self.valid)
+            return out
         y = self.copy()
         y.x.clip(lo, hi, y.x)
         return y
@@ -463,20 +550,28 @@ class larry(object):
         "Return a copy with each element switched with its negative."
         label = self.copylabel()
         x = self.x.__neg__()
-        return larry(x, label, validate=False)
+        return _keepnomissing(_withvalid(x, label, _validcopy(self)), self)
     
     def __pos__(self):
         "Return a copy."
         return self.copy()
         
-    def abs(self):
+    def abs(self, out=None):
         """
         Absolute value of x.
         
+        Parameters
+        ----------
+        out : larry, optional
+            A larry with the same label as this larry in which to place the
+            result; it may be this larry itself (in-place). By default
+            (None) a new larry is returned.
+            
         Returns
         -------
         out : larry
-            Returns a copy with the absolute values of the x data.
+            Returns a copy (or `out`) with the absolute values of the x
+            data.
 
         Examples
         --------
@@ -491,9 +586,14 @@ class larry(object):
         array([1, 2, 3, 4])
        
         """
-        y = self.copy()
-        np.absolute(y.x, y.x)
-        return y
+        if out is not None:
+            self.__checkout(out)
+            elementwise(np.absolute, [self.x], out.x)
+            _setvalid(out, self.valid)
+            return out
+        x = elementwise(np.absolute, [self.x])
+        y = _withvalid(x, self.copylabel(), _validcopy(self))
+        return _keepnomissing(y, self)
         
     def __abs__(self):
         """
@@ -532,6 +632,9 @@ class larry(object):
         """
         label = self.copylabel()
         x = np.isnan(self.x)
+        if self.valid is not None:
+            # Missing values of a masked larry count as NaN
+            x |= ~self.valid
         return larry(x, label, validate=False)                             
 
     def isfinite(self):
@@ -559,6 +662,8 @@ class larry(object):
         """    
         label = self.copylabel()
         x = np.isfinite(self.x)
+        if self.valid is not None:
+            x &= self.valid
         return larry(x, label, validate=False)
         
     def isinf(self):
@@ -632,7 +737,7 @@ class larry(object):
         """
         if self.dtype != bool:
             raise TypeError, 'Only larrys with bool dtype can be inverted.'
-        return larry(~self.x, self.copylabel(), validate=False)
+        return _withvalid(~self.x, self.copylabel(), _validcopy(self))
         
     # Binary Functions ------------------------------------------------------- 
     
@@ -670,17 +775,19 @@ class larry(object):
         array([3])        
         
         """
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.add, other)
         if isinstance(other, larry):
             if self.label == other.label:
-                x = self.x + other.x
+                x = elementwise(np.add, [self.x, other.x])
                 label = self.copylabel()
                 return larry(x, label, validate=False)                        
             else:       
                 x, y, label = self.__align(other)
-                x = x + y
+                x = elementwise(np.add, [x, y])
                 return larry(x, label, validate=False)
         if np.isscalar(other) or isinstance(other, np.ndarray):
-            x = self.x + other
+            x = elementwise(np.add, [self.x, other])
             label = self.copylabel()
             return larry(x, label, validate=False)                 
         raise TypeError, 'Input must be scalar, array, or larry.' 
@@ -715,17 +822,19 @@ class larry(object):
         x
         array([1])        
         """   
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.subtract, other)
         if isinstance(other, larry):
             if self.label == other.label:
-                x = self.x - other.x
+                x = elementwise(np.subtract, [self.x, other.x])
                 label = self.copylabel()
                 return larry(x, label, validate=False)                          
             else:          
                 x, y, label = self.__align(other)        
-                x = x - y
+                x = elementwise(np.subtract, [x, y])
                 return larry(x, label, validate=False)
         if np.isscalar(other) or isinstance(other, np.ndarray):
-            x = self.x - other
+            x = elementwise(np.subtract, [self.x, other])
             label = self.copylabel()
             return larry(x, label, validate=False)       
         raise TypeError, 'Input must be scalar, array, or larry.'
@@ -764,17 +873,19 @@ class larry(object):
         array([2])        
                
         """    
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.divide, other)
         if isinstance(other, larry):
             if self.label == other.label:
-                x = self.x / other.x
+                x = elementwise(np.divide, [self.x, other.x])
                 label = self.copylabel()
                 return larry(x, label, validate=False)                          
             else:          
                 x, y, label = self.__align(other)        
-                x = x / y
+                x = elementwise(np.divide, [x, y])
                 return larry(x, label, validate=False)
         if np.isscalar(other) or isinstance(other, np.ndarray):
-            x = self.x / other
+            x = elementwise(np.divide, [self.x, other])
             label = self.copylabel()
             return larry(x, label, validate=False)        
         raise TypeError, 'Input must be scalar, array, or larry.'
@@ -788,7 +899,7 @@ class larry(object):
         if np.isscalar(other) or isinstance(other, np.ndarray):
             label = self.copylabel()
             x = other / self.x
-            return larry(x, label, validate=False)
+            return _withvalid(x, label, _validcopy(self))
         raise TypeError, 'Input must be scalar, array, or larry.'
         
     def __mul__(self, other): 
@@ -820,17 +931,19 @@ class larry(object):
         array([2])        
                 
         """      
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.multiply, other)
         if isinstance(other, larry):
             if self.label == other.label:
-                x = self.x * other.x
+                x = elementwise(np.multiply, [self.x, other.x])
                 label = self.copylabel()
                 return larry(x, label, validate=False)                          
             else:           
                 x, y, label = self.__align(other)
-                x = x * y
+                x = elementwise(np.multiply, [x, y])
                 return larry(x, label, validate=False)
         if np.isscalar(other) or isinstance(other, np.ndarray):
-            x = self.x * other
+            x = elementwise(np.multiply, [self.x, other])
             label = self.copylabel()
             return larry(x, label, validate=False)   
         raise TypeError, 'Input must be scalar, array, or larry.'
@@ -864,6 +977,8 @@ class larry(object):
         array([ True], dtype=bool)                 
         
         """    
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.logical_and, other)
         if isinstance(other, larry):
             if self.label == other.label:
                 x = np.logical_and(self.x, other.x)
@@ -908,6 +1023,8 @@ class larry(object):
         array([ True], dtype=bool)
                         
         """     
+        if self.valid is not None or getattr(other, 'valid', None) is not None:
+            return self.__validop(np.logical_or, other)
         if isinstance(other, larry):
             if self.label == other.label:
                 x = np.logical_or(self.x, other.x)
@@ -925,6 +1042,93 @@ class larry(object):
 
     __ror__ = __or__
 
+    # In-place binary functions ----------------------------------------------
+
+    def __iadd__(self, other):
+        """
+        Add a larry, Numpy array, or scalar to this larry in-place.
+        
+        The result is written into the data, x, of this larry; no new larry
+        is created. If the labels of the two larrys differ then `other` is
+        aligned to this larry with a left join; elements that are not in
+        `other` become missing (NaN) in this larry. A TypeError is raised if
+        the result cannot be stored without changing the dtype of x (for
+        example, adding a float to an int larry).
+        
+        Examples
+        --------
+        >>> y1 = larry([1.0, 2.0], [['a', 'b']])
+        >>> y2 = larry([1.0, 2.0], [['b', 'c']])
+        >>> y1 += y2
+        >>> y1
+        label_0
+            a
+            b
+        x
+        array([ NaN,   3.])
+        
+        """
+        return self.__inplace(np.add, other)
+
+    def __isub__(self, other):
+        "Subtract a larry, Numpy array, or scalar in-place; see __iadd__."
+        return self.__inplace(np.subtract, other)
+
+    def __imul__(self, other):
+        "Multiply by a larry, Numpy array, or scalar in-place; see __iadd__."
+        return self.__inplace(np.multiply, other)
+
+    def __idiv__(self, other):
+        "Divide by a larry, Numpy array, or scalar in-place; see __iadd__."
+        return self.__inplace(np.divide, other)
+
+    def __itruediv__(self, other):
+        "Divide by a larry, Numpy array, or scalar in-place; see __iadd__."
+        return self.__inplace(np.true_divide, other)
+
+    def __inplace(self, func, other):
+        "In-place binary operation; `other` is aligned with a left join."
+        if isinstance(other, larry):
+            if self.ndim != other.ndim:
+                msg = 'Binary operation on two larrys with different dimension'
+                raise IndexError, msg
+            for ax in range(self.ndim):
+                if self.label[ax] != other.label[ax]:
+                    other = other.morph(self.label[ax], ax)
+            valid = other.valid
+            other = other.x
+        elif np.isscalar(other) or isinstance(other, np.ndarray):
+            valid = None
+        else:
+            raise TypeError, 'Input must be scalar, array, or larry.'
+        elementwise(func, [self.x, other], self.x)
+        self._missing = None
+        if valid is not None:
+            _setvalid(self, _andvalid(self.valid, valid))
+        return self
+
+    def __checkout(self, out):
+        "Raise if `out` cannot hold the result of a unary method."
+        if not isinstance(out, larry):
+            raise TypeError, 'out must be a larry.'
+        if out is not self:
+            if out.shape != self.shape or out.label != self.label:
+                raise ValueError, 'out must have the same label as the larry.'
+
+    def __validop(self, func, other):
+        "Binary operation with an operand that has a validity mask."
+        if isinstance(other, larry):
+            x, y, label = self.__align(other)
+            valid = _andvalid(_alignvalid(self, label),
+                              _alignvalid(other, label))
+        elif np.isscalar(other) or isinstance(other, np.ndarray):
+            x, y, label = self.x, other, self.copylabel()
+            valid = _validcopy(self)
+        else:
+            raise TypeError, 'Input must be scalar, array, or larry.'
+        x = elementwise(func, [x, y])
+        return _withvalid(x, label, valid)
+
     def __align(self, other):
         "Align larrys for binary operations."
         if self.label == other.label:
@@ -1045,6 +1249,14 @@ class larry(object):
         array([ NaN,   8.])
                     
         """
+        if self.valid is not None:
+            return self.__reduce(np.prod, axis=axis)
+        if _nomissing(self):
+            y = self.__reduce(np.prod, axis=axis)
+            if not np.isnan(y.x if isinstance(y, larry) else y).any():
+                return y
+            # NaNs were written to x after has_missing was cached
+            _setmissing(self, None)
         y = self.copy()
         idx = np.isnan(y.x)
         np.putmask(y.x, idx, 1)
@@ -1365,8 +1577,10 @@ class larry(object):
                 label = self.copylabel()
                 label.pop(axis)
                 return larry(x, label, validate=False)
+        if self.valid is not None:
+            return self.__reducevalid(op, **kwargs)
         if np.isscalar(axis):
-            x = op(self.x, **kwargs)
+            x = _reducex(op, self, kwargs)
             if np.isscalar(x):
                 return x
             else:    
@@ -1374,9 +1588,36 @@ class larry(object):
                 label.pop(axis)
                 return larry(x, label, validate=False)      
         elif axis is None:
-            return op(self.x, **kwargs)
+            return _reducex(op, self, kwargs)
         else:
             raise ValueError, 'axis should be an integer or None'
+
+    def __reducevalid(self, op, **kwargs):
+        "Reduce a larry that has a validity mask; see __reduce."
+        axis = kwargs.pop('axis')
+        if axis is not None and not np.isscalar(axis):
+            raise ValueError, 'axis should be an integer or None'
+        if op not in _MAREDUCE:
+            # Reduce a float copy with NaN for the missing values
+            y = larry(_nanfilled(self.x, self.valid), self.label,
+                      validate=False)
+            return y.__reduce(op, axis=axis, **kwargs)
+        name, fill = _MAREDUCE[op]
+        mx = np.ma.MaskedArray(self.x, mask=~self.valid)
+        if name == 'median':
+            mx = np.ma.median(mx, axis=axis)
+        else:
+            mx = getattr(mx, name)(axis=axis, **kwargs)
+        if axis is None:
+            if mx is np.ma.masked:
+                return fill
+            return mx
+        label = self.copylabel()
+        label.pop(axis)
+        if fill is not np.nan:
+            return larry(mx.filled(fill), label, validate=False)
+        valid = ~np.ma.getmaskarray(mx)
+        return _withvalid(mx.filled(0), label, valid)
         
     def any(self, axis=None):
         """
@@ -1587,7 +1828,7 @@ class larry(object):
             else:
                 raise ValueError, 'Unknown comparison operator'
             if isinstance(x, np.ndarray):
-                y = larry(x, self.copylabel(), validate=False)
+                y = _withvalid(x, self.copylabel(), _validcopy(self))
             else:
                 y = x
             return y
@@ -1607,7 +1848,9 @@ class larry(object):
                 x = x >= y                              
             else:
                 raise ValueError, 'Unknown comparison operator'              
-            return larry(x, label, validate=False)
+            valid = _andvalid(_alignvalid(self, label),
+                              _alignvalid(other, label))
+            return _withvalid(x, label, valid)
         else:
             raise TypeError, 'Input must be scalar, numpy array, or larry.'
 
@@ -1645,6 +1888,8 @@ class larry(object):
                 raise IndexError, 'index out of range'
             x = self.x[index]
             if self.ndim <= 1:
+                if self.valid is not None and not self.valid[index]:
+                    return np.nan
                 return x
             label = self.label[1:]
         elif typidx is tuple:
@@ -1693,6 +1938,8 @@ class larry(object):
                     label.append(lab)
             x = self.x[index]
             if allscalar:
+                if self.valid is not None and not self.valid[index]:
+                    return np.nan
                 return x
         elif typidx is slice:
             label = list(self.label)
@@ -1725,7 +1972,13 @@ class larry(object):
             msg = 'Only slice, integer, and seq (list, tuple, 1d array)'
             msg = msg + ' indexing supported'
             raise IndexError, msg        
-        return larry(x, label)
+        valid = None
+        if self.valid is not None:
+            if typidx is list:
+                valid = self.valid.take(index, axis=0)
+            else:
+                valid = self.valid[index]
+        return _keepnomissing(larry(x, label, valid=valid), self)
 
     def take(self, indices, axis):
         """
@@ -1794,7 +2047,10 @@ class larry(object):
         labelaxis = label[axis]
         label[axis] = [labelaxis[idx] for idx in indices]
         x = self.x.take(indices, axis)
-        return larry(x, label)
+        valid = None
+        if self.valid is not None:
+            valid = self.valid.take(indices, axis)
+        return _keepnomissing(larry(x, label, valid=valid), self)
 
     @property    
     def lix(self):
@@ -1945,6 +2201,7 @@ class larry(object):
         if isinstance(index, larry):
             if self.label == index.label:
                 self.x[index.x] = value
+                _validset(self, index.x, None)
             else:
                 # Could use morph to do this, if every row and column of self
                 # is in index, but I think it is better to raise an IndexError
@@ -1956,11 +2213,19 @@ class larry(object):
                 # function that indexes into labels without indexing into x.
                 # Then use that function in getitem
                 if self[index].label == value.label:
-                    self.x[index] = value.x
+                    x = value.x
+                    valid = value.valid
+                    if valid is not None:
+                        if missing_marker(self.x) is not NotImplemented:
+                            x = _nanfilled(x, valid)
+                            valid = None
+                    self.x[index] = x
+                    _validset(self, index, valid)
                 else:    
                     raise IndexError, 'larrys are not aligned.'    
             else:
                 self.x[index] = value
+                _validset(self, index, None)
             
     def set(self, label, value):
         """
@@ -2008,6 +2273,9 @@ class larry(object):
         for i in xrange(self.ndim):
             index.append(self.labelindex(label[i], axis=i))    
         self.x[tuple(index)] = value        
+        self._missing = None
+        if self.valid is not None:
+            self.valid[tuple(index)] = True
 
     def get(self, label):
         """
@@ -2044,7 +2312,10 @@ class larry(object):
         index = []
         for i in xrange(self.ndim):
             index.append(self.labelindex(label[i], axis=i))    
-        return self.x[tuple(index)]
+        index = tuple(index)
+        if self.valid is not None and not self.valid[index]:
+            return np.nan
+        return self.x[index]
                 
     def getx(self, copy=True):
         """
@@ -2230,6 +2501,8 @@ class larry(object):
                 
         """
         self.x.fill(fill_value)
+        self.valid = None
+        self._missing = None
         
     def keep_label(self, op, value, axis):
         """
@@ -2295,6 +2568,8 @@ class larry(object):
             index = [slice(None, None, None)] * self.ndim
             index[axis] = list(idx)
             y.x = y.x[index]
+            if y.valid is not None:
+                y.valid = y.valid[index]
             return y
         
     def keep_x(self, op, value, vacuum=True):
@@ -2343,7 +2618,10 @@ class larry(object):
             raise ValueError, 'Unknown op'   
         y = self.copy()
         idx = eval('y.x ' + op + ' value')
-        y.x[~idx] = np.nan
+        if y.valid is not None:
+            y.valid[~idx] = False
+        else:
+            y.x[~idx] = np.nan
         if vacuum:
             y = y.vacuum()
         return y         
@@ -2550,7 +2828,7 @@ class larry(object):
         array([ NaN,   3.,   2.,   4.])
 
         """
-        x = bn.move_nansum(self.x, window, axis=axis)
+        x = alongaxis(bn.move_nansum, _nandata(self), axis, window)
         return larry(x, self.copylabel(), validate=False)
 
     def move_mean(self, window, axis=-1):
@@ -2585,7 +2863,7 @@ class larry(object):
         array([ NaN,  1.5,  2. ,  4. ])
             
         """
-        x = bn.move_nanmean(self.x, window, axis=axis)
+        x = alongaxis(bn.move_nanmean, _nandata(self), axis, window)
         return larry(x, self.copylabel(), validate=False)
 
     def move_std(self, window, axis=-1):
@@ -2622,7 +2900,7 @@ class larry(object):
         array([ NaN,  NaN,  0.5,  1. ,  0.5])
         
         """
-        x = bn.move_nanstd(self.x, window, axis=axis)
+        x = alongaxis(bn.move_nanstd, _nandata(self), axis, window)
         return larry(x, self.copylabel(), validate=False)
 
     def move_min(self, window, axis=-1):
@@ -2657,7 +2935,9 @@ class larry(object):
         array([ NaN,   1.,   2.,   4.])
 
         """
-        x = bn.move_nanmin(self.x, window, axis=axis)
+        x = alongaxis(bn.move_nanmin, _nandata(self), axis, window)
+        # Bottleneck computes float32 input in float64
+        x = x.astype(float_dtype(self.dtype), copy=False)
         return larry(x, self.copylabel(), validate=False)
 
     def move_max(self, window, axis=-1):
@@ -2692,7 +2972,9 @@ class larry(object):
         array([ NaN,   2.,   2.,   4.])
 
         """
-        x = bn.move_nanmax(self.x, window, axis=axis)
+        x = alongaxis(bn.move_nanmax, _nandata(self), axis, window)
+        # Bottleneck computes float32 input in float64
+        x = x.astype(float_dtype(self.dtype), copy=False)
         return larry(x, self.copylabel(), validate=False)
 
     def move_ranking(self, window, axis=-1, method='strides'):
@@ -2773,7 +3055,8 @@ class larry(object):
         array([ NaN,  NaN,   1.,   1.,   1.])
 
         """
-        x = move_nanranking(self.x, window, axis=axis, method=method)
+        x = alongaxis(move_nanranking, _nandata(self), axis, window,
+                      method=method)
         return larry(x, self.copylabel(), validate=False)
 
     def move_median(self, window, axis=-1, method='loop'):
@@ -2815,7 +3098,8 @@ class larry(object):
         array([ NaN,  1.5,  2. ,  4. ,  4.5])
         
         """
-        x = move_nanmedian(self.x, window, axis=axis, method=method)
+        x = alongaxis(move_nanmedian, _nandata(self), axis, window,
+                      method=method)
         return larry(x, self.copylabel(), validate=False)
 
     def move_func(self, func, window, axis=-1, method='loop', **kwargs):
@@ -2870,20 +3154,19 @@ class larry(object):
         array([ NaN,   3.,   5.,   7.])
 
         """
-        x = move_func(func, self.x, window, axis=axis, method=method)
+        x = move_func(func, _nandata(self), window, axis=axis, method=method)
         return larry(x, self.copylabel(), validate=False)
 
     @np.deprecate(new_name='move_sum')
     def movingsum(self, window, axis=-1, norm=False):
-        y = self.copy()
-        y.x = movingsum(y.x, window, axis=axis, norm=norm)
-        return y
+        x = movingsum(_nandata(self), window, axis=axis, norm=norm)
+        return larry(x, self.copylabel(), validate=False)
         
     def movingsum_forward(self, window, skip=0, axis=-1, norm=False):    
         """Movingsum in the forward direction skipping skip dates"""      
-        y = self.copy()
-        y.x = movingsum_forward(y.x, window, skip=skip, axis=axis, norm=norm)
-        return y
+        x = movingsum_forward(_nandata(self), window, skip=skip, axis=axis,
+                              norm=norm)
+        return larry(x, self.copylabel(), validate=False)
     
     @np.deprecate(new_name='move_ranking')                        
     def movingrank(self, window, axis=-1):
@@ -2925,7 +3208,8 @@ class larry(object):
         array([-1.5, -0.5,  0.5,  1.5])
             
         """
-        return larry(demean(self.x, axis), self.copylabel(), validate=False)
+        x = alongaxis(demean, _nandata(self), axis)
+        return larry(x, self.copylabel(), validate=False)
 
     def demedian(self, axis=None):
         """
@@ -2955,7 +3239,8 @@ class larry(object):
         array([-1.5, -0.5,  0.5,  1.5])
             
         """
-        return larry(demedian(self.x, axis), self.copylabel(), validate=False)
+        x = demedian(_nandata(self), axis)
+        return larry(x, self.copylabel(), validate=False)
         
     def zscore(self, axis=None):
         """
@@ -2984,7 +3269,8 @@ class larry(object):
         array([-1.22474487,  0.        ,  1.22474487])
             
         """
-        return larry(zscore(self.x, axis), self.copylabel(), validate=False)
+        x = alongaxis(zscore, _nandata(self), axis)
+        return larry(x, self.copylabel(), validate=False)
       
     def ranking(self, axis=0, norm='-1,1'):
         """
@@ -3023,8 +3309,14 @@ class larry(object):
         all columns.
 
         """
-        return larry(ranking(self.x, axis, norm=norm), self.copylabel(),
-                     validate=False)
+        if self.valid is None and not bn.anynan(self.x):
+            # Without NaNs there is no need to find and count them
+            x = alongaxis(_ranking, self.x, axis, norm=norm, nonan=True)
+            y = larry(x, self.copylabel(), validate=False)
+            _setmissing(y, False)
+            return y
+        x = alongaxis(ranking, _nandata(self), axis, norm=norm)
+        return larry(x, self.copylabel(), validate=False)
 
     def quantile(self, q, axis=0):
         """
@@ -3063,7 +3355,78 @@ class larry(object):
             
         """
         label = self.copylabel()
-        x = quantile(self.x, q, axis=axis)       
+        x = quantile(_nandata(self), q, axis=axis)
+        return larry(x, label, validate=False)
+
+    def apply_parallel(self, func, axis=-1, processes=None, **kwargs):
+        """
+        Apply a function to 1d slices along an axis on a pool of processes.
+        
+        Use this for slow, Python-level functions such as a model fit to each
+        ticker. The data are copied once into shared memory that the worker
+        processes inherit; the workers receive only the ranges of slices to
+        work on, so neither the data nor the results are pickled.
+        
+        Parameters
+        ----------
+        func : function
+            A function that takes a 1d array (and `kwargs`) and returns
+            either a 1d array of the same length or a scalar.
+        axis : int, optional
+            The axis along which the 1d slices are taken. The default is the
+            last axis (-1).
+        processes : {int, None}, optional
+            The number of worker processes. By default (None) the number of
+            CPUs is used. 
+        **kwargs : keyword arguments, optional
+            Keyword arguments to pass to `func`.
+            
+        Returns
+        -------
+        y : larry
+            If `func` returns arrays then `y` has the label of the larry.
+            If `func` returns scalars then `axis` is removed from `y` (a
+            scalar is returned for a 1d larry).
+
+        Notes
+        -----
+        On platforms that start worker processes with fork (e.g. Linux) any
+        function can be used; otherwise `func` must be picklable.
+
+        The dtype of `y` is fixed by the result of `func` on the first slice;
+        the results of the other slices are cast to it. `func` cannot return
+        strings or objects.
+        
+        Examples
+        --------
+        >>> lar = larry([[1.0, 2.0, 3.0], [4.0, 6.0, 8.0]], [['a', 'b'],
+        ...                                                 [1, 2, 3]])
+        >>> lar.apply_parallel(np.max, processes=2)
+        label_0
+            a
+            b
+        x
+        array([ 3.,  8.])
+        >>> lar.apply_parallel(np.cumsum, processes=2)
+        label_0
+            a
+            b
+        label_1
+            1
+            2
+            3
+        x
+        array([[  1.,   3.,   6.],
+               [  4.,  10.,  18.]])
+        
+        """
+        x = apply_along_axis(func, self.x, axis, processes, **kwargs)
+        if x.ndim == self.ndim:
+            return larry(x, self.copylabel(), validate=False)
+        if x.ndim == 0:
+            return x[()]
+        label = self.copylabel()
+        label.pop(axis)
         return larry(x, label, validate=False)
         
     # Group calc -------------------------------------------------------------  
@@ -3074,7 +3437,7 @@ class larry(object):
         The row labels of the object must be a subset of the row labels of the
         group.
         """
-        y = self.copy()
+        y = _nancopy(self)
         aligned_group_list = y._group_align(group, axis=axis)
         y.x = group_ranking(y.x, aligned_group_list, axis=axis)
         return y
@@ -3085,9 +3448,10 @@ class larry(object):
         The row labels of the object must be a subset of the row labels of the
         group.
         """        
-        y = self.copy() 
+        y = _nancopy(self)
         aligned_group_list = y._group_align(group, axis=axis)
-        y.x = group_mean(y.x, aligned_group_list, axis=axis)
+        y.x = _group_mean(y.x, aligned_group_list, axis=axis,
+                          nonan=not bn.anynan(y.x))
         return y
         
     def group_median(self, group, axis=0):
@@ -3096,7 +3460,7 @@ class larry(object):
         The row labels of the object must be a subset of the row labels of the
         group.
         """ 
-        y = self.copy()
+        y = _nancopy(self)
         aligned_group_list = y._group_align(group, axis=axis)   
         y.x = group_median(y.x, aligned_group_list, axis=axis)
         return y
@@ -3126,7 +3490,9 @@ class larry(object):
         used for float dtype, None will be used for object dtype, and ''
         will be used for string (np.string_) dtype. All other dtype, such as
         int and bool, will be cast to float if there are any elements in
-        `label` does not exist in the larry.
+        `label` does not exist in the larry, unless the larry has a validity
+        mask (see `valid` in larry.__init__): then the dtype is kept and the
+        new elements are marked missing in the mask.
         
         Parameters
         ----------
@@ -3166,29 +3532,42 @@ class larry(object):
             return self.copy()
         else:    
             idx, idx_miss = listmap_fill(self.label[axis], label)           
+            miss = missing_marker(self.x)
+            valid = self.valid
+            usevalid = valid is not None and miss is NotImplemented
             if len(idx) == len(idx_miss):
                 # None of the elements we want are in the input larry
                 shape = list(self.x.shape)
                 shape[axis] = len(idx)
-                miss = missing_marker(self.x)
-                if miss == NotImplemented:
-                    x = self.x.astype(float)
+                if usevalid:
+                    x = np.zeros(shape, dtype=self.dtype)
+                    valid = np.zeros(shape, dtype=bool)
                 else:
-                    x = self.x
-                x = nans(shape, dtype=x.dtype)
+                    if miss == NotImplemented:
+                        x = self.x.astype(float)
+                    else:
+                        x = self.x
+                    x = nans(shape, dtype=x.dtype)
+                    valid = None
             else:    
                 x = self.x.take(idx, axis)
+                if valid is not None:
+                    valid = valid.take(idx, axis)
                 if len(idx_miss) > 0:
                     index = [slice(None)] * self.ndim
                     index[axis] = idx_miss
-                    miss = missing_marker(x)
-                    if miss == NotImplemented:
-                        x = x.astype(float)
+                    if usevalid:
+                        x[tuple(index)] = 0
+                        valid[tuple(index)] = False
+                    else:
                         miss = missing_marker(x)
-                    x[index] = miss      
+                        if miss == NotImplemented:
+                            x = x.astype(float)
+                            miss = missing_marker(x)
+                        x[index] = miss      
             lab = self.copylabel()
             lab[axis] = list(label)
-        return larry(x, lab)
+        return larry(x, lab, valid=valid)
         
     def morph_like(self, lar):
         """
@@ -3271,6 +3650,10 @@ class larry(object):
         -----
         If either larry has dtype of object or np.string_ then both larrys
         must have the same dtype, otherwise a TypeError is raised.   
+        
+        A larry with a validity mask (see `valid` in larry.__init__) keeps
+        its dtype when it is aligned to the merged labels; the new elements
+        are marked missing in its mask.
 
         Examples
         --------
@@ -3299,21 +3682,29 @@ class larry(object):
                 lar1 = lar1.morph(mergelabel, ax)
                 lar2 = lar2.morph(mergelabel, ax)
      
-        # Mask       
+        # Mask (None if every element is present)      
         dtype1 = self.dtype       
-        if dtype1 == object:
+        if lar1 is self and _cannotmiss(self):
+            mask1 = None
+        elif dtype1 == object:
             mask1 = lar1.x != [None]
         elif self.dtype.type == np.string_:
             mask1 = lar1.x != ''  
         else:
             mask1 = np.isfinite(lar1.x)
+        if mask1 is not None and lar1.valid is not None:
+            mask1 &= lar1.valid
         dtype2 = other.dtype       
-        if dtype2 == object:
+        if lar2 is other and _cannotmiss(other):
+            mask2 = None
+        elif dtype2 == object:
             mask2 = lar2.x != [None]
         elif self.dtype.type == np.string_:
             mask2 = lar2.x != ''  
         else:
             mask2 = np.isfinite(lar2.x)
+        if mask2 is not None and lar2.valid is not None:
+            mask2 &= lar2.valid
             
         # Trap cases that merge cannot handle
         if dtype1 in (np.string_, object) or dtype2 in (np.string_, object):
@@ -3321,11 +3712,26 @@ class larry(object):
                 raise TypeError, 'Incompatible dtypes'             
 
         # Check for overlap if requested             
-        if (not update) and np.logical_and(mask1, mask2).any():
-            raise ValueError('Overlapping values')
-        else:
-            if mask2.any():
-                lar1.x[mask2] = lar2.x[mask2]
+        if not update:
+            if mask1 is None and mask2 is None:
+                overlap = lar1.size > 0
+            elif mask1 is None:
+                overlap = mask2.any()
+            elif mask2 is None:
+                overlap = mask1.any()
+            else:
+                overlap = np.logical_and(mask1, mask2).any()
+            if overlap:
+                raise ValueError('Overlapping values')
+        if mask2 is None:
+            lar1.x[...] = lar2.x
+            if lar1.valid is not None:
+                lar1.valid[...] = True
+        elif mask2.any():
+            lar1.x[mask2] = lar2.x[mask2]
+            if lar1.valid is not None:
+                lar1.valid[mask2] = True
+        lar1._missing = None
      
         return lar1
         
@@ -3365,7 +3771,10 @@ class larry(object):
         for i in idx:
             label.append(self.label[i])    
         x = self.x.squeeze()
-        return larry(x, label, validate=False)
+        valid = None
+        if self.valid is not None:
+            valid = self.valid.squeeze()
+        return larry(x, label, validate=False, valid=valid)
 
     def lag(self, nlag, axis=-1):
         """
@@ -3419,23 +3828,26 @@ class larry(object):
         """
         if axis is None:
             raise IndexError, 'axis cannot be None.'
+        # Only the part of the data that is kept is copied
+        index = [slice(None)] * self.ndim
+        label = list(self.label)
         if nlag > 0:
-            y = self.copy()
-            y.label[axis] = y.label[axis][nlag:]
-            index = [slice(None)] * self.ndim
+            label[axis] = label[axis][nlag:]
             index[axis] = slice(0, -nlag)            
-            y.x = y.x[index]
         elif nlag < 0:
-            y = self.copy()
-            y.label[axis] = y.label[axis][:nlag]
-            index = [slice(None)] * self.ndim
+            label[axis] = label[axis][:nlag]
             index[axis] = slice(-nlag, None)            
-            y.x = y.x[index]
-        elif nlag == 0:
-            y = self.copy()
-        else:
+        elif nlag != 0:
             raise RuntimeError("Unrecognized value of `nlag`.")
-        return y
+        for ax, lab in enumerate(label):
+            if lab is self.label[ax]:
+                label[ax] = list(lab)
+        index = tuple(index)
+        x = self.x[index].copy()
+        valid = None
+        if self.valid is not None:
+            valid = self.valid[index].copy()
+        return larry(x, label, validate=False, valid=valid)
 
     def sortaxis(self, axis=None, reverse=False):
         """
@@ -3597,7 +4009,9 @@ class larry(object):
             y.label[ax] = y.label[ax][flip]    
             index = [slice(None)] * y.ndim
             index[ax] = flip
-            y.x = y.x[index] 
+            y.x = y.x[index]
+            if y.valid is not None:
+                y.valid = y.valid[index]
         return y               
         
     # Shuffle ----------------------------------------------------------------
@@ -3731,8 +4145,8 @@ class larry(object):
         x
         array([False,  True], dtype=bool)
         
-        bool and int dtype do not support missing values so always return
-        False:
+        bool and int dtype have no missing value marker so always return
+        False, unless the larry has a validity mask:
         
         >>> larry([0, 1]).ismissing()
         label_0
@@ -3747,6 +4161,12 @@ class larry(object):
             1
         x
         array([False, False], dtype=bool)        
+        >>> larry([0, 1], valid=[True, False]).ismissing()
+        label_0
+            0
+            1
+        x
+        array([False,  True], dtype=bool)
         
         """   
         label = self.copylabel()
@@ -3774,38 +4194,20 @@ class larry(object):
             
         """    
         
-        y = self.copy()
-        ndim = y.ndim
-        
+        ndim = self.ndim
         if axis is None:
             axes = range(ndim)
         else:
             axes = [range(ndim)[axis]]
-
-        idxsl = []
-        labsnew = []
-        for ax in range(ndim):
-            sl = [None] * ndim
-            if ax in axes:
-                labsnew.append(y.label[ax])
-                sl[ax] = slice(None)
-                idxsl.append(np.arange(y.shape[ax])[sl])
-                continue
-            
-            # Find all nans over all other axes
-            xtmp = np.rollaxis(np.isfinite(y.x), ax, 0)
-            count = np.ones(xtmp.shape)
-            for _ in range(ndim-1):
-                xtmp = xtmp.sum(-1)
-                count = count.sum(-1)
-    
-            xtmp = xtmp > (1.0 - fraction) * count
-            labsnew.append([y.label[ax][ii] for ii in np.nonzero(xtmp)[0]])
-            sl[ax] = slice(None)
-            idxsl.append(np.nonzero(xtmp)[0][sl])
+        cutaxes = [ax for ax in range(ndim) if ax not in axes]
         
-        y.x = y.x[idxsl]
-        y.label = labsnew
+        # Number of present values in each slice along the cut axes
+        counts = _presentcounts(self, cutaxes)
+        keep = [None] * ndim
+        for ax in cutaxes:
+            count = self.size // max(1, self.shape[ax])
+            keep[ax] = counts[ax] > (1.0 - fraction) * count
+        y = _keepslices(self, keep)
         
         if y.x.size == 0: 
             # Empty larry left over
@@ -3819,7 +4221,7 @@ class larry(object):
         from left to right along each row.
         """
         label = self.copylabel()
-        x = push(self.x, window, axis=axis)
+        x = push(_nandata(self), window, axis=axis)
         return larry(x, label, validate=False)
         
     def vacuum(self, axis=None):
@@ -3847,9 +4249,7 @@ class larry(object):
                 
         """        
 
-        y = self.copy()
-        ndim = y.ndim
-        
+        ndim = self.ndim
         if axis is None:
             axes = range(ndim)
         elif not hasattr(axis, '__iter__'):
@@ -3861,33 +4261,20 @@ class larry(object):
             # Change meaning of axes to axes not in original axes
             axes = [a for a in range(ndim) if a not in axes]
         
-        idxsl = []
-        labsnew = []
-        for ax in range(ndim):
-            sl = [None]*ndim
-            if ax not in axes:
-                labsnew.append(y.label[ax])
-                sl[ax] = slice(None)
-                idxsl.append(np.arange(y.shape[ax])[sl])
-                continue
-            
-            # Find all nans over all other axes
-            xtmp = np.rollaxis(np.isfinite(y.x), ax, 0)
-            for _ in range(ndim-1):
-                xtmp = xtmp.any(-1)
-    
-            labsnew.append([y.label[ax][ii] for ii in np.nonzero(xtmp)[0]])
-            sl[ax] = slice(None)
-            idxsl.append(np.nonzero(xtmp)[0][sl])
-        
-        y.x = y.x[idxsl]
-        y.label = labsnew
-        return y        
+        # Number of present values in each slice along the vacuumed axes
+        counts = _presentcounts(self, axes)
+        keep = [None] * ndim
+        for ax in axes:
+            keep[ax] = counts[ax] > 0
+        return _keepslices(self, keep)
         
     def nan_replace(self, replace_with=0):
         """
         Replace NaNs.
         
+        The missing values of a larry with a validity mask (see `valid` in
+        larry.__init__) are replaced too; the copy has no mask.
+        
         Parameters
         ----------
         replace_with : scalar
@@ -3900,7 +4287,13 @@ class larry(object):
                     
         """
         y = self.copy()
-        np.putmask(y.x, np.isnan(y.x), replace_with)
+        if y.valid is not None:
+            np.putmask(y.x, ~y.valid, replace_with)
+            y.valid = None
+        else:
+            np.putmask(y.x, np.isnan(y.x), replace_with)
+        if replace_with == replace_with:
+            _setmissing(y, False)
         return y                                     
 
     # Size, shape, type ------------------------------------------------------
@@ -3920,6 +4313,51 @@ class larry(object):
         """
         return np.isfinite(self.x).sum()
 
+    @property
+    def has_missing(self):
+        """
+        True if the larry has missing values; False otherwise.
+        
+        The answer is cached, so only the first call looks at the data.
+        Larrys made from one known to have no missing values by methods that
+        copy the data without adding NaN (fancy indexing, take, astype,
+        negation, abs and sign) are known to have none too, as are the
+        output of nan_replace and, when it finds no NaN, ranking. Larrys
+        that are views of the data (slices, T, swapaxes, ...) are not.
+        
+        While the cached answer is False, the reductions (sum, mean, std,
+        var, min, max, prod) use the faster non-NaN Numpy functions. Larry
+        methods that write into the data (setitem, set, fill, the in-place
+        operators and the `out` options) clear the cache of the larry they
+        write to; writes made directly to `x`, or through another larry that
+        shares the data, are not seen. That does no harm: a reduction that
+        finds NaN in its result clears the cache and starts over. Assign
+        None to `has_missing` to clear the cache; assigning True or False
+        sets the cached answer.
+        
+        Examples
+        --------
+        >>> from la import nan
+        >>> y = larry([1.0, nan])
+        >>> y.has_missing
+        True
+        >>> y[1] = 2.0
+        >>> y.has_missing
+        False
+        
+        """
+        if _nomissing(self):
+            return False
+        flag = _cachedmissing(self)
+        if flag is None:
+            flag = bool(ismissing(self).any())
+            _setmissing(self, flag)
+        return flag
+
+    @has_missing.setter
+    def has_missing(self, flag):
+        _setmissing(self, flag)
+
     @property
     def size(self):
         """
@@ -3989,7 +4427,10 @@ class larry(object):
         Returns
         -------
         y : larry
-            A copy of the larry, cast to the specified type.
+            A copy of the larry, cast to the specified type. If the larry has
+            a validity mask and `dtype` has a missing value marker (float,
+            for example) then the missing values become the marker (NaN) and
+            the copy has no mask.
             
         Examples
         --------
@@ -4017,7 +4458,7 @@ class larry(object):
         """
         label = self.copylabel()
         x = self.x.astype(dtype)
-        return larry(x, label, validate=False)
+        return _keepnomissing(_withvalid(x, label, _validcopy(self)), self)
         
     @property
     def T(self):
@@ -4051,8 +4492,10 @@ class larry(object):
         """
         y = self.copy()
         y.x = y.x.T
+        if y.valid is not None:
+            y.valid = y.valid.T
         y.label = y.label[::-1]
-        return y 
+        return y
         
     def swapaxes(self, axis1, axis2):
         """
@@ -4106,6 +4549,8 @@ class larry(object):
         y = self.copy()
         y.label[axis1], y.label[axis2] =  y.label[axis2], y.label[axis1]
         y.x = np.swapaxes(y.x, axis1, axis2)
+        if y.valid is not None:
+            y.valid = np.swapaxes(y.valid, axis1, axis2)
         return y
             
     def flatten(self, order='C'):
@@ -4156,7 +4601,10 @@ class larry(object):
         """
         label = flattenlabel(self.label, order)
         x = self.x.flatten(order)
-        return larry(x, label, validate=False)
+        valid = None
+        if self.valid is not None:
+            valid = self.valid.flatten(order)
+        return larry(x, label, validate=False, valid=valid)
         
     def unflatten(self):
         """
@@ -4217,9 +4665,17 @@ class larry(object):
             if not isscalar(self.x.flat[0]):
                 msg = 'Only scalar dtype is currently supported.'
                 raise NotImplementedError, msg 
-            labels = zip(*self.label[0])
-            x, label = fromlists(self.x, labels)     
-            return larry(x, label)
+            label, codes = encodelabel(self.label[0])
+            shape = tuple([len(lab) for lab in label])
+            index = np.ravel_multi_index(codes, shape)
+            data = _nandata(self)
+            if index.size == np.prod(shape) and (np.diff(index) == 1).all():
+                # The flattened label is complete and in C order
+                x = data.reshape(shape).astype(float_dtype(self.dtype))
+            else:
+                x = nans(shape, float_dtype(self.dtype))
+                x.flat[index] = data
+            return larry(x, label, validate=False)
                         
     def insertaxis(self, axis, label):
         """
@@ -4273,6 +4729,9 @@ class larry(object):
             raise ValueError, "`axis` cannot be None."
         x = self.getx(copy=True)
         x = np.expand_dims(x, axis)
+        valid = None
+        if self.valid is not None:
+            valid = np.expand_dims(self.valid.copy(), axis)
         lab = self.copylabel()
         if int(axis) == -1:
             ax = len(lab)
@@ -4281,7 +4740,7 @@ class larry(object):
         else:
             ax = axis        
         lab.insert(ax, [label])
-        return larry(x, lab)            
+        return larry(x, lab, valid=valid)
         
     # Conversion -------------------------------------------------------------
 
@@ -4304,10 +4763,134 @@ class larry(object):
         [('a', 'c', 1), ('a', 'd', 2), ('b', 'c', 3), ('b', 'd', 4)]       
         
         """
-        yf = self.flatten()
-        z = zip(*yf.label[0])
-        z.append(yf.x.tolist())
-        return zip(*z)
+        return list(self.itertuples())
+
+    def itertuples(self, batchsize=None, skipna=False):
+        """
+        Iterate over the flattened larry as tuples of labels and value.
+        
+        The elements of the larry are visited lazily in row-major (C) order;
+        neither the flattened larry nor its flattened label is built.
+        
+        Parameters
+        ----------
+        batchsize : {int, None}, optional
+            By default (None) each tuple is yielded on its own. If an int is
+            given, lists of at most `batchsize` tuples are yielded instead.
+        skipna : bool, optional
+            If True, missing values are skipped. The default is False.
+        
+        Yields
+        ------
+        row : {tuple, list}
+            The tuple (label0, label1, ..., labelN, value) or, if
+            `batchsize` is an int, a list of such tuples.
+        
+        See Also
+        --------
+        la.larry.totuples : Convert to a flattened list of tuples.
+        la.larry.iteritems : Iterate over the flattened larry as items.
+        
+        Examples
+        --------
+        >>> y = larry([[1, 2], [3, 4]], [['a', 'b'], ['c', 'd']])
+        >>> for row in y.itertuples():
+        ...     print row
+        ...
+        ('a', 'c', 1)
+        ('a', 'd', 2)
+        ('b', 'c', 3)
+        ('b', 'd', 4)
+        >>> list(y.itertuples(batchsize=3))
+        [[('a', 'c', 1), ('a', 'd', 2), ('b', 'c', 3)], [('b', 'd', 4)]]
+        
+        """
+        for labels, values in self._iterflat(batchsize, skipna):
+            labels.append(values)
+            rows = zip(*labels)
+            if batchsize is None:
+                for row in rows:
+                    yield row
+            else:
+                yield rows
+
+    def iteritems(self, batchsize=None, skipna=False):
+        """
+        Iterate over the flattened larry as (label tuple, value) items.
+        
+        The elements of the larry are visited lazily in row-major (C) order;
+        neither the flattened larry nor its flattened label is built.
+        
+        Parameters
+        ----------
+        batchsize : {int, None}, optional
+            By default (None) each item is yielded on its own. If an int is
+            given, lists of at most `batchsize` items are yielded instead.
+        skipna : bool, optional
+            If True, missing values are skipped. The default is False.
+        
+        Yields
+        ------
+        item : {tuple, list}
+            The item ((label0, label1, ..., labelN), value) or, if
+            `batchsize` is an int, a list of such items.
+        
+        See Also
+        --------
+        la.larry.todict : Convert to a dictionary.
+        la.larry.itertuples : Iterate over the flattened larry as tuples.
+        
+        Examples
+        --------
+        >>> y = larry([[1.0, nan], [3.0, 4.0]], [['a', 'b'], ['c', 'd']])
+        >>> for item in y.iteritems(skipna=True):
+        ...     print item
+        ...
+        (('a', 'c'), 1.0)
+        (('b', 'c'), 3.0)
+        (('b', 'd'), 4.0)
+        
+        """
+        for labels, values in self._iterflat(batchsize, skipna):
+            items = zip(zip(*labels), values)
+            if batchsize is None:
+                for item in items:
+                    yield item
+            else:
+                yield items
+
+    def _iterflat(self, batchsize=None, skipna=False):
+        "Yield the labels (one list per axis) and values of chunks of larry."
+        if batchsize is None:
+            batchsize = _CHUNK
+        elif batchsize < 1:
+            raise ValueError, '`batchsize` must be at least 1'
+        for idx in _iterindex(self.shape, batchsize):
+            x = self.x[idx]
+            valid = None
+            if self.valid is not None:
+                valid = self.valid[idx]
+                if valid.all():
+                    valid = None
+            if skipna:
+                if valid is None:
+                    keep = ~ismissing(x)
+                else:
+                    keep = valid
+                    valid = None
+                if not keep.all():
+                    idx = [i[keep] for i in idx]
+                    x = x[keep]
+                    if x.size == 0:
+                        continue
+            labels = [map(lab.__getitem__, i.tolist())
+                      for lab, i in zip(self.label, idx)]
+            values = x.tolist()
+            if valid is not None:
+                # None for the missing values of a masked larry
+                values = [v if ok else None
+                          for v, ok in zip(values, valid.tolist())]
+            yield labels, values
 
     @staticmethod
     def fromtuples(data):
@@ -4401,8 +4984,12 @@ class larry(object):
         [[1, 2, 3, 4], [('a', 'c'), ('a', 'd'), ('b', 'c'), ('b', 'd')]]       
         
         """
-        yf = self.flatten()
-        return [yf.x.tolist(), yf.label[0]]                                   
+        xs = []
+        label = []
+        for labels, values in self._iterflat():
+            label.extend(zip(*labels))
+            xs.extend(values)
+        return [xs, label]
 
     @staticmethod
     def fromlist(data):
@@ -4475,8 +5062,7 @@ class larry(object):
         {('b', 'c'): 3.0, ('a', 'd'): 2.0, ('a', 'c'): 1.0, ('b', 'd'): 4.0}     
         
         """
-        ylist = self.tolist()
-        return dict(zip(ylist[1], ylist[0]))
+        return dict(self.iteritems())
 
     @staticmethod    
     def fromdict(data):
@@ -4526,7 +5112,7 @@ class larry(object):
         """ 
         return larry.fromlist([data.values(), data.keys()])
         
-    def tocsv(self, filename, delimiter=','):
+    def tocsv(self, filename, delimiter=',', fmt=None, nanrep=None):
         """
         Save larry to a csv file.
         
@@ -4551,6 +5137,14 @@ class larry(object):
         delimiter : str
             The delimiter used to separate the labels elements from eachother
             and from the values.
+        fmt : str, optional
+            A format string, such as '%.6g', used to write each data value.
+            By default (None) each value is written with the fewest digits
+            that read back to the same value. Writing with a format string
+            is faster.
+        nanrep : str, optional
+            The string written in place of NaN data values. By default NaN
+            is written as `fmt` formats it ('nan').
 
         See Also
         --------
@@ -4575,13 +5169,30 @@ class larry(object):
         array([ 1.,  2.,  3.])
         
         """
+        # Format the labels once, quoting them as the csv module would
+        label = []
+        for lab in self.label:
+            lab = [_csvfield(e, delimiter) for e in lab]
+            label.append(np.array(lab, dtype=object))
+        ndim = self.ndim
+        shape = self.shape
         fid = open(filename, 'w')
-        writer = csv.writer(fid, delimiter=delimiter)
-        writer.writerows(self.totuples())
-        fid.close()                   
+        try:
+            for idx in _iterindex(shape, _CHUNK):
+                out = np.empty((idx[0].size, ndim + 1), dtype=object)
+                for ax in range(ndim):
+                    out[:, ax] = label[ax][idx[ax]]
+                valid = None
+                if self.valid is not None:
+                    valid = self.valid[idx]
+                out[:, -1] = _formatx(self.x[idx], fmt, nanrep, valid)
+                _writerows(fid, out, delimiter, '\r\n')
+        finally:
+            fid.close()
 
     @staticmethod
-    def fromcsv(filename, delimiter=',', skiprows=0):
+    def fromcsv(filename, delimiter=',', skiprows=0, usecols=None,
+                converters=None, chunksize=100000):
         """
         Load a larry from a csv file.
         
@@ -4615,11 +5226,34 @@ class larry(object):
             and from the values.
         skiprows : int, optional
             Skip the first `skiprows` lines. No rows are skipped by default.          
+        usecols : sequence of int, optional
+            The columns to read. The last column in `usecols` holds the data
+            values; the other columns, in the order given, hold the labels.
+            By default all columns are read.
+        converters : dict, optional
+            A dictionary that maps a label column number (the column number
+            in the file, counting from 0) to a function, such as int, that
+            converts a label element from a str. A str in place of a
+            function is taken to be a date format, such as '%Y-%m-%d', and
+            the label elements are converted to datetime.date. Label
+            elements are converted to str by default.
+        chunksize : int, optional
+            The file is parsed `chunksize` rows at a time. The default is
+            100000.
             
         Raises
         ------
         ValueError
-            If a data value is missing in the csv file.
+            If a data value is missing in the csv file or if the rows of the
+            csv file do not all have the same number of columns.
+            
+        Notes
+        -----
+        The file is streamed: each chunk of rows is parsed and each label
+        column is factorized (each new label element is given an integer
+        code) before the next chunk is read. Only the integer codes and the
+        data values are kept, in arrays that grow geometrically, so the
+        memory used is a small multiple of the size of the returned larry.
             
         See Also
         --------
@@ -4643,14 +5277,23 @@ class larry(object):
         array([ 1.,  2.,  3.])
         
         """
+        if chunksize < 1:
+            raise ValueError, '`chunksize` must be at least 1'
         fid = open(filename, 'r')
-        reader = csv.reader(fid, delimiter=delimiter)
-        [reader.next() for i in range(skiprows)]
-        data = [row for row in reader]
-        fid.close()
-        return larry.fromtuples(data) 
+        try:
+            reader = csv.reader(fid, delimiter=delimiter)
+            [reader.next() for i in range(skiprows)]
+            parser = _CsvParser(usecols, converters)
+            while True:
+                rows = list(islice(reader, chunksize))
+                if len(rows) == 0:
+                    break
+                parser.parse(rows)
+        finally:
+            fid.close()
+        return parser.larry()
     
-    def tofile(self, file, delimiter=','):
+    def tofile(self, file, delimiter=',', fmt=None, nanrep=None):
         """
         Save 1d or 2d larry to text file (overwrites file if already exists).
         
@@ -4661,6 +5304,14 @@ class larry(object):
             not be closed.
         delimiter : str
             The delimiter used to separate the elements in the file.
+        fmt : str, optional
+            A format string, such as '%.6g', used to write each data value.
+            By default (None) each value is written with the fewest digits
+            that read back to the same value. Writing with a format string
+            is faster.
+        nanrep : str, optional
+            The string written in place of NaN data values. By default NaN
+            is written as `fmt` formats it ('nan').
 
         See Also
         --------
@@ -4711,45 +5362,158 @@ class larry(object):
             f = file
             opened = False
 
-        # Write data
-        if ndim == 1:
+        # Write data, a chunk of rows at a time
+        rowlabel = np.array([str(z) for z in self.label[0]], dtype=object)
+        try:
+            if ndim == 1:
+                ncol = 1
+            else:
+                # Column labels
+                line = [str(z) for z in self.label[1]]
+                f.write(delimiter + delimiter.join(line) + '\n')
+                ncol = self.shape[1]
+            nrow = max(1, _CHUNK // max(1, ncol))
+            for i0 in xrange(0, self.shape[0], nrow):
+                x = self.x[i0:i0 + nrow]
+                valid = None
+                if self.valid is not None:
+                    valid = self.valid[i0:i0 + nrow]
+                out = np.empty((x.shape[0], ncol + 1), dtype=object)
+                out[:, 0] = rowlabel[i0:i0 + nrow]
+                out[:, 1:] = _formatx(x, fmt, nanrep,
+                                      valid).reshape(len(x), ncol)
+                _writerows(f, out, delimiter, '\n')
+        finally:
+            # Close file if opened (i.e., if file was a str)
+            if opened:
+                f.close()
 
-            for i in range(self.size):
-                line = [str(self.label[0][i]), str(self.x[i]) + '\n']
-                line = delimiter.join(line)
-                f.write(line)
+    def tobytes(self):
+        """
+        Convert larry to a compact byte string.
+        
+        The byte string starts with a versioned header. Each label whose
+        elements are all of the same type (int, float, bool, str, unicode,
+        datetime.date, datetime.datetime or datetime.time) is stored as a
+        typed array; any other label is pickled. A validity mask, if any, is
+        stored with one bit per element. The data, `x`, is stored as a raw
+        buffer (aligned to 16 bytes) so that `frombytes` can read it without
+        making a copy.
+        
+        Returns
+        -------
+        data : str
+            The larry encoded as a byte string.
+        
+        See Also
+        --------
+        la.larry.frombytes: Convert a byte string made by tobytes to a larry.
+        
+        Notes
+        -----
+        Pickling a larry uses this encoding.
+        
+        Examples
+        --------
+        >>> y = larry([1, 2], [['a', 'b']])
+        >>> larry.frombytes(y.tobytes())
+        label_0
+            a
+            b
+        x
+        array([1, 2])
+                        
+        """
+        head, xdata = _tobytes(self)
+        if isinstance(xdata, np.ndarray):
+            xdata = xdata.tostring()
+        return head + xdata
 
-        elif ndim == 2:
-            
-            # Column labels
-            f.write(delimiter)
-            line = []
-            for i in range(self.shape[1]):
-                line.append(str(self.label[1][i]))
-            line = delimiter.join(line)
-            line += '\n'
-            f.write(line)
-            
-            # Row labels and array data
-            for i in range(self.shape[0]):
-                line = [str(self.label[0][i])]
-                for j in range(self.shape[1]):
-                    line.append(str(self.x[i,j]))
-                line = delimiter.join(line)
-                line += '\n'
-                f.write(line)
+    @staticmethod
+    def frombytes(data, copy=False):
+        """
+        Convert a byte string made by `tobytes` to a larry.
         
+        Parameters
+        ----------
+        data : str, bytearray, buffer or memoryview
+            A byte string made by the larry method `tobytes`.
+        copy : bool, optional
+            By default (False) the data of the returned larry, `x`, is a view
+            into `data`; no copy is made. A view into a str is read-only. If
+            `copy` is True then `x` is a copy.
+        
+        Returns
+        -------
+        lar : larry
+            The larry encoded in `data`.
+        
+        Raises
+        ------
+        ValueError
+            If `data` was not made by `tobytes` or was made by a newer,
+            unsupported version of `tobytes`.
+        
+        See Also
+        --------
+        la.larry.tobytes: Convert larry to a compact byte string.
+        
+        Examples
+        --------
+        >>> y = larry([1, 2], [['a', 'b']])
+        >>> larry.frombytes(y.tobytes())
+        label_0
+            a
+            b
+        x
+        array([1, 2])
+        
+        """
+        if isinstance(data, memoryview):
+            buf = np.asarray(data)
         else:
+            buf = np.frombuffer(data, dtype=np.uint8)
+        if buf.dtype != np.uint8 or buf.ndim != 1:
+            buf = buf.reshape(-1).view(np.uint8)
+        idx = len(_BYTES_MAGIC)
+        if buf[:idx].tostring() != _BYTES_MAGIC:
+            raise ValueError, '`data` is not a larry byte string'
+        version, nheader = struct.unpack('<BI', buf[idx:idx+5].tostring())
+        if version > _BYTES_VERSION:
+            msg = 'larry byte string version %d is not supported'
+            raise ValueError, msg % version
+        idx += 5
+        header = json.loads(buf[idx:idx+nheader].tostring())
+        idx += nheader
+        label = []
+        for info in header['labels']:
+            nbytes = info['nbytes']
+            label.append(_bytes2label(buf[idx:idx+nbytes], info))
+            idx += nbytes
+        shape = tuple(header['shape'])
+        valid = None
+        if 'valid' in header:
+            nbytes = header['valid']
+            valid = np.unpackbits(buf[idx:idx+nbytes])
+            valid = valid[:np.prod(shape, dtype=int)].astype(bool)
+            valid = valid.reshape(shape)
+            idx += nbytes
+        idx += -idx % _BYTES_ALIGN
+        xbuf = buf[idx:idx+header['xbytes']]
+        if header['x'] == 'pickle':
+            x = cPickle.loads(xbuf.tostring())
+        else:
+            x = xbuf.view(np.dtype(str(header['dtype'])))
+            if header['fortran']:
+                x = x.reshape(shape[::-1]).T
+            else:
+                x = x.reshape(shape)
+            if copy:
+                x = x.copy()
+        return larry(x, label, validate=False, valid=valid)
 
-            if opened:
-                f.close()
-            msg = "Please report this bug; the code should never reach here."
-            raise RuntimeError, msg
-
-        # Close file if opened (i.e., if file was a str)
-        if opened:
-            f.close()
-
+    def __reduce__(self):
+        return (_frombytes_copy, (self.tobytes(),))
                
     # Copy -------------------------------------------------------------------
           
@@ -4771,7 +5535,7 @@ class larry(object):
         """
         label = [list(z) for z in self.label]
         x = self.x.copy()
-        return larry(x, label, validate=False)
+        return larry(x, label, validate=False, valid=_validcopy(self))
         
     def copylabel(self):
         """
@@ -4825,9 +5589,518 @@ class larry(object):
         # x
         x.append('x\n')
         x.append(repr(self.x))
+        if self.valid is not None:
+            x.append('\nvalid\n')
+            x.append(repr(self.valid))
         return ''.join(x)        
 
 
+# Validity mask support functions --------------------------------------------
+
+# Masked array method (and the result when every element is missing) of the
+# reduce functions; see __reducevalid
+_MAREDUCE = {bn.nansum: ('sum', 0),
+             np.prod: ('prod', np.nan),
+             bn.nanmean: ('mean', np.nan),
+             bn.nanmedian: ('median', np.nan),
+             bn.nanstd: ('std', np.nan),
+             bn.nanvar: ('var', np.nan),
+             bn.nanmax: ('max', np.nan),
+             bn.nanmin: ('min', np.nan),
+             np.any: ('any', np.False_),
+             np.all: ('all', ~np.False_)}
+
+def _validcopy(lar):
+    "Copy of the validity mask of `lar`; None if `lar` has no mask."
+    if lar.valid is None:
+        return None
+    return lar.valid.copy()
+
+def _andvalid(valid1, valid2):
+    "Mask of the elements that are valid in both masks; either may be None."
+    if valid1 is None:
+        return valid2
+    if valid2 is None:
+        return valid1
+    return valid1 & valid2
+
+def _alignvalid(lar, label):
+    "Copy of the validity mask of `lar` taken along `label`; or None."
+    if lar.valid is None:
+        return None
+    valid = lar.valid
+    for ax, lab in enumerate(label):
+        if lar.label[ax] != lab:
+            valid = valid.take(listmap(lar.label[ax], lab), ax)
+    if valid is lar.valid:
+        valid = valid.copy()
+    return valid
+
+def _withvalid(x, label, valid):
+    """
+    larry with data `x`, `label` and validity mask `valid` (or None).
+    
+    The mask is only kept if the dtype of x has no missing value marker (int
+    and bool, for example). Otherwise the invalid elements of x are set to
+    the marker (NaN for float), so x must not be the data of another larry,
+    and the mask is dropped.
+    
+    """
+    if valid is not None:
+        miss = missing_marker(x)
+        if miss is not NotImplemented:
+            if not valid.all():
+                x[~valid] = miss
+            valid = None
+    return larry(x, label, validate=False, valid=valid)
+
+def _setvalid(lar, valid):
+    "Give `lar`, whose data were just overwritten, the validity mask `valid`."
+    lar._missing = None
+    if valid is not None:
+        miss = missing_marker(lar.x)
+        if miss is not NotImplemented:
+            if not valid.all():
+                lar.x[~valid] = miss
+            valid = None
+        elif valid is not lar.valid:
+            valid = valid.copy()
+    lar.valid = valid
+
+def _validset(lar, index, valid):
+    "Update the validity mask of `lar` after assigning to x[index]."
+    lar._missing = None
+    if valid is not None and not valid.all():
+        if lar.valid is None:
+            lar.valid = np.ones(lar.shape, dtype=bool)
+        lar.valid[index] = valid
+    elif lar.valid is not None:
+        lar.valid[index] = True
+
+def _nanfilled(x, valid):
+    "Float copy of `x` with NaN where the validity mask `valid` is False."
+    y = x.astype(float_dtype(x.dtype))
+    y[~valid] = np.nan
+    return y
+
+def _nandata(lar):
+    "Data of `lar`; a float copy with NaN for missing values if it has a mask."
+    if lar.valid is None:
+        return lar.x
+    return _nanfilled(lar.x, lar.valid)
+
+def _nancopy(lar):
+    "Copy of `lar`; a float copy with NaN for missing values if it has a mask."
+    if lar.valid is None:
+        return lar.copy()
+    return larry(_nanfilled(lar.x, lar.valid), lar.copylabel(), validate=False)
+
+# Missing value support functions --------------------------------------------
+
+# Number of elements of the data looked at a time by _presentcounts
+_PRESENT_BLOCK = 65536
+
+# NaN-aware reductions and the faster functions that give the same result
+# when there are no NaNs
+_NONAN = {bn.nansum: np.sum,
+          bn.nanmean: np.mean,
+          bn.nanstd: np.std,
+          bn.nanvar: np.var,
+          bn.nanmax: np.max,
+          bn.nanmin: np.min}
+
+def _reducex(op, lar, kwargs):
+    """
+    op(lar.x, **kwargs), where op is a NaN-aware reduction along
+    kwargs['axis'].
+    
+    The faster non-NaN function in _NONAN is used if `lar` is known to have
+    no missing values. A NaN in its result means that NaNs were written
+    directly to x after has_missing was cached; then the cache is cleared
+    and op is used instead.
+    
+    """
+    if op in _NONAN and lar.dtype.kind == 'f' and _nomissing(lar):
+        x = alongaxis(_NONAN[op], lar.x, **kwargs)
+        if not np.isnan(x).any():
+            return x
+        _setmissing(lar, None)
+    return alongaxis(op, lar.x, **kwargs)
+
+def _cachedmissing(lar):
+    "The cached answer to lar.has_missing; None if there is none."
+    m = getattr(lar, '_missing', None)
+    if m is None or m[0]() is not lar.x:
+        return None
+    if m[1] is None:
+        if lar.valid is not None:
+            return None
+    elif m[1]() is not lar.valid:
+        return None
+    return m[2]
+
+def _nomissing(lar):
+    """
+    True if `lar` is known, without looking at its data, to have no missing
+    values; False if it has or might have missing values.
+    
+    The cached answer to has_missing can be stale (NaN may have been
+    written directly to x), so only use this where a stale answer is
+    caught; see _reducex.
+    
+    """
+    if _cachedmissing(lar) is False:
+        return True
+    return _cannotmiss(lar)
+
+def _cannotmiss(lar):
+    "True if the dtype of `lar` has no missing value marker and no mask."
+    return lar.valid is None and lar.x.dtype.kind in 'biu'
+
+def _setmissing(lar, flag):
+    "Cache `flag` as the answer to lar.has_missing; None clears the cache."
+    if flag is None:
+        lar._missing = None
+    else:
+        valid = lar.valid
+        if valid is not None:
+            valid = weakref.ref(valid)
+        lar._missing = (weakref.ref(lar.x), valid, bool(flag))
+
+def _keepnomissing(y, lar):
+    """
+    Mark `y`, made from `lar` without adding NaN, as having no missing
+    values if `lar` is known to have none; -> y
+    
+    Only a `y` whose data is its own is marked: the data of a view can be
+    written through the larry it is a view of.
+    
+    """
+    if (isinstance(y, larry) and _nomissing(lar) and not _nomissing(y) and
+        not np.may_share_memory(y.x, lar.x)):
+        _setmissing(y, False)
+    return y
+
+def _presentcounts(lar, axes):
+    """
+    Number of present (finite and valid) elements of `lar` in each slice
+    along each axis in `axes`.
+    
+    counts[ax][i], for ax in `axes`, is the number of present elements whose
+    index along axis ax is i; counts[ax] is None for the other axes. The
+    counts for all the axes are accumulated in one pass over the data, a
+    block of rows at a time, so no full-size temporary arrays are made.
+    
+    """
+    x = lar.x
+    counts = [None] * x.ndim
+    for ax in axes:
+        counts[ax] = np.zeros(x.shape[ax], dtype=np.intp)
+    if x.size == 0 or not axes:
+        return counts
+    valid = lar.valid
+    if _cannotmiss(lar):
+        # Every element is present. (Not for a float larry known to have no
+        # NaN: inf is not present either.)
+        for ax in axes:
+            counts[ax].fill(x.size // x.shape[ax])
+        return counts
+    # Counts of the present values of each row, summed over the rows; the
+    # counts along axes other than 0 are found from it at the end
+    rowcount = None
+    if [ax for ax in axes if ax != 0]:
+        rowcount = np.zeros(x.shape[1:], dtype=np.intp)
+    n = x.shape[0]
+    nrow = max(1, _PRESENT_BLOCK // max(1, x.size // n))
+    for i0 in xrange(0, n, nrow):
+        i1 = min(i0 + nrow, n)
+        present = np.isfinite(x[i0:i1])
+        if valid is not None:
+            present &= valid[i0:i1]
+        if counts[0] is not None:
+            counts[0][i0:i1] = present.reshape(i1 - i0, -1).sum(1)
+        if rowcount is not None:
+            if i1 - i0 == 1:
+                rowcount += present[0]
+            else:
+                rowcount += present.sum(0)
+    for ax in axes:
+        if ax != 0:
+            other = tuple([a for a in range(x.ndim - 1) if a != ax - 1])
+            counts[ax][:] = rowcount.sum(axis=other)
+    return counts
+
+def _keepslices(lar, keep):
+    """
+    Copy of `lar` with only the slices marked True in keep[ax] along each
+    axis ax (all slices where keep[ax] is None); only the kept part of the
+    data is copied.
+    
+    """
+    x = lar.x
+    valid = lar.valid
+    label = []
+    takes = []
+    for ax, lab in enumerate(lar.label):
+        if keep[ax] is None or keep[ax].all():
+            label.append(list(lab))
+            continue
+        idx = np.nonzero(keep[ax])[0]
+        label.append([lab[i] for i in idx])
+        if len(idx) > 0 and idx[-1] - idx[0] + 1 == len(idx):
+            # A contiguous run of slices is cut out as a view
+            index = [slice(None)] * x.ndim
+            index[ax] = slice(idx[0], idx[-1] + 1)
+            index = tuple(index)
+            x = x[index]
+            if valid is not None:
+                valid = valid[index]
+        else:
+            takes.append((ax, idx))
+    if takes:
+        # Take from the (smaller) views
+        for ax, idx in takes:
+            x = x.take(idx, ax)
+            if valid is not None:
+                valid = valid.take(idx, ax)
+    else:
+        x = x.copy()
+        if valid is not None:
+            valid = valid.copy()
+    return larry(x, label, validate=False, valid=valid)
+
+# Byte string support functions for tobytes and frombytes ------------------
+
+_BYTES_MAGIC = '\x93LARRY'
+_BYTES_VERSION = 1
+_BYTES_ALIGN = 16
+
+# Label element types that tobytes stores as typed arrays
+_BYTES_TYPES = (int, float, bool, str, unicode, datetime.date,
+                datetime.datetime, datetime.time)
+
+def _tobytes(lar):
+    """
+    The encoding made by tobytes in two parts: (head, xdata).
+    
+    head holds everything up to the (aligned) start of the data. xdata is
+    the pickled data (str) or an array whose C-order bytes are the data.
+    
+    """
+    labels = []
+    blobs = []
+    for lab in lar.label:
+        blob, info = _label2bytes(lab)
+        labels.append(info)
+        blobs.append(blob)
+    x = lar.x
+    fortran = bool(x.flags.f_contiguous and not x.flags.c_contiguous)
+    if x.dtype.hasobject:
+        xkind = 'pickle'
+        xdata = cPickle.dumps(x, cPickle.HIGHEST_PROTOCOL)
+        xbytes = len(xdata)
+    else:
+        xkind = 'raw'
+        xdata = x.T if fortran else x
+        xbytes = x.nbytes
+    header = {'dtype': x.dtype.str, 'shape': x.shape, 'fortran': fortran,
+              'x': xkind, 'xbytes': xbytes, 'labels': labels}
+    if lar.valid is not None:
+        # The validity mask, one bit per element, follows the labels
+        blob = np.packbits(lar.valid.ravel()).tostring()
+        header['valid'] = len(blob)
+        blobs.append(blob)
+    header = json.dumps(header)
+    nlabel = sum([len(b) for b in blobs])
+    offset = len(_BYTES_MAGIC) + 5 + len(header) + nlabel
+    pad = '\x00' * (-offset % _BYTES_ALIGN)
+    blobs.insert(0, _BYTES_MAGIC + struct.pack('<BI', _BYTES_VERSION,
+                                               len(header)) + header)
+    blobs.append(pad)
+    return ''.join(blobs), xdata
+
+def _label2bytes(lab):
+    "Encode a label as a typed array if possible, else pickle it."
+    if len(lab) > 0 and type(lab[0]) in _BYTES_TYPES:
+        try:
+            arr, datetime_type = label2array(lab)
+        except (TypeError, ValueError):
+            arr = None
+        if arr is not None and arr.ndim == 1 and not arr.dtype.hasobject:
+            if datetime_type in ('datetime', 'time'):
+                if any([t.tzinfo is not None for t in lab]):
+                    arr = None
+            if arr is not None:
+                info = {'kind': 'array', 'dtype': arr.dtype.str,
+                        'datetime_type': datetime_type, 'nbytes': arr.nbytes}
+                return arr.tostring(), info
+    blob = cPickle.dumps(lab, cPickle.HIGHEST_PROTOCOL)
+    return blob, {'kind': 'pickle', 'nbytes': len(blob)}
+
+def _bytes2label(buf, info):
+    "Decode a label encoded by _label2bytes."
+    if info['kind'] == 'pickle':
+        return cPickle.loads(buf.tostring())
+    arr = buf.view(np.dtype(str(info['dtype'])))
+    return array2label(arr, info['datetime_type'])
+
+def _frombytes_copy(data):
+    "Unpickle a larry; the data is copied so that it is writeable."
+    return larry.frombytes(data, copy=True)
+
+# Text support functions for tocsv and tofile --------------------------------
+
+# Number of data values formatted, written or iterated over at a time
+_CHUNK = 65536
+
+def _iterindex(shape, chunksize):
+    "Yield the C-order indices of an array of `shape` a chunk at a time."
+    size = np.prod(shape, dtype=np.int64)
+    for i0 in xrange(0, size, chunksize):
+        i1 = min(i0 + chunksize, size)
+        yield np.unravel_index(np.arange(i0, i1), shape)
+
+def _formatx(x, fmt=None, nanrep=None, valid=None):
+    """
+    Format the elements of array `x` as a 1d object array of str.
+    
+    Elements where the validity mask `valid` (if not None) is False are
+    written as NaN would be.
+    
+    """
+    x = x.ravel()
+    mask = None
+    if nanrep is not None and x.dtype.kind == 'f':
+        mask = np.isnan(x)
+        if mask.any():
+            # Keep NaN away from formats, such as '%d', that reject it
+            x = x.copy()
+            x[mask] = 0
+        else:
+            mask = None
+    if fmt is None:
+        out = x.astype(str).astype(object)
+    else:
+        # One % operation formats the whole chunk
+        out = ((fmt + '\n') * x.size) % tuple(x.tolist())
+        out = np.array(out.split('\n')[:-1], dtype=object)
+    if mask is not None:
+        out[mask] = nanrep
+    if valid is not None:
+        valid = valid.ravel()
+        if not valid.all():
+            out[~valid] = 'nan' if nanrep is None else nanrep
+    return out
+
+def _csvfield(elem, delimiter):
+    "Convert label element to str and quote it as csv.writer would."
+    if isinstance(elem, float):
+        elem = repr(elem)
+    else:
+        elem = str(elem)
+    for c in (delimiter, '"', '\r', '\n'):
+        if c in elem:
+            return '"' + elem.replace('"', '""') + '"'
+    return elem
+
+def _writerows(f, out, delimiter, newline):
+    "Write the rows of the 2d object array of str `out` to file `f`."
+    lines = [delimiter.join(row) for row in out.tolist()]
+    lines.append('')
+    f.write(newline.join(lines))
+
+# csv support functions for fromcsv -----------------------------------------
+
+class _CsvParser(object):
+    "Incremental parser of csv rows used by larry.fromcsv."
+
+    def __init__(self, usecols=None, converters=None):
+        if usecols is not None:
+            usecols = list(usecols)
+            if len(usecols) < 2:
+                msg = '`usecols` must contain at least two columns'
+                raise ValueError, msg
+        self.usecols = usecols
+        self.converters = converters or {}
+        self.ncol = None
+        self.nrow = 0
+        self.xs = np.empty(0)
+        self.codes = []
+        self.uniques = []
+
+    def parse(self, rows):
+        "Factorize the label columns and store the values of a chunk of rows."
+        if self.usecols is None:
+            ncol = len(rows[0])
+            if self.ncol is None:
+                self.ncol = ncol
+            if ncol < 2 or any([len(row) != self.ncol for row in rows]):
+                msg = 'csv rows must all have the same number (at least two) '
+                msg += 'of columns'
+                raise ValueError, msg
+            cols = zip(*rows)
+        else:
+            try:
+                cols = [[row[i] for row in rows] for i in self.usecols]
+            except IndexError:
+                raise ValueError, 'a csv row has fewer columns than `usecols`'
+        n = len(rows)
+        if len(self.codes) == 0:
+            self.codes = [np.empty(0, dtype=np.intp) for c in cols[:-1]]
+            self.uniques = [{} for c in cols[:-1]]
+        if self.nrow + n > self.xs.size:
+            size = max(2 * self.xs.size, self.nrow + n)
+            self.xs = _grow(self.xs, size, self.nrow)
+            self.codes = [_grow(c, size, self.nrow) for c in self.codes]
+        i0 = self.nrow
+        i1 = i0 + n
+        self.xs[i0:i1] = np.array(cols[-1], dtype=np.float64)
+        for col, codes, unique in zip(cols[:-1], self.codes, self.uniques):
+            for elem in set(col).difference(unique):
+                unique[elem] = len(unique)
+            codes[i0:i1] = np.fromiter(imap(unique.__getitem__, col),
+                                       dtype=np.intp, count=n)
+        self.nrow = i1
+
+    def larry(self):
+        "The larry of the rows parsed so far."
+        if self.nrow == 0:
+            return larry([])
+        columns = self.usecols
+        if columns is None:
+            columns = range(self.ncol)
+        label = []
+        index = []
+        for column, codes, unique in zip(columns, self.codes, self.uniques):
+            converter = self.converters.get(column, None)
+            raw = sorted(unique, key=unique.__getitem__)
+            if isinstance(converter, basestring):
+                converter = _dateconverter(converter)
+            if converter is not None:
+                raw = map(converter, raw)
+            lab = sorted(set(raw))
+            idx = dict(zip(lab, range(len(lab))))
+            remap = np.array([idx[r] for r in raw], dtype=np.intp)
+            label.append(lab)
+            index.append(remap[codes[:self.nrow]])
+        x = np.empty([len(lab) for lab in label])
+        x.fill(np.nan)
+        x[tuple(index)] = self.xs[:self.nrow]
+        return larry(x, label, validate=False)
+
+def _grow(a, size, n):
+    "Copy the first `n` elements of 1d array `a` into a new array of `size`."
+    b = np.empty(size, dtype=a.dtype)
+    b[:n] = a[:n]
+    return b
+
+def _dateconverter(dateformat):
+    "Function that converts a str with format `dateformat` to a date."
+    strptime = datetime.datetime.strptime
+    def converter(s):
+        return strptime(s, dateformat).date()
+    return converter
+
 # Label indexing support functions for the lix method ------------------------
 
 class Getitemlabel(object):
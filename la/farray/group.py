@@ -3,6 +3,7 @@
 import numpy as np
 import bottleneck as bn
 from la.farray import ranking
+from la.missing import nans, float_dtype
 
 __all__ = ['group_ranking', 'group_mean', 'group_median', 'unique_group']
 
@@ -28,8 +29,8 @@ def group_ranking(x, groups, norm='-1,1', axis=0):
     Returns
     -------
     idx : ndarray
-        The ranked data. The dtype of the output is always np.float even if
-        the dtype of the input is int.
+        The ranked data. The dtype of the output is float; float input
+        keeps its dtype (float32, for example) and int input gives float64.
     
     Notes
     ----
@@ -48,7 +49,7 @@ def group_ranking(x, groups, norm='-1,1', axis=0):
     groups = np.asarray(groups)
   
     # Loop through unique groups and normalize
-    xnorm = np.nan * np.zeros(x.shape)
+    xnorm = nans(x.shape, float_dtype(x.dtype))
     for group in ugroups:
         idx = groups == group
         idxall = [slice(None)] * x.ndim
@@ -76,6 +77,16 @@ def group_mean(x, groups, axis=0):
         An array with the same shape as the input array where every element is
         replaced by the group mean along the given axis.
 
+    """
+    return _group_mean(x, groups, axis)
+
+def _group_mean(x, groups, axis=0, nonan=False):
+    """
+    group_mean(x, groups, axis); with nonan=True `x` must not contain NaN.
+    
+    Without NaNs the plain mean of each group gives the same result as the
+    NaN-aware sum divided by the count of non-NaN elements.
+    
     """
 
     # Find set of unique groups
@@ -85,14 +96,17 @@ def group_mean(x, groups, axis=0):
     groups = np.asarray(groups)    
   
     # Loop through unique groups and normalize
-    xmean = np.nan * np.zeros(x.shape)    
+    xmean = nans(x.shape, float_dtype(x.dtype))
     for group in ugroups:
         idx = groups == group
         idxall = [slice(None)] * x.ndim
         idxall[axis] = idx
         if idx.sum() > 0:
-            norm = 1.0 * (~np.isnan(x[idxall])).sum(axis)
-            ns = np.nansum(x[idxall], axis=axis) / norm
+            if nonan:
+                ns = x[idxall].mean(axis)
+            else:    
+                norm = 1.0 * (~np.isnan(x[idxall])).sum(axis)
+                ns = np.nansum(x[idxall], axis=axis) / norm
             xmean[idxall] = np.expand_dims(ns, axis)
             
     return xmean
@@ -124,7 +138,7 @@ def group_median(x, groups, axis=0):
     groups = np.asarray(groups)    
   
     # Loop through unique groups and normalize
-    xmedian = np.nan * np.zeros(x.shape)
+    xmedian = nans(x.shape, float_dtype(x.dtype))
     for group in ugroups:
         idx = groups == group
         idxall = [slice(None)] * x.ndim
@@ -3,6 +3,8 @@
 import numpy as np
 import bottleneck as bn
 
+from la.missing import float_dtype
+
 __all__ = ['geometric_mean', 'correlation', 'covMissing', 'shuffle']
 
 
@@ -19,13 +21,13 @@ def geometric_mean(x, axis=-1, check_for_greater_than_zero=True):
     x = x.copy()
     m = np.isnan(x)
     np.putmask(x, m, 1.0)
-    m = np.asarray(~m, np.float64)
+    m = np.asarray(~m, float_dtype(x.dtype))
     m = m.sum(axis)
     x = np.log(x).sum(axis)
-    g = 1.0 / m
+    g = np.divide(1, m, dtype=m.dtype)
     x = np.multiply(g, x)
     x = np.exp(x)
-    idx = np.ones(x.shape)
+    idx = np.ones(x.shape, float_dtype(x.dtype))
     if idx.ndim == 0:
         if m == 0:
             idx = np.nan
@@ -146,7 +148,7 @@ def covMissing(R):
     """
     mask = np.isnan(R)
     np.putmask(R, mask, 0)
-    mask = np.asarray(mask, np.float64)
+    mask = np.asarray(mask, float_dtype(R.dtype))
     mask = 1 - mask # Change meaning of missing matrix to present matrix  
 
     normalization = np.dot(mask, mask.T)
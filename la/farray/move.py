@@ -3,7 +3,7 @@
 import numpy as np
 import bottleneck as bn
 
-from la.missing import nans, ismissing
+from la.missing import nans, ismissing, float_dtype
 from la.farray import lastrank
 
 __all__ = ['move_median', 'move_nanmedian', 'move_func', 'move_nanranking',
@@ -224,7 +224,7 @@ def move_func_loop(func, arr, window, axis=-1, **kwargs):
         raise ValueError, "`window` must be at least 1."
     if window > arr.shape[axis]:
         raise ValueError, "`window` is too long."
-    y = nans(arr.shape)
+    y = nans(arr.shape, float_dtype(arr.dtype))
     idx1 = [slice(None)] * arr.ndim
     idx2 = list(idx1)
     for i in range(window - 1, arr.shape[axis]):
@@ -276,7 +276,7 @@ def move_func_strides(func, arr, window, axis=-1, **kwargs):
             y = y.swapaxes(0, axis)
     else:
         raise ValueError, "Only 1d, 2d, and 3d input arrays are supported."
-    ynan = nans(arrshape0)
+    ynan = nans(arrshape0, float_dtype(arr.dtype))
     index = [slice(None)] * ndim 
     index[axis] = slice(window - 1, None)
     ynan[index] = y
@@ -338,11 +338,12 @@ def movingsum(arr, window, skip=0, axis=-1, norm=False):
     
     # Set missing values to 0
     m = ismissing(arr) 
-    arr = arr.astype(float)
+    arr = arr.astype(float_dtype(arr.dtype))
     arr[m] = 0
 
-    # Cumsum
-    csx = arr.cumsum(axis)
+    # Cumsum; in float64 even for float32 input since the window sums are
+    # differences of two (large) cumulative sums
+    csx = arr.cumsum(axis, dtype=np.float64)
 
     # Set up indexes
     index1 = [slice(None)] * arr.ndim 
@@ -393,7 +394,7 @@ def movingrank(x, window, axis=-1):
     if window < 2:
         raise ValueError, 'Window is too small.'
     nt = x.shape[axis]
-    mr = np.nan * np.zeros(x.shape)        
+    mr = nans(x.shape, float_dtype(x.dtype))
     for i in xrange(window-1, nt): 
         index1 = [slice(None)] * x.ndim 
         index1[axis] = i
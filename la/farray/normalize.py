@@ -3,7 +3,7 @@
 import numpy as np
 ndtri = None
 import bottleneck as bn
-from la.missing import nans
+from la.missing import nans, float_dtype
 
 __all__ = ['lastrank', 'ranking', 'push', 'quantile', 'demean',
            'demedian', 'zscore']
@@ -121,6 +121,7 @@ def lastrank(x, axis=-1, decay=0.0):
             r = np.nan
     else:
         np.putmask(r, ~np.isfinite(x[indlast2]), np.nan)
+        r = r.astype(float_dtype(x.dtype), copy=False)
     return r    
 
 def ranking(x, axis=0, norm='-1,1'):
@@ -145,8 +146,8 @@ def ranking(x, axis=0, norm='-1,1'):
     Returns
     -------
     idx : ndarray
-        The ranked data.The dtype of the output is always np.float even if
-        the dtype of the input is int.
+        The ranked data. The dtype of the output is float; float input
+        keeps its dtype (float32, for example) and int input gives float64.
     
     Notes
     -----
@@ -160,18 +161,32 @@ def ranking(x, axis=0, norm='-1,1'):
     NaNs. That ensures that when ranking along the columns of a 2d array, for
     example, the output will have the same min and max along all columns.
     
+    """
+    return _ranking(x, axis, norm)
+
+def _ranking(x, axis=0, norm='-1,1', nonan=False):
+    """
+    ranking(x, axis, norm); with nonan=True `x` must not contain NaN.
+    
+    Without NaNs there is no need to find and count them, and the faster
+    non-NaN ranking of Bottleneck gives the same result.
+    
     """
     if axis is None:
-        ranked_x = ranking(x.reshape(-1), norm=norm)
+        ranked_x = _ranking(x.reshape(-1), norm=norm, nonan=nonan)
         return ranked_x.reshape(*x.shape)
     ax = axis
     if ax < 0:
         # This converts a negative axis to the equivalent positive axis
         ax = range(x.ndim)[ax]
-    masknan = np.isnan(x)
-    countnan = np.expand_dims(masknan.sum(ax), ax)
-    countnotnan = x.shape[ax] - countnan
-    idx = bn.nanrankdata(x, ax)
+    if nonan:
+        countnotnan = x.shape[ax]
+        idx = bn.rankdata(x, ax)
+    else:    
+        masknan = np.isnan(x)
+        countnan = np.expand_dims(masknan.sum(ax), ax)
+        countnotnan = x.shape[ax] - countnan
+        idx = bn.nanrankdata(x, ax)
     idx -= 1
     if norm == '-1,1':
         idx /= (countnotnan - 1)
@@ -195,8 +210,12 @@ def ranking(x, axis=0, norm='-1,1'):
     else:
         msg = "norm must be '-1,1', '0,N-1', or 'gaussian'."
         raise ValueError(msg)
-    np.putmask(idx, (countnotnan==1)*(~masknan), middle)
-    return idx
+    if nonan:
+        if countnotnan == 1:
+            idx.fill(middle)
+    else:        
+        np.putmask(idx, (countnotnan==1)*(~masknan), middle)
+    return idx.astype(float_dtype(x.dtype), copy=False)
 
 def push(x, n, axis=-1):
     "Fill missing values (NaN) with most recent non-missing values if recent."
@@ -206,8 +225,10 @@ def push(x, n, axis=-1):
     if y.ndim == 1:
         y = y[None, :]
     fidx = np.isfinite(y)
-    recent = np.nan * np.ones(y.shape[:-1])  
-    count = np.nan * np.ones(y.shape[:-1])          
+    recent = nans(y.shape[:-1], float_dtype(y.dtype))
+    # Index of the last non-missing value; float64 (not the dtype of x)
+    # holds any index exactly
+    count = nans(y.shape[:-1])
     for i in xrange(y.shape[-1]):
         idx = (i - count) > n
         recent[idx] = np.nan
@@ -272,7 +293,7 @@ def quantile(x, q, axis=0):
     if q < 1:
         raise ValueError, 'q must be one or greater.'
     elif q == 1:
-        y = np.zeros(x.shape)
+        y = np.zeros(x.shape, float_dtype(x.dtype))
         np.putmask(y, np.isnan(x), np.nan)
         return y
     if axis == None:
@@ -8,7 +8,7 @@ from numpy.testing import assert_array_almost_equal
 nan = np.nan
 import bottleneck as bn
 
-from la.farray import move_median, move_nanmedian, move_func
+from la.farray import move_median, move_nanmedian, move_func, movingsum
 
 
 def move_unit_maker(func, arrfunc, methods):
@@ -51,3 +51,17 @@ def test_move_nanmedian():
     "Test move_nanmedian."
     methods = ('strides', 'func_loop', 'func_strides') 
     yield move_unit_maker, move_nanmedian, bn.nanmedian, methods 
+
+def test_movingsum_float32():
+    "Test movingsum with a long float32 series."
+    rs = np.random.RandomState(3)
+    x = 100 + rs.rand(200000)
+    x[::997] = nan
+    x32 = x.astype(np.float32)
+    for norm in (False, True):
+        actual = movingsum(x32, 10, norm=norm)
+        desired = movingsum(x, 10, norm=norm)
+        assert actual.dtype == np.float32, 'movingsum dtype'
+        # float32 holds about 7 significant digits of sums near 1000
+        err_msg = 'movingsum of long float32 series, norm=%s' % norm
+        assert_array_almost_equal(actual / 1000, desired / 1000, 5, err_msg)
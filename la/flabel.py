@@ -1,5 +1,6 @@
 "label (list of lists) functions"
 
+import datetime
 from itertools import izip
 
 import numpy as np
@@ -167,29 +168,164 @@ def flattenlabel(label, order='C'):
     """
     Flatten label in row-major order 'C' (default) or column-major order 'F'.
     
-    Code taken (but modified) from http://code.activestate.com/recipes/496807
+    The flattened label is built from the integer codes returned by
+    `flattencodes`; see also `decodelabel` and `encodelabel`.
     
     """
     if order not in ('C', 'F'):
         raise ValueError, "order must be 'C' or 'F'"
     label = list(label)
-    if order == 'C':
-        label = label[::-1]
-    idx = [[]]
-    for x in label:
-        t = []
-        for y in x:
-            for i in idx:
-                t.append(i+[y])
-        idx = t
-    if order == 'C':
-        idx = [i[::-1] for i in idx]
-    idx = [tuple(i) for i in idx]     
-    return [idx]
+    if len(label) == 0:
+        return [[()]]
+    return [decodelabel(label, flattencodes(label, order))]
+
+def flattencodes(label, order='C'):
+    """
+    Integer codes, one array per axis, of the flattened label.
+    
+    A label and its codes are a compact form of the flattened label: the
+    i-th element of the flattened label is the tuple of
+    label[axis][codes[axis][i]] over the axes. No tuples are created.
+    
+    Parameters
+    ----------
+    label : list of lists
+        The label of a larry.
+    order : {'C', 'F'}, optional
+        Flatten in row-major order 'C' (default) or column-major order 'F'.
+    
+    Returns
+    -------
+    codes : list of ndarray
+        One 1d integer array per axis.
+    
+    Examples
+    --------
+    >>> flattencodes([['a', 'b'], ['c', 'd']])
+    [array([0, 0, 1, 1]), array([0, 1, 0, 1])]
+    
+    """
+    if order not in ('C', 'F'):
+        raise ValueError, "order must be 'C' or 'F'"
+    shape = [len(lab) for lab in label]
+    size = np.prod(shape, dtype=np.int64)
+    return list(np.unravel_index(np.arange(size), shape, order=order))
+
+def decodelabel(label, codes):
+    """
+    Flattened label (list of tuples) given a label and integer codes.
+    
+    Examples
+    --------
+    >>> label = [['a', 'b'], ['c', 'd']]
+    >>> decodelabel(label, flattencodes(label))
+    [('a', 'c'), ('a', 'd'), ('b', 'c'), ('b', 'd')]
+    
+    """
+    return zip(*[map(lab.__getitem__, c.tolist())
+                 for lab, c in zip(label, codes)])
+
+def encodelabel(flatlabel):
+    """
+    Label and integer codes of a flattened label (list of tuples).
     
+    The inverse of `decodelabel`. The label along each axis is made of the
+    sorted unique elements of the flattened label.
+    
+    Examples
+    --------
+    >>> encodelabel([('b', 1), ('a', 2), ('b', 2)])
+    ([['a', 'b'], [1, 2]], [array([1, 0, 1]), array([0, 1, 1])])
+    
+    """
+    label = []
+    codes = []
+    for column in zip(*flatlabel):
+        idx, lab = list2index(column)
+        label.append(lab)
+        codes.append(idx)
+    return label, codes
+    
+# Label element types that list2index converts with Numpy. Not str and
+# unicode: Numpy strips trailing NULs from them
+_LIST2INDEX_TYPES = (int, float, bool, datetime.date, datetime.datetime,
+                     datetime.time)
+
 def list2index(L):
-    "Convert a list to a unique list and the corresponding indices."
+    """
+    Convert a list to a unique list and the corresponding indices.
+    
+    The unique list is sorted. The indices are returned as an integer array.
+    Lists of ints, floats, bools, dates, naive datetimes, or naive times
+    (all of the same type) are converted with Numpy.
+    
+    """
+    if len(L) > 0 and type(L[0]) in _LIST2INDEX_TYPES:
+        if isinstance(L[0], (datetime.datetime, datetime.time)):
+            # Numpy converts timezone-aware datetimes to naive UTC
+            if any(getattr(e, 'tzinfo', None) is not None for e in L):
+                return _list2index(L)
+        try:
+            arr, datetime_type = label2array(list(L))
+        except (TypeError, ValueError):
+            arr = None
+        if arr is not None and arr.ndim == 1 and arr.dtype.kind in 'biuf':
+            if arr.dtype.kind != 'f' or not np.isnan(arr).any():
+                uarr, idx = np.unique(arr, return_inverse=True)
+                return idx, array2label(uarr, datetime_type)
+    return _list2index(L)
+
+def _list2index(L):
+    "list2index for any hashable, sortable elements."
     uL = sorted(set(L))
     idx = dict((y, x) for x, y in enumerate(uL))
-    return [idx[x] for x in L], uL
-                
+    return np.array([idx[x] for x in L], dtype=np.intp), uL
+
+def label2array(x):
+    """
+    Convert list to array if elements are of the same type, raise otherwise.
+    
+    Dates, times and datetimes are converted to int64 offsets from the
+    epoch, 1970-01-01 (days for dates, microseconds for datetimes and
+    microseconds since midnight for times). The conversion is done in bulk
+    by Numpy.
+    
+    """
+    if type(x) != list:
+        raise TypeError, 'x must be a list'
+    if len(x) == 0:
+        return np.array([]), 'not_datetime'
+    type0 = type(x[0])
+    if len(set(map(type, x))) != 1:
+        msg = 'Elements of a label along any one dimension must be of the '
+        msg += 'same type.'  
+        raise TypeError, msg
+    datetime_type = 'not_datetime'
+    if type0 == datetime.date:
+        x = np.array(x, dtype='datetime64[D]').view(np.int64)
+        datetime_type = 'date'
+    elif type0 == datetime.time:
+        x = np.fromiter((time2int(t) for t in x), np.int64, len(x))
+        datetime_type = 'time'
+    elif type0 == datetime.datetime:
+        x = np.array(x, dtype='datetime64[us]').view(np.int64)
+        datetime_type = 'datetime'
+    return np.asarray(x), datetime_type
+
+def array2label(x, datetime_type):
+    "Convert label array made by label2array back to a list of labels."
+    if datetime_type == 'date':
+        return x.view('datetime64[D]').tolist()
+    elif datetime_type == 'datetime':
+        return x.view('datetime64[us]').tolist()
+    elif datetime_type == 'time':
+        x, us = divmod(x, 1000000)
+        x, s = divmod(x, 60)
+        h, m = divmod(x, 60)
+        return map(datetime.time, h.tolist(), m.tolist(), s.tolist(),
+                   us.tolist())
+    return x.tolist()
+
+def time2int(t):
+    "Convert datetime.time to microseconds since midnight; tzinfo is lost."
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1000000 + t.microsecond
@@ -2,15 +2,17 @@
 
 import numpy as np
 
-from la.deflarry import larry
+from la.deflarry import larry, _andvalid, _setvalid, _withvalid, _cannotmiss
 from la.flabel import flattenlabel, listmap, listmap_fill
 from la.farray import covMissing
-from la.missing import missing_marker, ismissing
+from la.missing import missing_marker, ismissing, float_dtype
+from la.threads import elementwise
 
 __all__ = ['align', 'align_axis', 'align_raw', 'lrange', 'empty', 'ones',
            'zeros', 'isaligned', 'union', 'intersection', 'binaryop', 'add',
            'sortby', 'subtract', 'multiply', 'divide', 'unique', 'stack',
-           'panel', 'cov', 'rand', 'randn']
+           'panel', 'cov', 'rand', 'randn', 'nary', 'sum_larrys',
+           'mean_larrys']
 
 
 # Alignment -----------------------------------------------------------------
@@ -35,7 +37,7 @@ def align(lar1, lar2, join='inner', cast=True):
         in the list is the join method for axis=0, the second element is the
         join method for axis=1, and so on. The 'skip' join method means to
         not align the specified axis.
-    cast : bool, optional
+    cast : {True, False, 'mask'}, optional
         Only float, str, and object dtypes have missing value markers (la.nan,
         '', and None, respectively). Other dtypes, such as int and bool, do
         not have missing value markers. If `cast` is set to True (default)
@@ -43,7 +45,10 @@ def align(lar1, lar2, join='inner', cast=True):
         new rows, columns, etc are created. If cast is set to False, then a
         TypeError will be raised for int and bool dtype input if the join
         introduces new rows, columns, etc. An inner join will never introduce
-        new rows, columns, etc.
+        new rows, columns, etc. If `cast` is 'mask' then int and bool dtypes
+        are kept and the new elements are marked missing in a validity mask
+        (see `valid` in larry.__init__). Larrys that already have a validity
+        mask always keep their dtype.
         
     Returns
     -------
@@ -99,11 +104,27 @@ def align(lar1, lar2, join='inner', cast=True):
     x
     array([1, 2, 3])                              
 
+    With cast='mask' lar1 stays int; the missing value is marked in its
+    validity mask:
+
+    >>> lar3, lar4 = la.align(lar1, lar2, join='outer', cast='mask')
+    >>> lar3
+    label_0
+        0
+        1
+        2
+    x
+    array([1, 2, 0])
+    valid
+    array([ True,  True, False], dtype=bool)
+
     """
     
     # Align
-    x1, x2, label, x1isview, x2isview = align_raw(lar1, lar2, join=join,
-                                                   cast=cast)
+    x1, x2, label, x1isview, x2isview, v1, v2 = align_raw(lar1, lar2,
+                                                          join=join,
+                                                          cast=cast,
+                                                          valid=True)
     
     # Convert x1 array to larry
     label1 = []
@@ -114,7 +135,9 @@ def align(lar1, lar2, join='inner', cast=True):
             label1.append(list(lab))
     if x1isview:    
         x1 = x1.copy()
-    lar3 = larry(x1, label1, validate=False)
+        if v1 is not None:
+            v1 = v1.copy()
+    lar3 = larry(x1, label1, validate=False, valid=v1)
 
     # Convert x2 array to larry
     label2 = []
@@ -125,11 +148,13 @@ def align(lar1, lar2, join='inner', cast=True):
             label2.append(list(lab))
     if x2isview:    
         x2 = x2.copy()
-    lar4 = larry(x2, label2, validate=False)
+        if v2 is not None:
+            v2 = v2.copy()
+    lar4 = larry(x2, label2, validate=False, valid=v2)
 
     return lar3, lar4
 
-def align_raw(lar1, lar2, join='inner', cast=True):    
+def align_raw(lar1, lar2, join='inner', cast=True, valid=False):    
     """
     Align two larrys but return Numpy arrays and label instead of larrys.
     
@@ -154,7 +179,7 @@ def align_raw(lar1, lar2, join='inner', cast=True):
         in the list is the join method for axis=0, the second element is the
         join method for axis=1, and so on. The 'skip' join method means to
         not align the specified axis.
-    cast : bool, optional
+    cast : {True, False, 'mask'}, optional
         Only float, str, and object dtypes have missing value markers (la.nan,
         '', and None, respectively). Other dtypes, such as int and bool, do
         not have missing value markers. If `cast` is set to True (default)
@@ -162,7 +187,16 @@ def align_raw(lar1, lar2, join='inner', cast=True):
         new rows, columns, etc are created. If cast is set to False, then a
         TypeError will be raised for int and bool dtype input if the join
         introduces new rows, columns, etc. An inner join will never introduce
-        new rows, columns, etc.
+        new rows, columns, etc. If `cast` is 'mask' then int and bool dtypes
+        are kept and the new elements are marked missing in a validity mask
+        (see `valid` in larry.__init__). Larrys that already have a validity
+        mask always keep their dtype. 'mask' needs `valid` to be True.
+    valid : bool, optional
+        If True, also return the validity masks of the aligned arrays. By
+        default (False) no masks are returned, so the missing values of a
+        larry with a validity mask are handled as set by `cast`: they become
+        NaN in a float copy (cast=True) or a TypeError is raised
+        (cast=False).
         
     Returns
     -------
@@ -181,6 +215,11 @@ def align_raw(lar1, lar2, join='inner', cast=True):
         True if x2 is a view of lar2.x; False otherwise.  A view of lar2.x is
         retuned if the labels of `lar1` and `lar2` are the same along all
         axes; otherwise a copy is returned.
+    valid1 : {ndarray, None}
+        Only returned if `valid` is True. The validity mask of x1 (None if
+        x1 has none); a view of lar1.valid if x1isview is True.
+    valid2 : {ndarray, None}
+        Only returned if `valid` is True. The validity mask of x2.
         
     See Also
     --------
@@ -259,23 +298,30 @@ def align_raw(lar1, lar2, join='inner', cast=True):
     else:
         raise TypeError, "`join` must be a string or a list."
         
-    # Initialize missing markers, set value later (in loop) only if needed.
-    # The weird initialization value ensures a user would never pick the same 
-    undefined = 'aB!@12#E~=-'
-    miss1 = undefined
-    miss2 = undefined
+    # Larrys with validity masks need the masks returned
+    if valid:
+        usevalid1 = lar1.valid is not None or cast == 'mask'
+        usevalid2 = lar2.valid is not None or cast == 'mask'
+    else:
+        if cast == 'mask':
+            raise ValueError, "cast='mask' needs valid=True"
+        lar1 = _dropvalid(lar1, cast)
+        lar2 = _dropvalid(lar2, cast)
+        usevalid1 = False
+        usevalid2 = False
         
     # For loop initialization                         
     label = []
     x1 = lar1.x
     x2 = lar2.x
+    v1 = lar1.valid
+    v2 = lar2.valid
     label1 = lar1.label
     label2 = lar2.label
     x1isview = True
     x2isview = True
     
     # Loop: align one axis at a time 
-    msg = "`fill` type not compatible with larry dtype"     
     for ax in range(ndim):    
         list1 = label1[ax]
         list2 = label2[ax]
@@ -290,6 +336,10 @@ def align_raw(lar1, lar2, join='inner', cast=True):
                 idx2 = listmap(list2, list3)
                 x1 = x1.take(idx1, ax)
                 x2 = x2.take(idx2, ax)
+                if v1 is not None:
+                    v1 = v1.take(idx1, ax)
+                if v2 is not None:
+                    v2 = v2.take(idx2, ax)
                 x1isview = False
                 x2isview = False   
         elif joinax == 'outer':
@@ -302,30 +352,16 @@ def align_raw(lar1, lar2, join='inner', cast=True):
                 idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
                 x1 = x1.take(idx1, ax)
                 x2 = x2.take(idx2, ax) 
+                if v1 is not None:
+                    v1 = v1.take(idx1, ax)
+                if v2 is not None:
+                    v2 = v2.take(idx2, ax)
                 if len(idx1_miss) > 0:
-                    if miss1 == undefined:
-                        miss1 = missing_marker(lar1)
-                    if miss1 == NotImplemented:
-                        if cast:
-                            x1 = x1.astype(float)
-                            miss1 = missing_marker(x1)   
-                        else:                         
-                            raise TypeError, msg
-                    index1 = [slice(None)] * ndim
-                    index1[ax] = idx1_miss      
-                    x1[index1] = miss1                                        
+                    x1, v1 = _alignmiss(x1, v1, idx1_miss, ax, usevalid1,
+                                        cast)
                 if len(idx2_miss) > 0:
-                    if miss2 == undefined:
-                        miss2 = missing_marker(lar2)
-                    if miss2 == NotImplemented:
-                        if cast:
-                            x2 = x2.astype(float)
-                            miss2 = missing_marker(x2)   
-                        else:
-                            raise TypeError, msg
-                    index2 = [slice(None)] * ndim
-                    index2[ax] = idx2_miss                             
-                    x2[index2] = miss2
+                    x2, v2 = _alignmiss(x2, v2, idx2_miss, ax, usevalid2,
+                                        cast)
                 x1isview = False
                 x2isview = False                     
         elif joinax == 'left':
@@ -333,40 +369,22 @@ def align_raw(lar1, lar2, join='inner', cast=True):
             if list1 != list2:
                 idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
                 x2 = x2.take(idx2, ax) 
+                if v2 is not None:
+                    v2 = v2.take(idx2, ax)
                 if len(idx2_miss) > 0:
-                    if miss2 == undefined:
-                        miss2 = missing_marker(lar2)
-                    if miss2 == NotImplemented:
-                        if miss2 is None:
-                            miss2 = missing_marker(lar2)
-                        if miss2 is None:
-                            miss2 = missing_marker(lar2)
-                        if cast:
-                            x2 = x2.astype(float)
-                            miss2 = missing_marker(x2)   
-                        else:
-                            raise TypeError, msg
-                    index2 = [slice(None)] * ndim
-                    index2[ax] = idx2_miss        
-                    x2[index2] = miss2
+                    x2, v2 = _alignmiss(x2, v2, idx2_miss, ax, usevalid2,
+                                        cast)
                 x2isview = False                    
         elif joinax == 'right':
             list3 = list(list2)
             if list1 != list2:            
                 idx1, idx1_miss = listmap_fill(list1, list3, fill=0)
                 x1 = x1.take(idx1, ax) 
+                if v1 is not None:
+                    v1 = v1.take(idx1, ax)
                 if len(idx1_miss) > 0:
-                    if miss1 == undefined:
-                        miss1 = missing_marker(lar1)
-                    if miss1 == NotImplemented:
-                        if cast:
-                            x1 = x1.astype(float)
-                            miss1 = missing_marker(x1)   
-                        else:
-                            raise TypeError, msg
-                    index1 = [slice(None)] * ndim
-                    index1[ax] = idx1_miss                            
-                    x1[index1] = miss1 
+                    x1, v1 = _alignmiss(x1, v1, idx1_miss, ax, usevalid1,
+                                        cast)
                 x1isview = False
         elif joinax == 'skip':
             list3 = None
@@ -374,6 +392,8 @@ def align_raw(lar1, lar2, join='inner', cast=True):
             raise ValueError, 'join type not recognized'  
         label.append(list3)
     
+    if valid:
+        return x1, x2, label, x1isview, x2isview, v1, v2
     return x1, x2, label, x1isview, x2isview
 
 def align_axis(lars, axis=0, join='inner', flag=False):
@@ -520,6 +540,55 @@ def align_axis(lars, axis=0, join='inner', flag=False):
 
     return tuple(lars_out)
 
+def _dropvalid(lar, cast):
+    "`lar` without validity mask; missing values become NaN if `cast`."
+    if lar.valid is None:
+        return lar
+    if lar.valid.all():
+        return larry(lar.x, lar.label, validate=False)
+    if missing_marker(lar) is NotImplemented and not cast:
+        msg = 'Missing values of the larry need a cast to float.'
+        raise TypeError, msg
+    return lar.astype(float_dtype(lar.dtype))
+
+def _alignmiss(x, valid, idx_miss, axis, usevalid, cast):
+    "Mark elements `idx_miss` along `axis` of x missing; return (x, valid)."
+    index = [slice(None)] * x.ndim
+    index[axis] = idx_miss
+    index = tuple(index)
+    miss = missing_marker(x)
+    if miss is NotImplemented:
+        if usevalid:
+            if valid is None:
+                valid = np.ones(x.shape, dtype=bool)
+            valid[index] = False
+            x[index] = 0
+            return x, valid
+        if not cast:
+            raise TypeError, "`fill` type not compatible with larry dtype"
+        x = x.astype(float)
+        miss = missing_marker(x)
+    x[index] = miss
+    return x, valid
+
+def _alignednomissing(lar, label, join, keep):
+    """
+    True if `lar` is known to have no missing values after it is aligned to
+    `label` with `join`; `keep` is 'left' for lar1 and 'right' for lar2.
+    
+    """
+    if not _cannotmiss(lar):
+        return False
+    if label == lar.label:
+        return True
+    if type(join) is str:
+        join = [join]
+    for joinax in join:
+        if joinax not in ('inner', 'skip', keep):
+            # The join may add elements (missing values)
+            return False
+    return True
+
 def isaligned(lar1, lar2, axis=None):
     """
     Return True if labels of two given larrys are aligned along specified axis.
@@ -654,7 +723,7 @@ def intersection(axis, *args):
 # Binary-- -----------------------------------------------------------------
 
 def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore', **kwargs):
+             misstwo='ignore', out=None, **kwargs):
     """
     Binary operation on two larrys using given function and join method.
     
@@ -677,7 +746,7 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
         of dimensions of the two larrys. The first element in the list is the
         join method for axis=0, the second element is the join method for
         axis=1, and so on.
-    cast : bool, optional
+    cast : {True, False, 'mask'}, optional
         Only float, str, and object dtypes have missing value markers (la.nan,
         '', and None, respectively). Other dtypes, such as int and bool, do
         not have missing value markers. If `cast` is set to True (default)
@@ -685,7 +754,9 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
         new rows, columns, etc are created. If cast is set to False, then a
         TypeError will be raised for int and bool dtype input if the join
         introduces new rows, columns, etc. An inner join will never introduce
-        new rows, columns, etc.   
+        new rows, columns, etc.
+        If `cast` is 'mask', int and bool larrys are given validity masks
+        (see `valid` in larry.__init__) instead of being cast to float.
     missone : {scalar, 'ignore'}, optional
         By default ('ignore') no special treatment of missing values is made.
         If, however, `missone` is set to something other than 'ignore', such
@@ -698,14 +769,19 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.  
+    out : larry, optional
+        A larry in which to place the result. Its label must be the label of
+        the result of the binary operation (it may be `lar1` for an in-place
+        operation). By default (None) a new larry is returned.
     **kwargs : Keyword arguments, optional
         Keyword arguments to pass to `func`. The keyword arguments passed to
-        `func` cannot have the following keys: join, cast, missone, misstwo.
+        `func` cannot have the following keys: join, cast, missone, misstwo,
+        out.
         
     Returns
     -------
     lar3 : larry
-        The result of the binary operation.
+        The result of the binary operation (`out` if given).
         
     See Also
     --------
@@ -764,32 +840,78 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
     """
     
     # Align
-    x1, x2, label, ign1, ign2 = align_raw(lar1, lar2, join=join, cast=cast)
-    
-    # Replacing missing values is slow, so only do if requested
-    if missone != 'ignore' or misstwo != 'ignore':
-        miss1 = ismissing(x1)
-        miss2 = ismissing(x2)
-    if missone != 'ignore':    
+    x1, x2, label, ign1, ign2, v1, v2 = align_raw(lar1, lar2, join=join,
+                                                  cast=cast, valid=True)
+    # The validity masks may be updated below so must not be views
+    if v1 is not None and ign1:
+        v1 = v1.copy()
+    if v2 is not None and ign2:
+        v2 = v2.copy()
+    
+    # Replacing missing values is slow, so only do if requested and if the
+    # aligned larrys can have missing values
+    replace = missone != 'ignore' or misstwo != 'ignore'
+    if replace:
+        nomiss1 = _alignednomissing(lar1, label, join, 'left')
+        nomiss2 = _alignednomissing(lar2, label, join, 'right')
+        replace = not (nomiss1 and nomiss2)
+    if replace:
+        if nomiss1:
+            miss1 = np.zeros(x1.shape, dtype=bool)
+        else:    
+            miss1 = ismissing(x1)
+        if nomiss2:
+            miss2 = np.zeros(x2.shape, dtype=bool)
+        else:    
+            miss2 = ismissing(x2)
+        if v1 is not None:
+            miss1 |= ~v1
+        if v2 is not None:
+            miss2 |= ~v2
+    if replace and missone != 'ignore':    
         missone1 = miss1 & ~miss2
         if missone1.any():
             np.putmask(x1, missone1, missone)
+            if v1 is not None:
+                v1 |= missone1
         missone2 = miss2 & ~miss1    
         if missone2.any():
             np.putmask(x2, missone2, missone)
-    if misstwo != 'ignore':            
+            if v2 is not None:
+                v2 |= missone2
+    if replace and misstwo != 'ignore':            
         misstwo12 = miss1 & miss2    
         if misstwo12.any():
             np.putmask(x1, misstwo12, misstwo)
             np.putmask(x2, misstwo12, misstwo)
+            if v1 is not None:
+                v1 |= misstwo12
+            if v2 is not None:
+                v2 |= misstwo12
+    valid = _andvalid(v1, v2)
             
     # Binary function
-    x = func(x1, x2, **kwargs)
+    if out is not None:
+        if out.label != label:
+            msg = 'out must have the same label as the result.'
+            raise ValueError, msg
+        if isinstance(func, np.ufunc) and not kwargs:
+            elementwise(func, [x1, x2], out.x)
+        elif isinstance(func, np.ufunc):
+            func(x1, x2, out.x, **kwargs)
+        else:
+            out.x[...] = func(x1, x2, **kwargs)
+        _setvalid(out, valid)
+        return out
+    if isinstance(func, np.ufunc) and not kwargs:
+        x = elementwise(func, [x1, x2])
+    else:
+        x = func(x1, x2, **kwargs)
     
-    return larry(x, label, validate=False)
+    return _withvalid(x, label, valid)
     
 def add(lar1, lar2, join='inner', cast=True, missone='ignore',
-        misstwo='ignore'):
+        misstwo='ignore', out=None):
     """
     Sum of two larrys using given join and fill methods. 
     
@@ -829,6 +951,10 @@ def add(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : larry, optional
+        A larry in which to place the result. Its label must be the label of
+        the result (it may be `lar1` for an in-place operation). By default
+        (None) a new larry is returned.
                
     Returns
     -------
@@ -906,10 +1032,10 @@ def add(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.add, lar1, lar2, join=join, cast=cast, missone=missone,
-                    misstwo=misstwo)
+                    misstwo=misstwo, out=out)
 
 def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore'):
+             misstwo='ignore', out=None):
     """
     Difference of two larrys using given join and fill methods. 
     
@@ -949,6 +1075,10 @@ def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : larry, optional
+        A larry in which to place the result. Its label must be the label of
+        the result (it may be `lar1` for an in-place operation). By default
+        (None) a new larry is returned.
                
     Returns
     -------
@@ -1026,10 +1156,10 @@ def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.subtract, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)
+                    missone=missone, misstwo=misstwo, out=out)
                     
 def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore'):
+             misstwo='ignore', out=None):
     """
     Multiply two larrys element-wise using given join and fill methods.
     
@@ -1069,6 +1199,10 @@ def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : larry, optional
+        A larry in which to place the result. Its label must be the label of
+        the result (it may be `lar1` for an in-place operation). By default
+        (None) a new larry is returned.
                
     Returns
     -------
@@ -1146,10 +1280,10 @@ def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.multiply, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)                    
+                    missone=missone, misstwo=misstwo, out=out)                    
 
 def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
-           misstwo='ignore'):
+           misstwo='ignore', out=None):
     """
     Divide two larrys element-wise using given join and fill methods.
     
@@ -1189,6 +1323,10 @@ def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : larry, optional
+        A larry in which to place the result. Its label must be the label of
+        the result (it may be `lar1` for an in-place operation). By default
+        (None) a new larry is returned.
                
     Returns
     -------
@@ -1266,7 +1404,344 @@ def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.divide, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)
+                    missone=missone, misstwo=misstwo, out=out)
+
+# N-ary ---------------------------------------------------------------------
+
+def nary(func, lars, join='inner', cast=True):
+    """
+    Combine many larrys with a binary function, aligning them only once.
+    
+    The result is the same as chaining `func` over the larrys, i.e.,
+    func(...func(func(lar1, lar2), lar3)..., larN), but the joint label of
+    all the larrys is computed once, the output is allocated once, and each
+    larry is aligned to the joint label and combined into the output in
+    place. Chaining instead aligns (and, with an outer join, regrows the
+    label of) the partial result at every step.
+    
+    Parameters
+    ----------
+    func : Numpy binary ufunc
+        A binary ufunc, such as np.add, np.multiply or np.maximum, that
+        takes an `out` argument.
+    lars : list
+        The larrys to combine. All larrys must have the same number of
+        dimensions.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The method used to join the larrys. The default join method along
+        all axes is 'inner', i.e., the intersection of the labels. 'left'
+        and 'right' use the labels of the first and last larry,
+        respectively. If `join` is a list of strings then the length of the
+        list should be the number of dimensions of the larrys. The first
+        element in the list is the join method for axis=0, the second
+        element is the join method for axis=1, and so on.
+    cast : bool, optional
+        Only float, str, and object dtypes have missing value markers (la.nan,
+        '', and None, respectively). Other dtypes, such as int and bool, do
+        not have missing value markers. If `cast` is set to True (default)
+        then int and bool dtypes, for example, will be cast to float if any
+        new rows, columns, etc are created. If cast is set to False, then a
+        TypeError will be raised for int and bool dtype input if the join
+        introduces new rows, columns, etc. The same applies to the missing
+        values of larrys that have a validity mask.
+        
+    Returns
+    -------
+    y : larry
+        The result of combining the larrys.
+        
+    See Also
+    --------
+    la.sum_larrys: NaN-aware sum of many larrys.
+    la.mean_larrys: NaN-aware mean of many larrys.
+    la.binaryop: Binary operation on two larrys.
+    
+    Examples
+    --------
+    >>> y1 = larry([1, 2, 3], [['a', 'b', 'c']])
+    >>> y2 = larry([1, 2], [['b', 'c']])
+    >>> y3 = larry([1, 2], [['c', 'd']])
+    >>> la.nary(np.add, [y1, y2, y3])
+    label_0
+        c
+    x
+    array([6])
+    >>> la.nary(np.maximum, [y1, y2, y3], join='outer')
+    label_0
+        a
+        b
+        c
+        d
+    x
+    array([ NaN,  NaN,   3.,  NaN])
+    
+    """
+    if not isinstance(func, np.ufunc) or func.nin != 2:
+        raise TypeError, 'func must be a binary Numpy ufunc.'
+    lars = [_dropvalid(lar, cast) for lar in lars]
+    label, index = _naryalign(lars, join)
+    dtype = lars[0].dtype
+    for lar in lars[1:]:
+        dtype = func(np.empty(0, dtype), np.empty(0, lar.dtype)).dtype
+    fill = [_naryfills(idx) for idx in index]
+    if sum(fill) > 0:
+        dtype = _narymissdtype(dtype, cast)
+    shape = tuple([len(lab) for lab in label])
+    x = np.empty(shape, dtype)
+    scratch = None
+    for i, lar in enumerate(lars):
+        if i == 0:
+            _narytake(lar.x, index[i], fill[i], x)
+            continue
+        if fill[i]:
+            if scratch is None:
+                scratch = np.empty(shape, dtype)
+            xi = _narytake(lar.x, index[i], True, scratch)
+        else:
+            xi = _narytake(lar.x, index[i], False)
+        func(x, xi, x)
+    return larry(x, label, validate=False)
+
+def sum_larrys(lars, join='inner'):
+    """
+    Sum of many larrys, ignoring missing values, aligning them only once.
+    
+    Missing values (NaN) are skipped: an element of the output is the sum
+    of the elements of the larrys that are not missing, and is NaN if the
+    element is missing in all larrys. With an outer (or left or right) join
+    an element that a larry does not have counts as missing.
+    
+    Parameters
+    ----------
+    lars : list
+        The larrys to sum. All larrys must have the same number of
+        dimensions.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The method used to join the larrys. See la.nary.
+        
+    Returns
+    -------
+    y : larry
+        The sum of the larrys.
+        
+    See Also
+    --------
+    la.nary: Combine many larrys with a binary function.
+    la.mean_larrys: NaN-aware mean of many larrys.
+    
+    Examples
+    --------
+    >>> y1 = larry([1.0, nan], [['a', 'b']])
+    >>> y2 = larry([1.0, nan], [['b', 'c']])
+    >>> la.sum_larrys([y1, y2], join='outer')
+    label_0
+        a
+        b
+        c
+    x
+    array([  1.,   1.,  NaN])
+    
+    """
+    total, count, label = _narysum(lars, join)
+    if count is not None:
+        total[count == 0] = np.nan
+    return larry(total, label, validate=False)
+
+def mean_larrys(lars, join='inner'):
+    """
+    Mean of many larrys, ignoring missing values, aligning them only once.
+    
+    Missing values (NaN) are skipped: an element of the output is the mean
+    of the elements of the larrys that are not missing, and is NaN if the
+    element is missing in all larrys. With an outer (or left or right) join
+    an element that a larry does not have counts as missing.
+    
+    Parameters
+    ----------
+    lars : list
+        The larrys to average. All larrys must have the same number of
+        dimensions.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The method used to join the larrys. See la.nary.
+        
+    Returns
+    -------
+    y : larry
+        The mean of the larrys; the dtype is float.
+        
+    See Also
+    --------
+    la.nary: Combine many larrys with a binary function.
+    la.sum_larrys: NaN-aware sum of many larrys.
+    
+    Examples
+    --------
+    >>> y1 = larry([1.0, nan], [['a', 'b']])
+    >>> y2 = larry([3.0, nan], [['b', 'c']])
+    >>> la.mean_larrys([y1, y2], join='outer')
+    label_0
+        a
+        b
+        c
+    x
+    array([  1.,   3.,  NaN])
+    
+    """
+    total, count, label = _narysum(lars, join)
+    if count is None:
+        x = np.true_divide(total, len(lars))
+    else:
+        x = total
+        empty = count == 0
+        np.true_divide(x, count, x, where=~empty)
+        x[empty] = np.nan
+    return larry(x, label, validate=False)
+
+def _narysum(lars, join):
+    "NaN-aware sum and (None for int and bool) count of aligned larrys."
+    lars = [_dropvalid(lar, True) for lar in lars]
+    label, index = _naryalign(lars, join)
+    dtype = lars[0].dtype
+    for lar in lars[1:]:
+        dtype = np.add(np.empty(0, dtype), np.empty(0, lar.dtype)).dtype
+    if dtype.kind not in 'biufc':
+        raise TypeError, 'larrys must have a numeric dtype.'
+    fill = [_naryfills(idx) for idx in index]
+    if sum(fill) > 0 and dtype.kind in 'biu':
+        dtype = np.dtype(float)
+    shape = tuple([len(lab) for lab in label])
+    total = np.zeros(shape, dtype)
+    if dtype.kind in 'biu':
+        # No missing values so no need to count
+        for lar, idx in zip(lars, index):
+            np.add(total, _narytake(lar.x, idx, False), total)
+        return total, None, label
+    count = np.zeros(shape, np.int32)
+    scratch = None
+    mask = np.empty(shape, bool)
+    for lar, idx, f in zip(lars, index, fill):
+        if f:
+            if scratch is None:
+                scratch = np.empty(shape, dtype)
+            xi = _narytake(lar.x, idx, True, scratch)
+        else:
+            xi = _narytake(lar.x, idx, False)
+        np.equal(xi, xi, mask)
+        np.add(total, xi, total, where=mask)
+        np.add(count, 1, count, where=mask)
+    return total, count, label
+
+def _naryalign(lars, join):
+    """
+    Joint label of many larrys and, per larry, the index along each axis.
+    
+    The index of a larry along an axis is None if its label is the joint
+    label; otherwise it is a tuple (idx, pos): the elements idx of the label
+    of the larry are at positions pos of the joint label. pos is None if
+    every element of the joint label is in the label of the larry.
+    
+    """
+    lars = list(lars)
+    if len(lars) == 0:
+        raise ValueError, '`lars` must contain at least one larry.'
+    for lar in lars:
+        if not isinstance(lar, larry):
+            raise TypeError, 'One or more input is not a larry'
+    ndim = lars[0].ndim
+    for lar in lars:
+        if lar.ndim != ndim:
+            msg = 'Binary operation on two larrys with different dimension'
+            raise IndexError, msg
+    if type(join) is str:
+        join = [join] * ndim
+    elif type(join) is list:
+        if len(join) != ndim:
+            msg = "Length of `join` list equal number of dimension of `lar1`."
+            raise ValueError, msg
+    else:
+        raise TypeError, "`join` must be a string or a list."
+    label = []
+    for ax in range(ndim):
+        labels = [lar.label[ax] for lar in lars]
+        label.append(_joinlabel(labels, join[ax]))
+    index = []
+    for lar in lars:
+        idx = []
+        for ax in range(ndim):
+            if lar.label[ax] == label[ax]:
+                idx.append(None)
+                continue
+            idxax, miss = listmap_fill(lar.label[ax], label[ax], fill=-1)
+            idxax = np.array(idxax, dtype=np.intp)
+            if len(miss) == 0:
+                idx.append((idxax, None))
+            else:
+                pos = np.flatnonzero(idxax >= 0)
+                idx.append((idxax[pos], pos))
+        index.append(idx)
+    return label, index
+
+def _joinlabel(labels, join):
+    "Joint label of a list of labels along one axis."
+    label = labels[0]
+    if [1 for lab in labels if lab != label]:
+        if join == 'inner':
+            label = frozenset(label)
+            for lab in labels[1:]:
+                label = label & frozenset(lab)
+            label = sorted(label)
+        elif join == 'outer':
+            label = frozenset(label)
+            for lab in labels[1:]:
+                label = label | frozenset(lab)
+            label = sorted(label)
+        elif join == 'right':
+            label = labels[-1]
+        elif join != 'left':
+            raise ValueError, 'join type not recognized'
+    elif join not in ('inner', 'outer', 'left', 'right'):
+        raise ValueError, 'join type not recognized'
+    return list(label)
+
+def _naryfills(idx):
+    "True if aligning with the index `idx` creates missing values."
+    return len([1 for i in idx if i is not None and i[1] is not None]) > 0
+
+def _narymissdtype(dtype, cast):
+    "dtype that can hold missing values."
+    if missing_marker(np.empty(0, dtype)) == NotImplemented:
+        if not cast:
+            raise TypeError, "`fill` type not compatible with larry dtype"
+        dtype = np.dtype(float)
+    return dtype
+
+def _narytake(x, idx, fill, out=None):
+    """
+    Align `x` with the index `idx` made by _naryalign.
+    
+    The result is placed in `out` if given (after filling `out` with
+    missing values if `fill` is True); otherwise `x` itself, or a copy when
+    x is not aligned, is returned.
+    
+    """
+    pos = [slice(None)] * x.ndim
+    npos = 0
+    for ax, i in enumerate(idx):
+        if i is not None:
+            x = x.take(i[0], ax)
+            if i[1] is not None:
+                pos[ax] = i[1]
+                npos += 1
+    if out is None:
+        return x
+    if fill:
+        out.fill(missing_marker(out))
+    if npos > 1:
+        pos = [np.arange(n) if isinstance(p, slice) else p
+               for p, n in zip(pos, out.shape)]
+        pos = np.ix_(*pos)
+    out[tuple(pos)] = x
+    return out
 
 # Misc ----------------------------------------------------------------------
 
@@ -1463,10 +1938,12 @@ def panel(lar):
     """
     if lar.ndim != 3:
         raise ValueError, "lar must be 3d."
-    y = lar.copy()
-    y.label = [flattenlabel([y.label[1], y.label[2]])[0], y.label[0]]
-    y.x = y.x.T.reshape(-1, y.shape[0], order="F")
-    return y
+    label = [flattenlabel([lar.label[1], lar.label[2]])[0], list(lar.label[0])]
+    x = lar.x.reshape(lar.shape[0], -1).T.copy()
+    valid = None
+    if lar.valid is not None:
+        valid = lar.valid.reshape(lar.shape[0], -1).T.copy()
+    return larry(x, label, validate=False, valid=valid)
 
 def cov(lar):
     """
@@ -1,23 +1,44 @@
 "larry IO module."
 
 import os
+import time
+import json
+import hashlib
 import datetime
+import threading
+import urllib
 
 import numpy as np
 import h5py
 from la.external.prettytable import indent
 from la.util.misc import randstring
+from la.flabel import label2array, array2label, time2int
 
 from la import larry
 
-__all__ = ['IO', 'save', 'load', 'repack', 'is_archived_larry',
-           'archive_directory']
+__all__ = ['IO', 'save', 'load', 'save_many', 'load_many', 'append',
+           'repack', 'is_archived_larry', 'archive_directory']
+
+# Version of the label layout written by save. Version 1 stored dates as
+# ordinals and times and datetimes as tuples; version 2 stores all three as
+# int64 offsets from the epoch.
+FORMAT_VERSION = 2
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# Name of the root-level group that lists the larrys in the archive, one
+# dataset per larry
+_MANIFEST = '_la_manifest'
+
+# Name of the root-level group that holds the label datasets; larrys link to
+# them so that identical labels are stored once
+_LABELS = '_la_labels'
        
 
 class IO(object):
     "Save and load larrys in HDF5 format using a dictionary-like interface."
     
-    def __init__(self, filename, max_freespace=np.inf):
+    def __init__(self, filename, max_freespace=np.inf, mode=None,
+                 libver=None):
         """
         Save and load larrys in HDF5 format using a dictionary-like interface.
         
@@ -43,7 +64,8 @@ class IO(object):
         dimension of the label (named str(dimension)). For example, a 2d larry
         named 'price' is stored in a group called 'price' that contains a
         dataset called 'x' (the price) and two datasets called '0' and '1'
-        (the labels).
+        (the labels). The validity mask of a larry that has one (see `valid`
+        in larry.__init__) is stored in a second bool dataset named 'valid'.
         
         Before saving, the labels are converted to Numpy arrays, one array for
         each dimension. Therefore, to save a larry in HDF5 format, the
@@ -62,6 +84,19 @@ class IO(object):
             repack. Repack means to transfer all the larrys to a new archive
             (with the same name) and delete the old archive. HDF5 does not
             reuse the freespace across openening and closing of the archive.
+        mode : {None, 'swmr-write', 'swmr-read'}, optional
+            By default (None) the archive is opened for reading and writing.
+            Use 'swmr-write' and 'swmr-read' to have one process append to
+            the archive while other processes read it (HDF5 single writer,
+            multiple reader mode). In 'swmr-write' mode the only way to
+            change the archive is the append method; in 'swmr-read' mode
+            the archive cannot be changed and the refresh method picks up
+            data appended by the writer. See Notes.
+        libver : {None, 'latest'}, optional
+            The HDF5 file format used for objects created in the archive.
+            The default (None) is the most backward compatible format. An
+            archive that will be opened in 'swmr-write' mode must be created
+            with 'latest'.
             
         Returns
         -------
@@ -82,6 +117,13 @@ class IO(object):
           a limitation of the HDF5 format, not a limitation of the IO class
           or h5py. You can repack the archive with the repack method or have
           it done automatically for you: see `freespace` above.
+        - To prepare an archive for single writer, multiple reader (SWMR)
+          access, create it with libver='latest' and save the larrys with
+          IO.save(key, lar, appendable=True). Then open it in 'swmr-write'
+          mode in one process and call append, and open it in 'swmr-read'
+          mode in the other processes and call refresh. The manifest of the
+          archive is not updated in SWMR mode, so repr(io) shows the shapes
+          the larrys had before the writer started appending.
           
         Examples
         -------- 
@@ -121,8 +163,32 @@ class IO(object):
             False             
             
         """   
-        self.f = h5py.File(filename)
+        if mode is None:
+            self.f = h5py.File(filename, libver=libver)
+        elif mode == 'swmr-write':
+            self.f = h5py.File(filename, 'a', libver='latest')
+            try:
+                self.f.swmr_mode = True
+            except ValueError:
+                self.f.close()
+                msg = "The archive must be created with libver='latest' to "
+                msg += "be opened in 'swmr-write' mode."
+                raise ValueError, msg
+        elif mode == 'swmr-read':
+            self.f = h5py.File(filename, 'r', libver='latest', swmr=True)
+        else:
+            msg = "mode must be None, 'swmr-write', or 'swmr-read'."
+            raise ValueError, msg
+        self.mode = mode
         self.max_freespace = max_freespace
+        # Bytes used by datasets in the archive; kept up to date by
+        # __setitem__ and __delitem__ so that freespace does not have to walk
+        # the archive. None means not yet known.
+        self._used = None
+        # Writers hold the lock; a background repack holds it while it
+        # swaps in the repacked archive
+        self._lock = threading.RLock()
+        self._repacker = None
         
     def keys(self):
         "Return a list of larry names (keys) in archive."
@@ -177,9 +243,53 @@ class IO(object):
         """
         lar1 = self[key][:]
         lar2 = lar1.merge(lar, update=update)
-        del self.f[key]
         self[key] = lar2 
 
+    def load(self, key, mmap=False):
+        """
+        Load a larry from the archive.
+        
+        Unlike indexing into the IO object, which returns a lara, a larry is
+        returned. See la.load for details.
+        
+        Parameters
+        ----------
+        key : str
+            Name of larry.
+        mmap : bool, optional
+            If True, the data of the larry is a read-only memory map of the
+            archive file instead of being read into memory. The default is
+            False.
+            
+        Returns
+        -------
+        out : larry
+            Returns the larry from the archive.
+            
+        """
+        return load(self.f, key, mmap=mmap)
+
+    def load_many(self, keys, mmap=False):
+        """
+        Load several larrys from the archive.
+        
+        Parameters
+        ----------
+        keys : list
+            Names of the larrys to load.
+        mmap : bool, optional
+            If True, the data of each larry is a read-only memory map of the
+            archive file instead of being read into memory. The default is
+            False.
+            
+        Returns
+        -------
+        out : list
+            List of larrys in the same order as `keys`.
+            
+        """
+        return load_many(self.f, keys, mmap=mmap)
+
     def __iter__(self):
         return iter(self.keys())
         
@@ -197,35 +307,131 @@ class IO(object):
             raise KeyError, "A larry named %s is not in the archive." % key   
         
     def __setitem__(self, key, value):
+        self.save(key, value)
+        
+    def save(self, key, lar, appendable=False):
+        """
+        Save a larry in the archive, overwriting any item named `key`.
+        
+        Parameters
+        ----------
+        key : str
+            Name of larry.
+        lar : larry
+            Data to save.
+        appendable : bool, optional
+            If True the larry is stored so that data can later be appended
+            to it along any axis with the append method. See la.save. The
+            default is False.
+            
+        """
+        value = lar
         
         # Make sure the data looks OK before saving
         if type(key) != str:
             raise TypeError, 'key must be a string of type str.'        
         if not isinstance(value, larry):
             raise TypeError, 'value must be a larry.'
+        self._check_mode()
         
-        # Does an item (larry or otherwise) with given key already exist? If
-        # so delete. Note that self.f.keys() [all keys] is used instead of
-        # self.keys() [keys that are larrys].
-        if key in self.f.keys():
-            self.__delitem__(key)              
+        with self._lock:
         
-        # If you've made it this far the data looks OK so save it
-        save(self.f, value, key)
+            # Does an item (larry or otherwise) with given key already exist?
+            # If so delete. Note that self.f.keys() [all keys] is used
+            # instead of self.keys() [keys that are larrys].
+            if key in self.f.keys():
+                self.__delitem__(key)              
+            
+            # If you've made it this far the data looks OK so save it
+            nbytes = _save(self.f, value, key, appendable)
+            self.f.flush()
+            if self._used is not None:
+                self._used += nbytes
+            if self._repacker is not None:
+                self._repacker.dirty.add(key)
         
     def __delitem__(self, key):
-        delete(self.f, key)        
-        self._repack_conditional()          
+        self._check_mode()
+        with self._lock:
+            if type(key) != str:
+                raise TypeError, 'key must be a string.'    
+            nbytes = _delete(self.f, key)
+            if self._used is not None:
+                self._used -= nbytes
+            if self._repacker is not None:
+                self._repacker.dirty.add(key)
+            self._repack_conditional()          
+        
+    def append(self, key, lar, axis=-1):
+        """
+        Append a larry along `axis` to a larry in the archive.
+        
+        See la.append for details. This is the only way to change the
+        archive in 'swmr-write' mode.
+        
+        Parameters
+        ----------
+        key : str
+            Name of the archived larry, which must have been saved with
+            appendable=True.
+        lar : larry
+            Data to append.
+        axis : int, optional
+            Axis to append along. The default is the last axis.
+            
+        """
+        if self.mode == 'swmr-read':
+            raise ValueError, "Cannot append in 'swmr-read' mode."
+        with self._lock:
+            append(self.f, lar, key, axis)
+            self._used = None
+            if self._repacker is not None:
+                self._repacker.dirty.add(key)
+            
+    def refresh(self, keys=None):
+        """
+        Pick up data appended by the writer in 'swmr-read' mode.
+        
+        In other modes there is nothing to refresh and nothing is done.
+        
+        Parameters
+        ----------
+        keys : {None, list}, optional
+            Names of the larrys to refresh. By default (None) all larrys in
+            the archive are refreshed.
+            
+        """
+        if self.mode != 'swmr-read':
+            return
+        if keys is None:
+            keys = self.keys()
+        for key in keys:
+            # The writer appends to the data before the labels, so refresh
+            # the labels first to never see more labels than data
+            group = self.f[key]
+            x = group['x']
+            for i in range(len(x.shape)):
+                group[str(i)].refresh()
+            if 'valid' in group:
+                group['valid'].refresh()
+            x.refresh()
+        
+    def _check_mode(self):
+        "Raise if larrys cannot be saved or deleted in the current mode."
+        if self.mode is not None:
+            msg = "Larrys cannot be saved or deleted in '%s' mode."
+            raise ValueError, msg % self.mode
         
     def __repr__(self):
         table = [['larry', 'dtype', 'shape']]
-        keys = self.keys()
+        manifest = _read_manifest(self.f)
+        keys = manifest.keys()
         keys.sort()  # Display in alphabetical order
         for key in keys:
-            # Code would be neater if I wrote shape = str(self[key].shape)
-            # but I don't want to load the array, I just want the shape
-            shape = str(self.f[key]['x'].shape)
-            dtype = str(self.f[key]['x'].dtype)    
+            # The shape and dtype come from the manifest so that neither the
+            # array nor its labels are touched
+            shape = str(tuple(manifest[key]['shape']))
+            dtype = str(manifest[key]['dtype'])
             table.append([key, dtype, shape])         
         return indent(table, hasHeader=True, delim='  ')  
     
@@ -237,27 +443,124 @@ class IO(object):
 
     @property         
     def freespace(self):
-        "The number of bytes of freespace in the archive."
-        self.f.flush()
-        global size
-        size = 0
-        def sizefinder(key, value):
-            "Add size of object to running total"
-            global size
-            if isinstance(value, h5py.Dataset):
-                size += value.id.get_storage_size()
-        self.f.visititems(sizefinder)
-        return self.space - size
-        
-    def repack(self):
-        "Repack archive to remove freespace."
-        self.f = repack(self.f)
+        """
+        The number of bytes of freespace in the archive.
+        
+        The number of bytes used by the datasets in the archive is found by
+        walking the archive the first time freespace is needed. After that it
+        is updated as larrys are saved and deleted through the IO object.
+        
+        """
+        if self._used is None:
+            self._used = _storage_size(self.f)
+        return self.space - self._used
+        
+    def repack(self, background=False):
+        """
+        Repack archive to remove freespace.
+        
+        Parameters
+        ----------
+        background : bool, optional
+            If False (default) the archive is repacked before returning. If
+            True the larrys are copied to a new archive in a background
+            thread while you continue to use the IO object. Larrys that you
+            save or delete in the meantime are copied again at the end. The
+            new archive replaces the old one when no save or delete is in
+            progress.
+            
+        Returns
+        -------
+        thread : {None, threading.Thread}
+            None if `background` is False; otherwise the thread doing the
+            repack. Call its join method to wait for the repack to finish.
+            
+        Notes
+        -----
+        h5py serializes access to HDF5 files, so while the background thread
+        copies a larry, archive access in the foreground waits. Laras
+        obtained from the IO object before the new archive is swapped in can
+        no longer be used after the swap.
+            
+        """
+        self._check_mode()
+        if not background:
+            with self._lock:
+                self._discard_repack()
+                self.f = repack(self.f)
+            return
+        with self._lock:
+            if self._repacker is None:
+                self._repacker = _Repacker(self.f, self._lock)
+        def run():
+            "Copy all larrys then swap in the new archive."
+            with self._lock:
+                if self._repacker is None:
+                    return
+                repacker = self._repacker
+            if repacker.step():
+                self._finish_repack(repacker)
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def repack_incremental(self, maxtime=np.inf, maxbytes=np.inf):
+        """
+        Do a bounded amount of work towards repacking the archive.
+        
+        Each call copies larrys to a new archive until `maxtime` seconds
+        have passed or `maxbytes` bytes of data have been copied. At least
+        one top-level item is copied per call. Larrys that are saved or
+        deleted between calls are copied again at the end. When every larry
+        has been copied, the new archive replaces the old one.
+        
+        Parameters
+        ----------
+        maxtime : scalar, optional
+            Stop copying once this many seconds have passed. The default is
+            no limit.
+        maxbytes : scalar, optional
+            Stop copying once this many bytes of data have been copied. The
+            default is no limit.
+            
+        Returns
+        -------
+        done : bool
+            True if the repack finished (the new archive has been swapped
+            in); False if more calls are needed.
+            
+        """
+        self._check_mode()
+        with self._lock:
+            if self._repacker is None:
+                self._repacker = _Repacker(self.f, self._lock)
+            repacker = self._repacker
+        if repacker.step(maxtime, maxbytes):
+            return self._finish_repack(repacker)
+        return False
+        
+    def _finish_repack(self, repacker):
+        "Copy larrys changed during the repack and swap in the new archive."
+        with self._lock:
+            if repacker is not self._repacker:
+                # A blocking repack was done in the meantime
+                return False
+            self.f = repacker.finish()
+            self._repacker = None
+        return True
+        
+    def _discard_repack(self):
+        "Throw away the new archive of an unfinished repack, if any."
+        if self._repacker is not None:
+            self._repacker.discard()
+            self._repacker = None
         
     def _repack_conditional(self):
         "Repack if `max_freespace` is exceeded."
-        if np.isfinite(self.max_freespace):
-            if self.freespace() > self.max_freespace:
-                self.f = self.repack() 
+        if np.isfinite(self.max_freespace) and self._repacker is None:
+            if self.freespace > self.max_freespace:
+                self.repack() 
                 
     @property    
     def filename(self):
@@ -319,18 +622,32 @@ class lara(object):
         
         """
         self.x = group['x']
+        self.valid = None
+        if 'valid' in group:
+            self.valid = group['valid']
         self.label = _load_label(group, len(self.x.shape))
+        self.label = _trim_label(self.label, self.x.shape)
+        # Data appended in SWMR mode may be ahead of the labels
+        self._clip = self.shape != self.x.shape
+    
+    def __getitem__(self, index):
+        if self._clip:
+            index = _clipindex(index, self.shape)
+        return larry.__getitem__.im_func(self, index)
     
     # Grab these methods from larry    
-    __getitem__ = larry.__getitem__.im_func
     __setitem__ = larry.__setitem__.im_func    
     maxlabel = larry.maxlabel.im_func
     minlabel = larry.minlabel.im_func
     getlabel = larry.getlabel.im_func 
     labelindex = larry.labelindex.im_func
-    shape = larry.shape
     dtype = larry.dtype            
         
+    @property
+    def shape(self):
+        "Shape, from the labels."
+        return tuple([len(lab) for lab in self.label])
+        
     @property
     def ndim(self):
         "Number of dimensions."
@@ -343,7 +660,7 @@ class lara(object):
         
 # Archive functions ---------------------------------------------------------
 
-def save(file, lar, key):
+def save(file, lar, key, appendable=False):
     """
     Save a larry in HDF5 format.
 
@@ -353,7 +670,8 @@ def save(file, lar, key):
     dimension of the label (named str(dimension)). For example, a 2d larry
     named 'price' is stored in a group called 'price' that contains a
     dataset called 'x' (the price) and two datasets called '0' and '1'
-    (the labels).
+    (the labels). The validity mask of a larry that has one (see `valid` in
+    larry.__init__) is stored in a second bool dataset named 'valid'.
     
     Before saving, the labels are converted to Numpy arrays, one array for
     each dimension. Therefore, to save a larry in HDF5 format, the
@@ -361,18 +679,35 @@ def save(file, lar, key):
     and that type must be supported by HDF5.
     
     If all labels along an axis are dates of type datetime.date, then the
-    dates are converted to integers before saving and the HDF5 Dataset used
-    to store that label is assigned an attribute name 'datetime_type' which is set
-    to 'date'. When loading the larry, the dates will automatically be
-    converted back to datetime.date dates.
+    dates are converted to int64 days since 1970-01-01 before saving and the
+    HDF5 Dataset used to store that label is assigned an attribute name
+    'datetime_type' which is set to 'date'. When loading the larry, the dates
+    will automatically be converted back to datetime.date dates.
     
     Similarly, if the labels are of type datetime.time, then we convert to
-    integers and set the attribute to 'date' when saving and automatically
-    convert back to datetime.time when loading.
+    int64 microseconds since midnight and set the attribute to 'time' when
+    saving and automatically convert back to datetime.time when loading.
 
     Finally, if the labels are datetime.datetime then the attribute is set
-    to 'datetime' and the labels are converted to tuples when saving and
-    back to datetime.datetime when loading.
+    to 'datetime' and the labels are converted to int64 microseconds since
+    1970-01-01 when saving and back to datetime.datetime when loading.
+    
+    Each label Dataset is also given a 'format_version' attribute. Archives
+    written by older versions of la (no 'format_version' attribute; dates
+    stored as ordinals, times and datetimes stored as tuples) can still be
+    loaded.
+    
+    The label datasets are stored in a root-level group named '_la_labels'
+    under a hash of their contents, and each larry links to them. A label
+    that is shared by several larrys, such as a common date axis, is
+    therefore stored only once.
+    
+    The archive also keeps a manifest, a root-level group named
+    '_la_manifest', that lists the name, shape, dtype, label dtypes,
+    modification time and size of every larry in the archive. It holds one
+    small dataset per larry, which is written by save and append and
+    removed by delete, and is used to list the contents of the archive
+    without visiting each larry.
     
     Parameters
     ----------
@@ -382,6 +717,11 @@ def save(file, lar, key):
         Data to save.
     key : str
         Name of larry.
+    appendable : bool, optional
+        If True the data and labels are stored in chunked, resizable HDF5
+        datasets so that data can later be appended to the larry with
+        la.append. The labels of an appendable larry are not shared with
+        other larrys. The default (False) stores the data contiguously.
         
     See Also
     --------
@@ -409,24 +749,51 @@ def save(file, lar, key):
     # Get a h5py.File instance
     f, opened = _openfile(file)
     
-    # Do we need to create any intermediate groups?
-    _create_nested_groups(f, key)  
-        
     # Save larry
-    fkey = f[key]
-    fkey.attrs['larry'] = True
-    fkey['x'] = lar.x
-    for i in range(lar.ndim):
-        fkey[str(i)], datetime_type = _list2array(lar.label[i])
-        fkey[str(i)].attrs['datetime_type'] = datetime_type
+    _save(f, lar, key, appendable)
     
     # Close if file is a filename   
     if opened:
         f.close()
     else:
         f.flush()    
+
+def save_many(file, lars):
+    """
+    Save several larrys in HDF5 format, opening the archive only once.
+    
+    See la.save for a description of the archive format.
+    
+    Parameters
+    ----------
+    file : str or h5py.File
+        Filename or h5py.File object of the archive.
+    lars : dict
+        Dictionary of larrys to save. The keys of the dictionary are the
+        names of the larrys.
         
-def load(file, key):
+    See Also
+    --------
+    la.save : Save a larry without a dictionary-like interface.
+    la.load_many : Load several larrys, opening the archive only once.
+        
+    Examples
+    --------
+    >>> lars = {'x': la.larry([1, 2, 3]), 'y': la.larry([4, 5])}
+    >>> la.save_many('/tmp/x.hdf5', lars)
+    
+    """
+    if not isinstance(lars, dict):
+        raise TypeError, 'lars must be a dict of larrys.'
+    f, opened = _openfile(file)
+    for key, lar in lars.iteritems():
+        _save(f, lar, key)
+    if opened:
+        f.close()
+    else:
+        f.flush()
+        
+def load(file, key, mmap=False):
     """
     Load a larry from a HDF5 archive.
 
@@ -444,12 +811,25 @@ def load(file, key):
         Filename or h5py.File object of the archive.
     key : str
         Name of larry.
+    mmap : bool, optional
+        If True, the data of the larry is not read into memory. Instead the
+        data is a read-only memory map of the archive file. Processes that
+        memory map the same larry share one (page cached) copy of the data.
+        Only data stored contiguously and without compression (the way
+        la.save stores it) can be memory mapped. The default (False) is to
+        read the data into memory.
         
     Returns
     ------- 
     out : larry
         Returns the larry from the archive.   
         
+    Raises
+    ------
+    ValueError
+        If `mmap` is True and the data is chunked, compressed, or not yet
+        allocated in the archive.
+        
     See Also
     --------
     la.save : Save larrys without a dictionary-like interface.
@@ -468,10 +848,127 @@ def load(file, key):
     Now load it:
     
     >>> y = la.load('/tmp/x.hdf5', 'x')            
+    
+    Or memory map it:
+    
+    >>> y = la.load('/tmp/x.hdf5', 'x', mmap=True)
  
     """
     
-    # Check input
+    f, opened = _openfile(file)
+    lar = _load(f, key, mmap)
+                     
+    # Close if file is a filename   
+    if opened:
+        f.close()
+        
+    return lar
+
+def load_many(file, keys, mmap=False):
+    """
+    Load several larrys from a HDF5 archive, opening the archive only once.
+    
+    See la.load for a description of the archive format.
+    
+    Parameters
+    ----------
+    file : str or h5py.File
+        Filename or h5py.File object of the archive.
+    keys : list
+        Names of the larrys to load.
+    mmap : bool, optional
+        If True, the data of each larry is a read-only memory map of the
+        archive file instead of being read into memory. See la.load. The
+        default is False.
+        
+    Returns
+    ------- 
+    out : list
+        List of larrys in the same order as `keys`.
+        
+    See Also
+    --------
+    la.load : Load a larry without a dictionary-like interface.
+    la.save_many : Save several larrys, opening the archive only once.
+        
+    Notes
+    -----
+    h5py serializes all access to HDF5 behind a global lock, so the larrys
+    are read one after the other; the time saved comes from opening and
+    closing the archive only once.
+    
+    Labels that are stored once in the archive and shared by several of the
+    larrys are decoded once, and the loaded larrys share the label list.
+    Copy the label before changing it in place.
+        
+    Examples
+    --------
+    >>> lars = {'x': la.larry([1, 2, 3]), 'y': la.larry([4, 5])}
+    >>> la.save_many('/tmp/x.hdf5', lars)
+    >>> x, y = la.load_many('/tmp/x.hdf5', ['x', 'y'])
+    
+    """
+    f, opened = _openfile(file)
+    cache = {}
+    try:
+        lars = [_load(f, key, mmap, cache) for key in keys]
+    finally:
+        if opened:
+            f.close()
+    return lars
+    
+def append(file, lar, key, axis=-1):
+    """
+    Append a larry along `axis` to a larry in a HDF5 archive.
+    
+    The archived larry must have been saved with appendable=True. Along
+    `axis` the labels of `lar` must not already be in the archived larry;
+    along the other axes the labels of `lar` must be the same as those of
+    the archived larry.
+    
+    The data are written before the labels, and readers take the shape of
+    the larry from its labels, so a reader that opened the archive in
+    'swmr-read' mode sees either the larry before or after the append.
+    
+    Parameters
+    ----------
+    file : str or h5py.File
+        Filename or h5py.File object of the archive.
+    lar : larry
+        Data to append.
+    key : str
+        Name of the archived larry.
+    axis : int, optional
+        Axis to append along. The default is the last axis.
+        
+    Raises
+    ------
+    ValueError
+        If the archived larry is not appendable, if `axis` is out of range,
+        if the labels of `lar` do not line up with the archived labels, or if
+        the labels of `lar` do not fit in the archived label dataset (for
+        example, strings that are longer than the longest archived string).
+        
+    See Also
+    --------
+    la.save : Save a larry without a dictionary-like interface.
+    la.IO : A dictionary-like interface to the archive.  
+        
+    Examples
+    --------
+    >>> la.save('/tmp/x.hdf5', la.larry([1, 2]), 'x', appendable=True)
+    >>> la.append('/tmp/x.hdf5', la.larry([3], [[2]]), 'x')
+    >>> la.load('/tmp/x.hdf5', 'x')
+    label_0
+        0
+        1
+        2
+    x
+    array([1, 2, 3])
+    
+    """
+    if type(lar) != larry:
+        raise TypeError, 'lar must be a larry.'
     if type(key) != str:
         raise TypeError, 'key must be a string.'    
     f, opened = _openfile(file)
@@ -479,17 +976,80 @@ def load(file, key):
         raise KeyError, "A larry named '%s' is not in archive." % key
     if not _is_archived_larry(f[key]):
         raise KeyError, 'key (%s) is not a larry.' % key
-        
-    # Load larry    
     group = f[key]
-    x = group['x'][:]
-    label = _load_label(group, x.ndim)                 
-                     
+    x = group['x']
+    ndim = len(x.shape)
+    if lar.ndim != ndim:
+        raise ValueError, 'lar must have the same dimension as archived larry.'
+    if not isinstance(axis, (int, long)):
+        raise TypeError, 'axis must be an integer.'
+    if axis < 0:
+        axis += ndim
+    if axis < 0 or axis >= ndim:
+        raise ValueError, 'axis out of range'
+    if x.maxshape[axis] is not None:
+        raise ValueError, 'The archived larry was not saved as appendable.'    
+    
+    # Check labels
+    for i in range(ndim):
+        arr, datetime_type = label2array(lar.label[i])
+        dset = group[str(i)]
+        if datetime_type != dset.attrs['datetime_type']:
+            msg = 'Label along axis %d is not the same type as in archive.'
+            raise ValueError, msg % i
+        if i != axis:
+            if not np.array_equal(arr, dset[:]):
+                msg = 'Label along axis %d differs from label in archive.'
+                raise ValueError, msg % i
+    labels = group[str(axis)]
+    new, datetime_type = label2array(lar.label[axis])
+    if new.dtype != labels.dtype:
+        if not np.can_cast(new.dtype, labels.dtype):
+            msg = 'Labels (%s) do not fit in the archived labels (%s).'
+            raise ValueError, msg % (new.dtype, labels.dtype)
+    if np.in1d(new, labels[:]).any():
+        raise ValueError, 'Some labels along axis are already in archive.'
+    if 'valid' not in group and lar.valid is not None:
+        if not lar.valid.all():
+            msg = 'lar has missing values marked in its validity mask but '
+            msg += 'the archived larry has no validity mask.'
+            raise ValueError, msg
+            
+    # The mask, then the data, then the labels: readers use only as much
+    # of the data as there are labels, so they never see data that is not
+    # yet written
+    n0 = labels.shape[0]
+    n = n0 + new.shape[0]
+    shape = list(x.shape)
+    shape[axis] = n
+    index = [slice(None)] * ndim
+    index[axis] = slice(n0, n)
+    index = tuple(index)
+    if 'valid' in group:
+        valid = group['valid']
+        valid.resize(shape)
+        if lar.valid is None:
+            valid[index] = True
+        else:
+            valid[index] = lar.valid
+        f.flush()
+    x.resize(shape)
+    x[index] = lar.x
+    f.flush()
+    labels.resize((n,))
+    labels[n0:] = new
+    
+    # No datasets can be created in SWMR mode, so neither can the manifest
+    # entry
+    if not f.swmr_mode:
+        _init_manifest(f)
+        _write_manifest_entry(f, key, group)
+    
     # Close if file is a filename   
     if opened:
         f.close()
-        
-    return larry(x, label)
+    else:
+        f.flush()
     
 def delete(file, key):
     """
@@ -533,13 +1093,9 @@ def delete(file, key):
     if type(key) != str:
         raise TypeError, 'key must be a string.'    
     f, opened = _openfile(file)
-    if key not in f:
-        raise KeyError, "A larry named '%s' is not in archive." % key
-    if not _is_archived_larry(f[key]):
-        raise KeyError, 'key (%s) is not a larry.' % key    
     
     # Delete
-    del f[key]               
+    _delete(f, key)
                      
     # Close if file is a filename   
     if opened:
@@ -566,19 +1122,17 @@ def repack(file):
     f1, opened = _openfile(file) 
     filename1 = f1.filename
     filename2 = filename1 + '_repack_tmp_' + randstring(4)
-    f2 = h5py.File(filename2)
+    f2 = h5py.File(filename2, libver=_libver(f1))
     for key in f1.keys():
-        f1.copy(key, f2)
+        if key != _LABELS:
+            _copy(f1, f2, key)
     f1.close()
     f2.close()
-    filename_tmp = filename1 + '_repack_rename_tmp_' + randstring(4)
-    os.rename(filename1, filename_tmp)
-    os.rename(filename2, filename1) 
+    _swapfile(filename1, filename2)
     if opened:
         f = None  
     else:
         f = h5py.File(filename1)
-    os.remove(filename_tmp)
     return f   
     
 def is_archived_larry(file, key):
@@ -593,58 +1147,466 @@ def is_archived_larry(file, key):
     return answer
     
 def archive_directory(file):
-    "Return a list of the keys (larry names) in the archive."
+    """
+    Return a list of the keys (larry names) in the archive.
+    
+    The keys are read from the manifest of the archive; the larrys
+    themselves are not visited unless the archive was written by a version
+    of la that did not keep a manifest.
+    
+    """
     f, opened = _openfile(file) 
-    keys = []
-    def append_larrys(name, obj):
-        if _is_archived_larry(obj):
-            keys.append(name)
-    f.visititems(append_larrys)
+    keys = _manifest_keys(f)
+    keys.sort()
     if opened:
         f.close()
     return keys            
     
 # Utility functions for internal use ----------------------------------------
 
-def _load_label(group, ndim):
-    "Load larry labels from archive given the hpy5.Group object of the larry."
+def _load_label(group, ndim, cache=None):
+    """
+    Load larry labels from archive given the hpy5.Group object of the larry.
+    
+    If `cache` is a dict, then shared labels are looked up in it (and added
+    to it) so that larrys that share a label dataset in the archive also
+    share the label list.
+    
+    """
     label = []
     for i in range(ndim):
-        labellist = group[str(i)][:].tolist()
-        datetime_type = group[str(i)].attrs['datetime_type']
-        if datetime_type == 'date':
-            labellist = map(datetime.date.fromordinal, labellist)
-        elif datetime_type == 'time':
-            labellist = map(tuple2time, labellist)
-        elif datetime_type == 'datetime':
-            labellist = map(tuple2datetime, labellist)
+        dset = group[str(i)]
+        name = None
+        if cache is not None:
+            name = dset.attrs.get('label_hash')
+            if name in cache:
+                label.append(cache[name])
+                continue
+        datetime_type = dset.attrs['datetime_type']
+        if dset.attrs.get('format_version', 1) < 2:
+            labellist = _array2list_v1(dset[:], datetime_type)
+        else:
+            labellist = array2label(dset[:], datetime_type)
+        if name is not None:
+            cache[name] = labellist
         label.append(labellist)
-    return label                     
-
-def _list2array(x):
-    "Convert list to array if elements are of the same type, raise otherwise."
-    if type(x) != list:
-        raise TypeError, 'x must be a list'
-    type0 = type(x[0])
-    if not all([type(i)==type0 for i in x]):
-        msg = 'Elements of a label along any one dimension must be of the '
-        msg += 'same type.'  
-        raise TypeError, msg
-    datetime_type = 'not_datetime'
-    dtype = None
-    if type0 == datetime.date:
-        x = map(datetime.date.toordinal, x)
-        datetime_type = 'date'
-    elif type0 == datetime.time:
-        x = map(time2tuple, x)
-        datetime_type = 'time'
-        dtype = "i4,i4,i4,i4"
-    elif type0 == datetime.datetime:
-        x = map(datetime2tuple, x)
-        datetime_type = 'datetime'
-        dtype = ','.join(["i4" for i in range(len(x[0]))])
-    return np.asarray(x, dtype=dtype), datetime_type
+    return label
+
+def _array2list_v1(x, datetime_type):
+    "Convert label array (tuple layout of format version 1) to a list."
+    if datetime_type == 'date':
+        x = x.astype(np.int64) - _EPOCH_ORDINAL
+        return x.view('datetime64[D]').tolist()
+    labellist = x.tolist()
+    if datetime_type == 'time':
+        labellist = map(tuple2time, labellist)
+    elif datetime_type == 'datetime':
+        labellist = map(tuple2datetime, labellist)
+    return labellist
+    
+def _mmap_dataset(dset):
+    "Read-only memory map of a contiguous, uncompressed h5py.Dataset."
+    if dset.chunks is not None or dset.compression is not None:
+        msg = 'Only contiguous, uncompressed data can be memory mapped.'
+        raise ValueError, msg
+    if dset.size == 0:
+        return dset[:]
+    dset.file.flush()
+    offset = dset.id.get_offset()
+    if offset is None:
+        raise ValueError, 'Data is not allocated in the archive.'
+    return np.memmap(dset.file.filename, dtype=dset.dtype, mode='r',
+                     offset=offset, shape=dset.shape)
+    
+def _save(f, lar, key, appendable=False):
+    """
+    Save larry in the h5py.File `f` and add it to the manifest; see save.
+    
+    Returns the number of bytes added to the archive.
+    
+    """
+    if type(lar) != larry:
+        raise TypeError, 'lar must be a larry.'
+    if type(key) != str:
+        raise TypeError, 'key must be a string.'    
+    
+    # An archive written by an older version of la gets its manifest before
+    # the new larry is added
+    nbytes = _init_manifest(f)
+    
+    # Do we need to create any intermediate groups?
+    _create_nested_groups(f, key)  
+        
+    # Save larry
+    fkey = f[key]
+    fkey.attrs['larry'] = True
+    if appendable:
+        fillvalue = None
+        if issubclass(lar.dtype.type, np.inexact):
+            fillvalue = np.nan
+        fkey.create_dataset('x', data=lar.x, chunks=True, fillvalue=fillvalue,
+                            maxshape=(None,) * lar.ndim)
+        if lar.valid is not None:
+            fkey.create_dataset('valid', data=lar.valid, chunks=True,
+                                fillvalue=False, maxshape=(None,) * lar.ndim)
+    else:    
+        fkey['x'] = lar.x
+        if lar.valid is not None:
+            fkey['valid'] = lar.valid
+    nbytes += fkey['x'].id.get_storage_size()
+    if lar.valid is not None:
+        nbytes += fkey['valid'].id.get_storage_size()
+    for i in range(lar.ndim):
+        arr, datetime_type = label2array(lar.label[i])
+        if appendable:
+            dset = fkey.create_dataset(str(i), data=arr, chunks=True,
+                                       maxshape=(None,))
+            dset.attrs['datetime_type'] = datetime_type
+            dset.attrs['format_version'] = FORMAT_VERSION
+            created = True
+        else:
+            dset, created = _shared_label(f, arr, datetime_type)
+            fkey[str(i)] = dset
+        if created:
+            nbytes += dset.id.get_storage_size()
+    nbytes += _write_manifest_entry(f, key, fkey)
+    return nbytes
     
+def _delete(f, key):
+    "Delete larry from the h5py.File `f` and the manifest; return bytes freed."
+    if key not in f:
+        raise KeyError, "A larry named '%s' is not in archive." % key
+    if not _is_archived_larry(f[key]):
+        raise KeyError, 'key (%s) is not a larry.' % key    
+    sizes = [-_init_manifest(f)]
+    hashes = set()
+    nested = []
+    def finder(name, obj):
+        "Size of unshared datasets; names of shared labels and nested larrys."
+        if isinstance(obj, h5py.Dataset):
+            if 'label_hash' in obj.attrs:
+                hashes.add(obj.attrs['label_hash'])
+            else:    
+                sizes.append(obj.id.get_storage_size())
+        elif _is_archived_larry(obj):
+            nested.append(name)
+    f[key].visititems(finder)
+    del f[key]
+    
+    # Delete shared labels that are no longer linked to from any larry
+    for name in hashes:
+        dset = f[_LABELS][name]
+        if h5py.h5o.get_info(dset.id).rc == 1:
+            sizes.append(dset.id.get_storage_size())
+            del f[_LABELS][name]
+            
+    sizes.append(_delete_manifest_entry(f, key))
+    for name in nested:
+        sizes.append(_delete_manifest_entry(f, key + '/' + name))
+    return sum(sizes)        
+    
+def _shared_label(f, arr, datetime_type):
+    """
+    Shared label Dataset holding `arr`; create it if it does not exist.
+    
+    Returns the h5py.Dataset and True if it was created, False if an
+    identical label was already in the archive.
+    
+    """
+    h = hashlib.sha1()
+    h.update('%s %s %s %d ' % (arr.dtype.str, arr.shape, datetime_type,
+                                FORMAT_VERSION))
+    h.update(np.ascontiguousarray(arr).tostring())
+    name = h.hexdigest()
+    _create_nested_groups(f, _LABELS)
+    labels = f[_LABELS]
+    if name in labels:
+        return labels[name], False
+    labels[name] = arr
+    dset = labels[name]
+    dset.attrs['datetime_type'] = datetime_type
+    dset.attrs['format_version'] = FORMAT_VERSION
+    dset.attrs['label_hash'] = name
+    return dset, True
+
+def _load(f, key, mmap=False, cache=None):
+    "Load larry from the h5py.File `f`; see load and _load_label."
+    if type(key) != str:
+        raise TypeError, 'key must be a string.'    
+    if key not in f:
+        raise KeyError, "A larry named '%s' is not in archive." % key
+    if not _is_archived_larry(f[key]):
+        raise KeyError, 'key (%s) is not a larry.' % key
+    group = f[key]
+    dset = group['x']
+    label = _load_label(group, len(dset.shape), cache)
+    # An append writes the data before the labels, so only as much data as
+    # there are labels has been written
+    label = _trim_label(label, dset.shape)
+    index = tuple([slice(0, len(lab)) for lab in label])
+    if mmap:
+        x = _mmap_dataset(dset)[index]
+    else:    
+        x = dset[index]
+    valid = None
+    if 'valid' in group:
+        valid = group['valid'][index]
+    return larry(x, label, valid=valid)
+
+def _trim_label(label, shape):
+    """
+    Drop labels that are ahead of the data.
+    
+    Archives written by la 0.5 in SWMR mode have the labels appended before
+    the data, so a reader can see more labels than data.
+    
+    """
+    for i, n in enumerate(shape):
+        if len(label[i]) > n:
+            label[i] = label[i][:n]
+    return label
+
+def _clipindex(index, shape):
+    """
+    Index equivalent to `index` into an array of `shape` that stays within
+    `shape` when used on a larger array (the data of a lara ahead of its
+    labels): negative and open-ended indices are made explicit.
+    
+    """
+    if type(index) is not tuple:
+        index = (index,)
+    if len(index) > len(shape):
+        raise IndexError, 'too many indices'
+    clipped = []
+    for ax, n in enumerate(shape):
+        if ax < len(index):
+            idx = index[ax]
+        else:
+            idx = slice(None)
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(n)
+            if stop < 0:
+                # Running backwards past the first element
+                stop = None
+            idx = slice(start, stop, step)
+        elif isinstance(idx, (list, np.ndarray)):
+            arr = np.asarray(idx)
+            if arr.dtype == bool:
+                if arr.size != n:
+                    raise IndexError, 'index out of range'
+                arr = np.nonzero(arr)[0]
+            elif ((arr < -n) | (arr >= n)).any():
+                raise IndexError, 'index out of range'
+            else:
+                arr = np.where(arr < 0, arr + n, arr)
+            if type(idx) is list:
+                idx = arr.tolist()
+            else:
+                idx = arr
+        else:
+            idx = int(idx)
+            if idx < -n or idx >= n:
+                raise IndexError, 'index out of range'
+            if idx < 0:
+                idx += n
+        clipped.append(idx)
+    return tuple(clipped)
+
+def _copy(f1, f2, key):
+    "Copy item `key` from archive `f1` to `f2`, keeping shared labels shared."
+    obj = f1[key]
+    if isinstance(obj, h5py.Dataset):
+        if 'label_hash' in obj.attrs:
+            name = obj.attrs['label_hash']
+            _create_nested_groups(f2, _LABELS)
+            if name not in f2[_LABELS]:
+                f1.copy(obj, f2[_LABELS], name=name)
+            f2[key] = f2[_LABELS][name]
+        else:
+            f1.copy(obj, f2, name=key)
+    else:
+        group = f2.create_group(key)
+        for name, value in obj.attrs.iteritems():
+            group.attrs[name] = value
+        for name in obj:
+            _copy(f1, f2, key + '/' + name)
+
+def _storage_size(obj):
+    "Number of bytes used by the datasets in a h5py Group or Dataset."
+    if isinstance(obj, h5py.Dataset):
+        return obj.id.get_storage_size()
+    sizes = []
+    def sizefinder(key, value):
+        "Append size of dataset to list of sizes."
+        if isinstance(value, h5py.Dataset):
+            sizes.append(value.id.get_storage_size())
+    obj.visititems(sizefinder)
+    return sum(sizes)
+
+class _Repacker(object):
+    "Copy the items of an archive to a new archive, a few at a time."
+    
+    def __init__(self, f, lock):
+        self.f = f
+        self.lock = lock
+        self.filename2 = f.filename + '_repack_tmp_' + randstring(4)
+        self.f2 = h5py.File(self.filename2, 'w', libver=_libver(f))
+        # The manifest is copied last, by finish; shared labels are copied
+        # along with the larrys that link to them
+        self.todo = [key for key in f.keys() if key not in (_MANIFEST,
+                                                               _LABELS)]
+        self.todo.reverse()
+        # Keys saved or deleted since the repack started
+        self.dirty = set()
+        
+    def step(self, maxtime=np.inf, maxbytes=np.inf):
+        "Copy items until over budget; return True if all are copied."
+        t0 = time.time()
+        nbytes = 0
+        while self.todo:
+            key = self.todo.pop()
+            with self.lock:
+                if key in self.f:
+                    _copy(self.f, self.f2, key)
+                    nbytes += _storage_size(self.f2[key])
+            if (time.time() - t0 >= maxtime) or (nbytes >= maxbytes):
+                break
+        return len(self.todo) == 0
+        
+    def finish(self):
+        "Sync items changed during the repack, swap files, return new File."
+        self.dirty.add(_MANIFEST)
+        for key in self.dirty:
+            if key in self.f2:
+                del self.f2[key]
+            if key in self.f:
+                _copy(self.f, self.f2, key)
+        filename1 = self.f.filename
+        self.f.close()
+        self.f2.close()
+        _swapfile(filename1, self.filename2)
+        return h5py.File(filename1)
+        
+    def discard(self):
+        "Close and remove the new archive."
+        self.f2.close()
+        os.remove(self.filename2)
+
+def _libver(f):
+    "'latest' if archive is in the file format needed for SWMR, else None."
+    if f.id.get_create_plist().get_version()[0] >= 3:
+        return 'latest'
+    return None
+
+def _swapfile(filename1, filename2):
+    "Replace file `filename1` with file `filename2`."
+    filename_tmp = filename1 + '_repack_rename_tmp_' + randstring(4)
+    os.rename(filename1, filename_tmp)
+    os.rename(filename2, filename1) 
+    os.remove(filename_tmp)
+
+def _manifest_key(key):
+    "Normalize key (larry name) to the form used in the manifest."
+    return '/'.join([k for k in key.split('/') if k != ''])
+
+def _manifest_entry(group):
+    "Manifest entry of the archived larry stored in h5py.Group `group`."
+    x = group['x']
+    ndim = len(x.shape)
+    entry = {}
+    entry['shape'] = list(x.shape)
+    entry['dtype'] = str(x.dtype)
+    entry['label_dtypes'] = [str(group[str(i)].dtype) for i in range(ndim)]
+    entry['datetime_types'] = [str(group[str(i)].attrs['datetime_type'])
+                               for i in range(ndim)]
+    entry['modified'] = time.time()
+    entry['nbytes'] = _storage_size(group)
+    return entry
+
+def _manifest_name(key):
+    "Name of the manifest dataset of key (larry name); it cannot hold '/'."
+    return urllib.quote(_manifest_key(key), safe='')
+
+def _has_manifest(f):
+    "True if the archive has a manifest in the current, one-per-larry form."
+    return _MANIFEST in f and isinstance(f[_MANIFEST], h5py.Group)
+
+def _read_manifest(f):
+    """
+    Return the manifest of the archive as a dict keyed by larry name.
+    
+    If the archive has no manifest (it was written by an older version of la)
+    then the manifest is built by visiting every group in the archive.
+    
+    """
+    if _has_manifest(f):
+        manifest = {}
+        for name, dset in f[_MANIFEST].iteritems():
+            manifest[urllib.unquote(str(name))] = json.loads(dset[()])
+        return manifest
+    if _MANIFEST in f:
+        # Development versions of la 0.6 kept the whole manifest in one
+        # JSON dataset
+        manifest = json.loads(f[_MANIFEST][()])
+        return dict([(str(key), value) for key, value in manifest.items()])
+    manifest = {}
+    def append_larrys(name, obj):
+        if _is_archived_larry(obj):
+            manifest[str(name)] = _manifest_entry(obj)
+    f.visititems(append_larrys)
+    return manifest
+
+def _manifest_keys(f):
+    "List of the keys (larry names) in the manifest of the archive."
+    if _has_manifest(f):
+        return [urllib.unquote(str(name)) for name in f[_MANIFEST]]
+    return _read_manifest(f).keys()
+
+def _init_manifest(f):
+    """
+    Give the archive a manifest if it does not have one; see _read_manifest.
+    
+    Returns the number of bytes added to the archive. Nothing is done, and
+    zero returned, if the archive already has a manifest.
+    
+    """
+    if _has_manifest(f):
+        return 0
+    manifest = _read_manifest(f)
+    nbytes = 0
+    if _MANIFEST in f:
+        nbytes -= f[_MANIFEST].id.get_storage_size()
+        del f[_MANIFEST]
+    f.create_group(_MANIFEST)
+    for key, entry in manifest.iteritems():
+        nbytes += _write_manifest_json(f, key, entry)
+    return nbytes
+
+def _write_manifest_entry(f, key, group):
+    """
+    Add or replace the manifest entry of the larry `key` stored in h5py.Group
+    `group`; return the change in the number of bytes used by the manifest.
+    
+    """
+    nbytes = _delete_manifest_entry(f, key)
+    return _write_manifest_json(f, key, _manifest_entry(group)) - nbytes
+
+def _write_manifest_json(f, key, entry):
+    "Store manifest `entry` of `key`; return number of bytes used."
+    dset = f[_MANIFEST].create_dataset(_manifest_name(key),
+                                       data=np.string_(json.dumps(entry)))
+    return dset.id.get_storage_size()
+
+def _delete_manifest_entry(f, key):
+    "Delete the manifest entry of `key`, if any; return number of bytes freed."
+    name = _manifest_name(key)
+    manifest = f[_MANIFEST]
+    if name not in manifest:
+        return 0
+    nbytes = manifest[name].id.get_storage_size()
+    del manifest[name]
+    return nbytes
+
 def _openfile(file):
     """
     Open an archive if input is a path.
@@ -714,4 +1676,3 @@ def time2tuple(t):
 def tuple2time(i):
     "Convert tuple to a datetime.time object."
     return datetime.time(*i)
-    
@@ -0,0 +1,307 @@
+"Deferred evaluation of larry arithmetic"
+
+import numpy as np
+
+from la.deflarry import larry
+from la.flabel import listmap
+
+__all__ = ['lazy']
+
+# Number of elements of each operand that are evaluated at a time. Blocks of
+# this size (512 kB of float64) fit in cache.
+_BLOCK = 65536
+
+
+def lazy(lar):
+    """
+    Defer the evaluation of arithmetic on a larry.
+
+    Arithmetic on the returned object builds an expression instead of
+    computing a result. Call the `compute` method of the expression to
+    evaluate it. Evaluation aligns all the larrys in the expression once
+    (with an inner join, as larry arithmetic does) and then computes the
+    result a block of rows at a time, reusing the block buffers, so no
+    full-size temporary arrays are created.
+
+    Parameters
+    ----------
+    lar : larry
+        The larry to wrap.
+
+    Returns
+    -------
+    expr : LazyLarry
+        An expression that evaluates to `lar`. Supports the operators +, -,
+        *, /, ** (with larrys, LazyLarrys, and scalars), unary - and abs,
+        and the methods log, exp, and sqrt.
+
+    Examples
+    --------
+    >>> a = la.larry([1.0, 2.0, 3.0])
+    >>> b = la.larry([3.0, 2.0], [[2, 1]])
+    >>> expr = (la.lazy(a) - b) * 2
+    >>> expr.compute()
+    label_0
+        1
+        2
+    x
+    array([ 0.,  0.])
+
+    """
+    if isinstance(lar, LazyLarry):
+        return lar
+    if not isinstance(lar, larry):
+        raise TypeError, 'lar must be a larry.'
+    return LazyLarry(None, [lar])
+
+
+class LazyLarry(object):
+    "Expression of larrys whose evaluation is deferred until compute."
+
+    def __init__(self, op, args):
+        # op is a ufunc (or None for a leaf that holds one larry); args are
+        # LazyLarrys and scalars (or the larry for a leaf)
+        self.op = op
+        self.args = args
+
+    # Unary functions --------------------------------------------------------
+
+    def __neg__(self):
+        return LazyLarry(np.negative, [self])
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return LazyLarry(np.absolute, [self])
+
+    def abs(self):
+        "Absolute value, evaluated lazily."
+        return LazyLarry(np.absolute, [self])
+
+    def log(self):
+        "Natural logarithm, evaluated lazily."
+        return LazyLarry(np.log, [self])
+
+    def exp(self):
+        "Exponential, evaluated lazily."
+        return LazyLarry(np.exp, [self])
+
+    def sqrt(self):
+        "Square root, evaluated lazily."
+        return LazyLarry(np.sqrt, [self])
+
+    # Binary functions -------------------------------------------------------
+
+    def __binary(self, op, other, reverse=False):
+        if isinstance(other, larry):
+            other = lazy(other)
+        elif not (isinstance(other, LazyLarry) or np.isscalar(other)):
+            raise TypeError, 'Input must be scalar, larry, or LazyLarry.'
+        if reverse:
+            return LazyLarry(op, [other, self])
+        return LazyLarry(op, [self, other])
+
+    def __add__(self, other):
+        return self.__binary(np.add, other)
+
+    def __radd__(self, other):
+        return self.__binary(np.add, other, True)
+
+    def __sub__(self, other):
+        return self.__binary(np.subtract, other)
+
+    def __rsub__(self, other):
+        return self.__binary(np.subtract, other, True)
+
+    def __mul__(self, other):
+        return self.__binary(np.multiply, other)
+
+    def __rmul__(self, other):
+        return self.__binary(np.multiply, other, True)
+
+    def __div__(self, other):
+        return self.__binary(np.divide, other)
+
+    def __rdiv__(self, other):
+        return self.__binary(np.divide, other, True)
+
+    def __truediv__(self, other):
+        return self.__binary(np.true_divide, other)
+
+    def __rtruediv__(self, other):
+        return self.__binary(np.true_divide, other, True)
+
+    def __pow__(self, other):
+        return self.__binary(np.power, other)
+
+    def __rpow__(self, other):
+        return self.__binary(np.power, other, True)
+
+    # Evaluation -------------------------------------------------------------
+
+    def compute(self):
+        """
+        Evaluate the expression.
+
+        Returns
+        -------
+        lar : larry
+            The result, the same (up to floating point round off) as the
+            result of evaluating the expression eagerly with larrys.
+
+        """
+        leaves = self._leaves([])
+        ndim = leaves[0].ndim
+        for lar in leaves:
+            if lar.ndim != ndim:
+                msg = 'Binary operation on two larrys with different dimension'
+                raise IndexError, msg
+        label, index = _align(leaves)
+        shape = tuple([len(lab) for lab in label])
+
+        # The dtype of the result (and of every intermediate) comes from
+        # evaluating the expression on empty arrays
+        empty = [np.empty((0,) * ndim, dtype=lar.dtype) for lar in leaves]
+        inputs = _Inputs(self, leaves, empty, [False] * len(leaves))
+        dtype = self._evaluate(inputs)[0].dtype
+
+        x = np.empty(shape, dtype=dtype)
+        if x.size > 0:
+            nrow = max(1, _BLOCK // max(1, x[0].size))
+            for i0 in xrange(0, shape[0], nrow):
+                i1 = min(i0 + nrow, shape[0])
+                blocks = []
+                owned = []
+                for lar, idx in zip(leaves, index):
+                    block, own = _block(lar.x, idx, i0, i1)
+                    blocks.append(block)
+                    owned.append(own)
+                inputs = _Inputs(self, leaves, blocks, owned)
+                self._evaluate(inputs, out=x[i0:i1])
+        return larry(x, label, validate=False)
+
+    def _leaves(self, leaves):
+        "Append the distinct larrys of the expression to `leaves`."
+        if self.op is None:
+            lar = self.args[0]
+            if not [1 for z in leaves if z is lar]:
+                leaves.append(lar)
+        else:
+            for arg in self.args:
+                if isinstance(arg, LazyLarry):
+                    arg._leaves(leaves)
+        return leaves
+
+    def _evaluate(self, inputs, out=None):
+        """
+        Evaluate the expression on a block; return (array, owned).
+
+        An owned array is a temporary that may be overwritten.
+
+        """
+        if self.op is None:
+            a, own = inputs.get(self.args[0])
+            if out is not None:
+                out[...] = a
+                return out, True
+            return a, own
+        arrays = []
+        temps = []
+        for arg in self.args:
+            if isinstance(arg, LazyLarry):
+                a, own = arg._evaluate(inputs)
+                arrays.append(a)
+                if own:
+                    temps.append(a)
+            else:
+                arrays.append(arg)
+        if out is None:
+            # Reuse the buffer of a temporary that has the right dtype
+            shape = np.broadcast(*arrays).shape
+            dtype = _result_dtype(self.op, arrays)
+            for t in temps:
+                if t.shape == shape and t.dtype == dtype:
+                    out = t
+                    break
+        if out is None:
+            return self.op(*arrays), True
+        self.op(*arrays, out=out)
+        return out, True
+
+    def __repr__(self):
+        leaves = self._leaves([])
+        return '<LazyLarry expression of %d larrys>' % len(leaves)
+
+
+class _Inputs(object):
+    "The blocks of the larrys of an expression, found by identity."
+
+    def __init__(self, expr, leaves, blocks, owned):
+        self.index = dict([(id(lar), i) for i, lar in enumerate(leaves)])
+        self.blocks = blocks
+        self.owned = owned
+        self.count = [0] * len(leaves)
+        for lar in _leafnodes(expr, []):
+            self.count[self.index[id(lar)]] += 1
+
+    def get(self, lar):
+        i = self.index[id(lar)]
+        # A block may be overwritten only if it is a copy that no other
+        # part of the expression will read
+        own = self.owned[i] and self.count[i] == 1
+        return self.blocks[i], own
+
+
+def _leafnodes(expr, leaves):
+    "Append the larry of every leaf of the expression, repeats included."
+    if expr.op is None:
+        leaves.append(expr.args[0])
+    else:
+        for arg in expr.args:
+            if isinstance(arg, LazyLarry):
+                _leafnodes(arg, leaves)
+    return leaves
+
+def _align(leaves):
+    "Common label of larrys (inner join) and, per larry, indices per axis."
+    label = []
+    for ax in range(leaves[0].ndim):
+        lab = leaves[0].label[ax]
+        if [1 for lar in leaves if lar.label[ax] != lab]:
+            common = frozenset(lab)
+            for lar in leaves:
+                common = common & frozenset(lar.label[ax])
+            lab = sorted(common)
+        label.append(list(lab))
+    index = []
+    for lar in leaves:
+        idx = []
+        for ax in range(lar.ndim):
+            if lar.label[ax] == label[ax]:
+                idx.append(None)
+            else:
+                idx.append(np.array(listmap(lar.label[ax], label[ax]),
+                                    dtype=np.intp))
+        index.append(idx)
+    return label, index
+
+def _block(x, idx, i0, i1):
+    "Rows i0 to i1 of the aligned `x`; return (block, owned)."
+    if [1 for i in idx if i is not None]:
+        rows = np.arange(i0, i1) if idx[0] is None else idx[0][i0:i1]
+        ix = [rows]
+        for ax, i in enumerate(idx[1:]):
+            ix.append(np.arange(x.shape[ax + 1]) if i is None else i)
+        return x[np.ix_(*ix)], True
+    return x[i0:i1], False
+
+def _result_dtype(op, arrays):
+    "dtype of op applied to `arrays`."
+    args = []
+    for a in arrays:
+        if isinstance(a, np.ndarray):
+            args.append(np.empty((0,) * a.ndim, dtype=a.dtype))
+        else:
+            args.append(a)
+    return op(*args).dtype
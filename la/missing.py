@@ -62,6 +62,26 @@ def nans(shape, dtype=float):
     msg += 'fill value.'
     raise TypeError, msg
 
+def float_dtype(dtype):
+    """
+    The float dtype of the results of NaN-aware math on data of `dtype`.
+    
+    Float dtypes (float32, for example) are preserved so that float32 input
+    gives float32 output and temporaries; all other dtypes give float64.
+    
+    Examples
+    --------
+    >>> float_dtype(np.float32)
+    dtype('float32')
+    >>> float_dtype(int)
+    dtype('float64')
+    
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return dtype
+    return np.dtype(np.float64)
+
 def missing_marker(data):
     """
     Missing value marker, which is based on dtype, for the given data.
@@ -119,8 +139,9 @@ def ismissing(data):
     -------
     arr : Numpy ndarray
         The result is a bool Numpy array that contains the value True if the
-        corresponding element in `lar` is missing; otherwise False. The shape
-        of `arr` is the same as `lar`.
+        corresponding element in `lar` is missing (or, for a larry with a
+        validity mask, is marked missing in the mask); otherwise False. The
+        shape of `arr` is the same as `lar`.
 
     Examples
     --------         
@@ -139,19 +160,23 @@ def ismissing(data):
     array([ True], dtype=bool)
     >>> ismissing(la.larry([la.nan, 1.0]))
     array([ True, False], dtype=bool)
+    >>> ismissing(la.larry([1, 2], valid=[True, False]))
+    array([False,  True], dtype=bool)
     
     """
     mm = missing_marker(data)
     if mm == NotImplemented:
         arr = np.empty(data.shape, dtype=bool)
         arr.fill(False)
-        return arr
     else:
         if isinstance(data, la.larry):
             x = data.x
         else:
             x = data        
         if mm != mm:
-            return np.isnan(x)
+            arr = np.isnan(x)
         else:
-            return x == [mm]                    
+            arr = x == [mm]
+    if isinstance(data, la.larry) and data.valid is not None:
+        arr |= ~data.valid
+    return arr
@@ -0,0 +1,510 @@
+"larry archive in a directory of Numpy .npy files; does not need h5py."
+
+import os
+import json
+import shutil
+from cStringIO import StringIO
+
+import numpy as np
+from numpy.lib import format as npformat
+from la.external.prettytable import indent
+from la.util.misc import randstring
+from la.flabel import label2array, array2label
+
+from la import larry
+
+__all__ = ['NpyIO']
+
+# Name of the file that marks a directory as an archived larry
+HEADER = 'header.json'
+
+# Version of the layout written by save
+FORMAT_VERSION = 1
+
+
+class NpyIO(object):
+    "Save and load larrys in a directory of .npy files; dict-like interface."
+
+    def __init__(self, dirname):
+        """
+        Save and load larrys in a directory of .npy files; dict-like interface.
+
+        An archive is a directory. Each larry is stored in a subdirectory
+        (named by the key of the larry) that contains the data in 'x.npy',
+        one label file for each dimension ('0.npy', '1.npy', ...), and a
+        small JSON header, 'header.json'. For example, a 2d larry named
+        'price' is stored in the directory 'price' that contains 'x.npy',
+        '0.npy', '1.npy' and 'header.json'. Keys that contain '/' give
+        nested directories. The validity mask of a larry that has one (see
+        `valid` in larry.__init__) is stored in 'valid.npy'.
+
+        Unlike la.IO, the archive format needs only Numpy; h5py is not used.
+        Loading is fast, since there is little overhead per larry, and the
+        data is memory mapped by default, so loading does not copy it and
+        processes that load the same larry share one (page cached) copy.
+
+        Labels are converted to Numpy arrays the same way as in la.IO:
+        the elements of a label along any one dimension must be of the same
+        type; dates, times and datetimes are stored as int64 offsets from
+        the epoch.
+
+        Parameters
+        ----------
+        dirname : str
+            The path to the archive directory. If the directory does not
+            exist, it will be created.
+
+        Returns
+        -------
+            A dictionary-like NpyIO object.
+
+        See Also
+        --------
+        la.IO : A dictionary-like interface to a HDF5 archive.
+
+        Notes
+        -----
+        - Saving writes the larry to a temporary directory that is then
+          renamed. Readers therefore never see a partly written larry.
+        - Data can be appended along the last axis of larrys saved with
+          appendable=True; see the append method. Only one process at a time
+          may write to a larry.
+        - Values are larrys (with memory mapped data), not laras as in
+          la.IO, since loading a memory mapped larry does not read the data.
+
+        Examples
+        --------
+        >>> import la
+        >>> io = la.NpyIO('/tmp/archive')
+        >>> io['x'] = la.larry([1, 2, 3])  # <-- Save
+        >>> io
+        larry  dtype  shape
+        ------------------
+        x      int64  (3,)
+        >>> y = io['x']  # <-- Load
+        >>> del io['x']  # <-- Delete
+
+        """
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self.dirname = dirname
+
+    def keys(self):
+        "Return a list of larry names (keys) in archive."
+        return archive_directory(self.dirname)
+
+    def values(self):
+        "Return a list of larry objects (values) in archive."
+        return [self[key] for key in self]
+
+    def items(self):
+        "Return a list of all (key, value) pairs."
+        return [(key, self[key]) for key in self]
+
+    def iterkeys(self):
+        "An iterator over the keys."
+        for key in self:
+            yield key
+
+    def itervalues(self):
+        "An iterator over the values."
+        for key in self:
+            yield self[key]
+
+    def iteritems(self):
+        "An iterator over (key, value) items."
+        for key in self:
+            yield (key, self[key])
+
+    def has_key(self, key):
+        "True if key is in archive, False otherwise."
+        return key in self
+
+    def clear(self):
+        """
+        Warning: this will delete all larrys from the archive!
+        """
+        for key in self:
+            if key in self:
+                self.__delitem__(key)
+
+    def load(self, key, mmap=True):
+        """
+        Load a larry from the archive.
+
+        Parameters
+        ----------
+        key : str
+            Name of larry.
+        mmap : bool, optional
+            If True (default), the data of the larry is a read-only memory
+            map of the file in the archive. If False the data is read into
+            memory.
+
+        Returns
+        -------
+        out : larry
+            Returns the larry from the archive.
+
+        """
+        return load(self.dirname, key, mmap=mmap)
+
+    def save(self, key, lar, appendable=False):
+        """
+        Save a larry in the archive, overwriting any larry named `key`.
+
+        Parameters
+        ----------
+        key : str
+            Name of larry.
+        lar : larry
+            Data to save.
+        appendable : bool, optional
+            If True, data can later be appended along the last axis of the
+            larry with the append method. The default is False.
+
+        """
+        save(self.dirname, lar, key, appendable=appendable)
+
+    def append(self, key, lar):
+        """
+        Append a larry along the last axis to a larry in the archive.
+
+        See la.npyio.append for details.
+
+        Parameters
+        ----------
+        key : str
+            Name of the archived larry, which must have been saved with
+            appendable=True.
+        lar : larry
+            Data to append.
+
+        """
+        append(self.dirname, lar, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return _is_archived_larry(_larrydir(self.dirname, key))
+
+    def __getitem__(self, key):
+        return load(self.dirname, key)
+
+    def __setitem__(self, key, value):
+        if type(key) != str:
+            raise TypeError, 'key must be a string of type str.'
+        if not isinstance(value, larry):
+            raise TypeError, 'value must be a larry.'
+        save(self.dirname, value, key)
+
+    def __delitem__(self, key):
+        delete(self.dirname, key)
+
+    def __repr__(self):
+        table = [['larry', 'dtype', 'shape']]
+        for key in self.keys():
+            filename = os.path.join(_larrydir(self.dirname, key), 'x.npy')
+            shape, fortran_order, dtype, offset = _read_npy_header(filename)
+            table.append([key, str(dtype), str(shape)])
+        return indent(table, hasHeader=True, delim='  ')
+
+# Archive functions ---------------------------------------------------------
+
+def save(dirname, lar, key, appendable=False):
+    """
+    Save a larry in a directory of .npy files.
+
+    See la.NpyIO for a description of the archive format.
+
+    Parameters
+    ----------
+    dirname : str
+        Path of the archive directory.
+    lar : larry
+        Data to save. The data cannot be of dtype object.
+    key : str
+        Name of larry.
+    appendable : bool, optional
+        If True the data is stored in Fortran (column-major) order so that
+        data can later be appended along the last axis with
+        la.npyio.append. The default (False) stores the data as is.
+
+    """
+    if type(lar) != larry:
+        raise TypeError, 'lar must be a larry.'
+    if type(key) != str:
+        raise TypeError, 'key must be a string.'
+    if lar.dtype == object:
+        raise TypeError, 'larrys of dtype object cannot be saved.'
+    path = _larrydir(dirname, key)
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    # Write to a temporary directory that is renamed when complete
+    tmp = os.path.join(parent, '.tmp_' + randstring(8))
+    os.mkdir(tmp)
+    try:
+        x = lar.x
+        if appendable:
+            x = np.asfortranarray(x)
+        np.save(os.path.join(tmp, 'x.npy'), x)
+        if lar.valid is not None:
+            np.save(os.path.join(tmp, 'valid.npy'), lar.valid)
+        datetime_types = []
+        for i in range(lar.ndim):
+            arr, datetime_type = label2array(lar.label[i])
+            np.save(os.path.join(tmp, '%d.npy' % i), arr)
+            datetime_types.append(datetime_type)
+        header = {'larry': True,
+                  'format_version': FORMAT_VERSION,
+                  'ndim': lar.ndim,
+                  'datetime_types': datetime_types,
+                  'appendable': appendable}
+        fid = open(os.path.join(tmp, HEADER), 'w')
+        json.dump(header, fid)
+        fid.close()
+    except:
+        shutil.rmtree(tmp)
+        raise
+    _replacedir(tmp, path)
+
+def load(dirname, key, mmap=True):
+    """
+    Load a larry from a directory of .npy files.
+
+    Parameters
+    ----------
+    dirname : str
+        Path of the archive directory.
+    key : str
+        Name of larry.
+    mmap : bool, optional
+        If True (default), the data of the larry is a read-only memory map
+        of the file in the archive. If False the data is read into memory.
+
+    Returns
+    -------
+    out : larry
+        Returns the larry from the archive.
+
+    """
+    path, header = _open(dirname, key)
+    filename = os.path.join(path, 'x.npy')
+    x = None
+    if mmap:
+        try:
+            x = np.load(filename, mmap_mode='r')
+        except ValueError:
+            # Empty arrays cannot be memory mapped
+            pass
+    if x is None:
+        x = np.load(filename)
+    valid = None
+    filename = os.path.join(path, 'valid.npy')
+    if os.path.isfile(filename):
+        valid = np.load(filename)
+
+    # The labels are loaded after the data. append writes the labels before
+    # it makes the data longer, so there are never more data than labels.
+    label = []
+    for i, datetime_type in enumerate(header['datetime_types']):
+        arr = np.load(os.path.join(path, '%d.npy' % i))
+        label.append(array2label(arr[:x.shape[i]], datetime_type))
+    return larry(x, label, valid=valid)
+
+def append(dirname, lar, key):
+    """
+    Append a larry along the last axis to a larry in a .npy archive.
+
+    The archived larry must have been saved with appendable=True. Along the
+    last axis the labels of `lar` must not already be in the archived larry;
+    along the other axes the labels of `lar` must be the same as those of
+    the archived larry.
+
+    The data are written to the end of 'x.npy', then the label file is
+    replaced, and finally the shape in the header of 'x.npy' is updated.
+    A reader loading the larry during an append sees the larry either
+    before or after the append.
+
+    Parameters
+    ----------
+    dirname : str
+        Path of the archive directory.
+    lar : larry
+        Data to append.
+    key : str
+        Name of the archived larry.
+
+    Raises
+    ------
+    ValueError
+        If the archived larry is not appendable, if the labels of `lar` do
+        not line up with the archived labels, if the data of `lar` cannot
+        be safely cast to the dtype of the archived larry, or if `lar` or
+        the archived larry has a validity mask (masks cannot be appended).
+
+    """
+    if type(lar) != larry:
+        raise TypeError, 'lar must be a larry.'
+    path, header = _open(dirname, key)
+    if not header['appendable']:
+        raise ValueError, 'The archived larry was not saved as appendable.'
+    ndim = header['ndim']
+    if lar.ndim != ndim:
+        raise ValueError, 'lar must have the same dimension as archived larry.'
+    if lar.valid is not None or os.path.isfile(os.path.join(path,
+                                                            'valid.npy')):
+        raise ValueError, 'Validity masks cannot be appended.'
+    axis = ndim - 1
+
+    # Check labels
+    labels = []
+    for i in range(ndim):
+        arr, datetime_type = label2array(lar.label[i])
+        if datetime_type != header['datetime_types'][i]:
+            msg = 'Label along axis %d is not the same type as in archive.'
+            raise ValueError, msg % i
+        archived = np.load(os.path.join(path, '%d.npy' % i))
+        if i != axis:
+            if not np.array_equal(arr, archived):
+                msg = 'Label along axis %d differs from label in archive.'
+                raise ValueError, msg % i
+        else:
+            if np.in1d(arr, archived).any():
+                msg = 'Some labels along axis are already in archive.'
+                raise ValueError, msg
+            labels = [archived, arr]
+
+    # Append data to the end of x.npy without touching its header
+    filename = os.path.join(path, 'x.npy')
+    shape, fortran_order, dtype, offset = _read_npy_header(filename)
+    if not np.can_cast(lar.dtype, dtype):
+        msg = 'Cannot cast data of dtype %s to archived dtype %s.'
+        raise ValueError, msg % (lar.dtype, dtype)
+    fid = open(filename, 'r+b')
+    try:
+        fid.seek(offset + int(np.prod(shape)) * dtype.itemsize)
+        fid.write(lar.x.astype(dtype).tostring(order='F'))
+        fid.truncate()
+    finally:
+        fid.close()
+
+    # Replace label file
+    filename_label = os.path.join(path, '%d.npy' % axis)
+    tmp = os.path.join(path, '.tmp_%s.npy' % randstring(8))
+    np.save(tmp, np.concatenate(labels))
+    os.rename(tmp, filename_label)
+
+    # Update shape in header of x.npy
+    shape = list(shape)
+    shape[axis] += lar.shape[axis]
+    _write_npy_shape(filename, tuple(shape), fortran_order, dtype, offset)
+
+def delete(dirname, key):
+    """
+    Delete a larry from a directory of .npy files.
+
+    Parameters
+    ----------
+    dirname : str
+        Path of the archive directory.
+    key : str
+        Name of larry.
+
+    """
+    path, header = _open(dirname, key)
+    trash = os.path.join(os.path.dirname(path), '.trash_' + randstring(8))
+    os.rename(path, trash)
+    shutil.rmtree(trash)
+
+def archive_directory(dirname):
+    "Return a sorted list of the keys (larry names) in the archive."
+    keys = []
+    for root, dirnames, filenames in os.walk(dirname):
+        # Skip temporary directories of saves in progress
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        if HEADER in filenames:
+            key = os.path.relpath(root, dirname)
+            keys.append('/'.join(key.split(os.sep)))
+    keys.sort()
+    return keys
+
+# Utility functions for internal use ----------------------------------------
+
+def _larrydir(dirname, key):
+    "Path of the directory that holds the larry named `key`."
+    return os.path.join(dirname, *[k for k in key.split('/') if k != ''])
+
+def _is_archived_larry(path):
+    "True if the directory `path` holds an archived larry."
+    return os.path.isfile(os.path.join(path, HEADER))
+
+def _open(dirname, key):
+    "Path and header of archived larry; raise KeyError if key not a larry."
+    if type(key) != str:
+        raise TypeError, 'key must be a string.'
+    path = _larrydir(dirname, key)
+    if not _is_archived_larry(path):
+        raise KeyError, "A larry named '%s' is not in archive." % key
+    fid = open(os.path.join(path, HEADER))
+    try:
+        header = json.load(fid)
+    finally:
+        fid.close()
+    return path, header
+
+def _replacedir(tmp, path):
+    "Rename directory `tmp` to `path`, replacing `path` if it exists."
+    if os.path.exists(path):
+        trash = os.path.join(os.path.dirname(path), '.trash_' + randstring(8))
+        os.rename(path, trash)
+        os.rename(tmp, path)
+        shutil.rmtree(trash)
+    else:
+        os.rename(tmp, path)
+
+def _read_npy_header(filename):
+    "Shape, fortran_order, dtype and data offset of .npy file."
+    fid = open(filename, 'rb')
+    try:
+        version = npformat.read_magic(fid)
+        if version == (1, 0):
+            shape, fortran_order, dtype = npformat.read_array_header_1_0(fid)
+        else:
+            shape, fortran_order, dtype = npformat.read_array_header_2_0(fid)
+        offset = fid.tell()
+    finally:
+        fid.close()
+    return shape, fortran_order, dtype, offset
+
+def _write_npy_shape(filename, shape, fortran_order, dtype, offset):
+    "Change the shape in the header of .npy file; data start at `offset`."
+    d = {'descr': npformat.dtype_to_descr(dtype),
+         'fortran_order': fortran_order,
+         'shape': shape}
+    buf = StringIO()
+    npformat.write_array_header_1_0(buf, d)
+    header = buf.getvalue()
+    if len(header) == offset:
+        fid = open(filename, 'r+b')
+        try:
+            fid.write(header)
+        finally:
+            fid.close()
+    else:
+        # The new header is not the same size as the old one (rare, since
+        # the header is padded); rewrite the file
+        order = 'F' if fortran_order else 'C'
+        x = np.memmap(filename, dtype=dtype, mode='r', offset=offset,
+                      shape=shape, order=order)
+        tmp = os.path.join(os.path.dirname(filename),
+                           '.tmp_%s.npy' % randstring(8))
+        np.save(tmp, x)
+        del x
+        os.rename(tmp, filename)
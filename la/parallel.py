@@ -0,0 +1,139 @@
+"Apply a function to the slices of an array on a pool of processes"
+
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+# Per worker state: the input and output arrays (views of shared memory),
+# the function, and its keyword arguments. Set by _init when the worker
+# starts.
+_state = None
+
+
+def apply_along_axis(func, x, axis, processes=None, **kwargs):
+    """
+    Apply `func` to the 1d slices of `x` along `axis` in parallel.
+
+    `x` is copied once into shared memory that the worker processes inherit;
+    workers are sent only the ranges of slices to work on and write their
+    results into a shared output array. Neither `x` nor the results are
+    pickled.
+
+    Parameters
+    ----------
+    func : function
+        Takes a 1d array (and `kwargs`) and returns either a 1d array of the
+        same length or a scalar.
+    x : ndarray
+        Input array; must not have an object dtype.
+    axis : int
+        The axis along which `func` is applied.
+    processes : {int, None}, optional
+        Number of worker processes. The default (None) is the number of
+        CPUs.
+    **kwargs : keyword arguments, optional
+        Passed to `func`.
+
+    Returns
+    -------
+    y : ndarray
+        The shape of `x` if `func` returns arrays; the shape of `x` without
+        `axis` if `func` returns scalars.
+
+    Notes
+    -----
+    The dtype of `y` is that of the result of `func` on the first slice;
+    the results of the other slices are cast to it. So a `func` that
+    returns an int for the first slice and floats for others gives
+    truncated results. Results with a flexible dtype (strings, unicode,
+    records) are not supported since their size could differ from slice to
+    slice.
+
+    """
+    if x.dtype == object:
+        raise TypeError, 'x cannot have an object dtype.'
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if axis < 0:
+        axis += x.ndim
+    if axis < 0 or axis >= x.ndim:
+        raise ValueError, 'axis out of range'
+    n = x.shape[axis]
+    shape = x.shape[:axis] + x.shape[axis + 1:]
+    m = int(np.prod(shape, dtype=np.int64))
+
+    # One slice per row of a 2d array in shared memory
+    xraw = _rawarray(x.dtype, (m, n))
+    xs = _view(*xraw)
+    xs[...] = np.rollaxis(x, axis, x.ndim).reshape(m, n)
+    if m == 0:
+        first = np.asarray(func(np.zeros(n, x.dtype), **kwargs))
+    else:
+        first = np.asarray(func(xs[0], **kwargs))
+    if first.dtype.kind in 'SUVO':
+        raise TypeError, 'func cannot return strings or objects.'
+    scalar = first.ndim == 0
+    if not scalar and first.shape != (n,):
+        msg = 'func must return a scalar or an array of the input length.'
+        raise ValueError, msg
+    if m == 0:
+        return np.empty(shape if scalar else x.shape, first.dtype)
+    yraw = _rawarray(first.dtype, (m, 1 if scalar else n))
+    ys = _view(*yraw)
+    ys[0] = first
+
+    # The workers get the shared memory itself, not views of it: where
+    # workers are spawned rather than forked (Windows) the initializer
+    # arguments are pickled, and a pickled view is a private copy
+    state = (xraw, yraw, func, kwargs)
+    if processes == 1 or m == 1:
+        try:
+            _init(*state)
+            _apply((1, m))
+        finally:
+            _reset()
+    else:
+        pool = multiprocessing.Pool(processes, _init, state)
+        try:
+            pool.map(_apply, _chunks(1, m, 4 * processes))
+        finally:
+            pool.close()
+            pool.join()
+
+    if scalar:
+        return ys.reshape(shape).copy()
+    y = ys.reshape(shape + (n,))
+    return np.rollaxis(y, x.ndim - 1, axis).copy()
+
+def _rawarray(dtype, shape):
+    "(shared memory, dtype, shape) of an empty array in shared memory."
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+    raw = RawArray(ctypes.c_char, max(1, nbytes))
+    return raw, dtype, shape
+
+def _view(raw, dtype, shape):
+    "Array of given dtype and shape that is a view of shared memory `raw`."
+    size = int(np.prod(shape, dtype=np.int64))
+    return np.frombuffer(raw, dtype, size).reshape(shape)
+
+def _chunks(start, stop, nchunk):
+    "Split range(start, stop) into at most `nchunk` (i0, i1) ranges."
+    step = max(1, -(-(stop - start) // nchunk))
+    return [(i, min(i + step, stop)) for i in xrange(start, stop, step)]
+
+def _init(xraw, yraw, func, kwargs):
+    global _state
+    _state = (_view(*xraw), _view(*yraw), func, kwargs)
+
+def _reset():
+    "Drop the state so the shared memory and `func` can be freed."
+    global _state
+    _state = None
+
+def _apply(chunk):
+    xs, ys, func, kwargs = _state
+    for i in xrange(*chunk):
+        ys[i] = func(xs[i], **kwargs)
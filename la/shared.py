@@ -0,0 +1,184 @@
+"""
+Share larrys between processes through named shared memory segments.
+
+The module needs a POSIX system (hard links, fchmod, and files that can be
+unlinked while mapped); on other systems larry_to_shm raises
+NotImplementedError.
+
+"""
+
+import os
+import errno
+import tempfile
+
+import numpy as np
+
+from la.deflarry import larry, _tobytes
+
+__all__ = ['larry_to_shm', 'attach', 'unlink', 'names']
+
+# Segments are files in a memory backed file system when there is one
+if os.path.isdir('/dev/shm'):
+    _DIR = '/dev/shm'
+else:
+    _DIR = tempfile.gettempdir()
+_PREFIX = 'la-'
+_POSIX = hasattr(os, 'link') and hasattr(os, 'fchmod')
+
+
+def larry_to_shm(lar, name, mode=0600):
+    """
+    Copy a larry into a named shared memory segment.
+
+    The segment holds the larry in the encoding of larry.tobytes: the
+    labels, compactly encoded, followed by the data, `x`. Any process on
+    the machine can then use `attach` to get a read-only larry whose data
+    is a view of the segment; no copy of the data is made.
+
+    The segment is created atomically: a process that attaches to `name`
+    sees either no segment or the complete larry.
+
+    Parameters
+    ----------
+    lar : larry
+        The larry to share. Its data must not have an object dtype.
+    name : str
+        The name of the segment; it cannot contain '/'.
+    mode : int, optional
+        The permission bits of the segment. The default (0600) lets only
+        processes of the same user attach; use, for example, 0644 to let
+        all users attach.
+
+    Raises
+    ------
+    ValueError
+        If a segment with the given name already exists.
+    NotImplementedError
+        If the system is not POSIX (for example, Windows).
+
+    See Also
+    --------
+    la.shared.attach: Attach to a larry in a shared memory segment.
+    la.shared.unlink: Remove the name of a shared memory segment.
+
+    Notes
+    -----
+    Segments are files in /dev/shm (or, where there is no /dev/shm, in the
+    temporary directory). A segment persists until it is unlinked: call
+    `unlink` when the larry is no longer to be shared. The memory of an
+    unlinked segment is released by the operating system when the last
+    larry attached to it is deleted (the operating system counts the
+    references), so unlinking a segment that is in use is safe.
+
+    Examples
+    --------
+    >>> from la import shared
+    >>> shared.larry_to_shm(larry([1.0, 2.0], [['a', 'b']]), 'prices')
+    >>> lar = shared.attach('prices')
+    >>> lar
+    label_0
+        a
+        b
+    x
+    array([ 1.,  2.])
+    >>> shared.unlink('prices')
+
+    """
+    if not _POSIX:
+        raise NotImplementedError, 'la.shared needs a POSIX system.'
+    if not isinstance(lar, larry):
+        raise TypeError, 'lar must be a larry.'
+    if lar.dtype.hasobject:
+        raise TypeError, 'larrys with object dtype cannot be shared.'
+    path = _path(name)
+    fd, tmp = tempfile.mkstemp(prefix='.' + _PREFIX, dir=_DIR)
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            os.fchmod(fd, mode)
+            head, x = _tobytes(lar)
+            f.write(head)
+            f.truncate(len(head) + x.nbytes)
+        finally:
+            f.close()
+        if x.size > 0:
+            mm = np.memmap(tmp, x.dtype, 'r+', len(head), x.shape)
+            mm[...] = x
+            mm.flush()
+            del mm
+        # link, unlike rename, fails if `name` exists
+        try:
+            os.link(tmp, path)
+        except OSError, e:
+            if e.errno == errno.EEXIST:
+                raise ValueError, "segment '%s' already exists" % name
+            raise
+    finally:
+        os.unlink(tmp)
+
+def attach(name):
+    """
+    Attach to a larry in a named shared memory segment.
+
+    Parameters
+    ----------
+    name : str
+        The name of a segment made by `larry_to_shm`.
+
+    Returns
+    -------
+    lar : larry
+        A larry whose data, `x`, is a read-only view of the segment. The
+        labels are decoded into (ordinary) lists. The segment stays mapped
+        as long as `lar` (or any view of its data) exists.
+
+    Raises
+    ------
+    KeyError
+        If there is no segment with the given name.
+
+    See Also
+    --------
+    la.shared.larry_to_shm: Copy a larry into a named shared memory segment.
+
+    """
+    path = _path(name)
+    if not os.path.isfile(path):
+        raise KeyError, "no segment named '%s'" % name
+    buf = np.memmap(path, np.uint8, 'r')
+    return larry.frombytes(buf)
+
+def unlink(name):
+    """
+    Remove the name of a shared memory segment.
+
+    Larrys already attached to the segment keep working; its memory is
+    released when the last of them is deleted.
+
+    Raises
+    ------
+    KeyError
+        If there is no segment with the given name.
+
+    """
+    try:
+        os.unlink(_path(name))
+    except OSError, e:
+        if e.errno == errno.ENOENT:
+            raise KeyError, "no segment named '%s'" % name
+        raise
+
+def names():
+    "Sorted list of the names of the shared memory segments."
+    names = []
+    for f in os.listdir(_DIR):
+        if f.startswith(_PREFIX):
+            names.append(f[len(_PREFIX):])
+    names.sort()
+    return names
+
+def _path(name):
+    "File of the segment `name`."
+    if not isinstance(name, basestring) or not name or '/' in name:
+        raise ValueError, "name must be a nonempty str without '/'"
+    return os.path.join(_DIR, _PREFIX + name)
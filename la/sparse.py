@@ -0,0 +1,712 @@
+"Sparse labeled array class"
+
+import numpy as np
+
+from la.deflarry import larry, slicemaker
+from la.flabel import listmap, listmap_fill
+from la.missing import ismissing, nans
+from la.util.misc import isscalar
+
+__all__ = ['SparseLarry']
+
+
+class SparseLarry(object):
+    """
+    Labeled array that only stores its non-missing values.
+
+    A SparseLarry has the same label as the larry it represents but stores
+    only the values that are not missing, together with their positions
+    (flat, row-major indices) in the dense array. Missing values take no
+    memory and are skipped by all operations, so a mostly-missing panel is
+    both smaller and faster to work with than the equivalent larry.
+
+    Missing values follow the larry rules: arithmetic with a missing value
+    gives a missing value and reductions ignore missing values.
+
+    """
+
+    def __init__(self, data, index, label, validate=True):
+        """
+        Sparse labeled array.
+
+        Parameters
+        ----------
+        data : array_like
+            The non-missing values, a 1d array.
+        index : array_like
+            The positions of the values in `data` given as flat, row-major
+            (C order) indices into the dense array. `index` must be strictly
+            increasing.
+        label : list of lists
+            The label along each axis, as for a larry. The shape of the
+            dense array is given by the lengths of the label.
+        validate : bool, optional
+            Check that the input is valid (default). If you know the input is
+            valid you can skip the check (which takes time) by setting
+            `validate` to False.
+
+        Examples
+        --------
+        >>> SparseLarry([1.0, 2.0], [0, 3], [['a', 'b'], ['c', 'd']])
+        label_0
+            a
+            b
+        label_1
+            c
+            d
+        data (2 of 4 values present)
+        array([ 1.,  2.])
+        index
+        array([0, 3])
+
+        """
+        self.data = np.asarray(data).reshape(-1)
+        self.index = np.asarray(index, dtype=np.int64).reshape(-1)
+        self.label = label
+        if validate:
+            if type(label) != list:
+                raise TypeError, 'label must be a list of lists.'
+            for lab in label:
+                if type(lab) != list:
+                    raise TypeError, 'label must be a list of lists.'
+                if len(frozenset(lab)) != len(lab):
+                    raise ValueError, 'Elements of label not unique.'
+            if len(label) == 0:
+                raise ValueError, 'label must contain at least one axis.'
+            if self.data.shape != self.index.shape:
+                raise ValueError, 'data and index must have the same length.'
+            if self.index.size > 0:
+                if (self.index[0] < 0) or (self.index[-1] >= self.size):
+                    raise IndexError, 'index is out of range.'
+                if (np.diff(self.index) <= 0).any():
+                    raise ValueError, 'index must be strictly increasing.'
+
+    # Conversion -------------------------------------------------------------
+
+    @staticmethod
+    def fromlarry(lar):
+        """
+        Convert a larry to a SparseLarry.
+
+        Parameters
+        ----------
+        lar : larry
+            The larry to convert. Its missing values (see
+            `la.missing.ismissing`) are dropped.
+
+        Returns
+        -------
+        slar : SparseLarry
+            The sparse form of `lar`.
+
+        Examples
+        --------
+        >>> from la import nan
+        >>> lar = larry([[1.0, nan], [nan, 2.0]])
+        >>> slar = SparseLarry.fromlarry(lar)
+        >>> slar.data
+        array([ 1.,  2.])
+        >>> slar.index
+        array([0, 3])
+
+        """
+        x = lar.x.reshape(-1)
+        index = np.flatnonzero(~ismissing(x))
+        return SparseLarry(x[index], index, lar.copylabel(), validate=False)
+
+    def tolarry(self):
+        """
+        Convert to a dense larry; missing values are filled in.
+
+        The dtype of the larry is that of the data unless the dtype has no
+        missing value marker (int and bool, for example), in which case the
+        larry is float.
+
+        Examples
+        --------
+        >>> slar = SparseLarry([1.0, 2.0], [0, 3], [['a', 'b'], ['c', 'd']])
+        >>> slar.tolarry()
+        label_0
+            a
+            b
+        label_1
+            c
+            d
+        x
+        array([[  1.,  NaN],
+               [ NaN,   2.]])
+
+        """
+        dtype = self.dtype
+        if dtype.kind in 'biu':
+            dtype = np.float64
+        x = nans(self.shape, dtype=dtype)
+        x.reshape(-1)[self.index] = self.data
+        return larry(x, self.copylabel(), validate=False)
+
+    # Size, shape, type ------------------------------------------------------
+
+    @property
+    def shape(self):
+        "Shape of the dense array as a tuple."
+        return tuple([len(lab) for lab in self.label])
+
+    @property
+    def ndim(self):
+        "Number of dimensions."
+        return len(self.label)
+
+    @property
+    def size(self):
+        "Number of elements, missing or not, in the dense array."
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def nnz(self):
+        "Number of non-missing values."
+        return self.data.size
+
+    @property
+    def density(self):
+        "Fraction of the elements of the dense array that are not missing."
+        if self.size == 0:
+            return 0.0
+        return self.nnz / float(self.size)
+
+    @property
+    def dtype(self):
+        "The dtype of the data."
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        "Number of bytes used by the data and the index (not the label)."
+        return self.data.nbytes + self.index.nbytes
+
+    # Copy -------------------------------------------------------------------
+
+    def copy(self):
+        "Return a copy of the SparseLarry."
+        return SparseLarry(self.data.copy(), self.index.copy(),
+                           self.copylabel(), validate=False)
+
+    def copylabel(self):
+        "Return a copy of the label."
+        return [list(lab) for lab in self.label]
+
+    # Unary functions --------------------------------------------------------
+
+    def __neg__(self):
+        return SparseLarry(-self.data, self.index.copy(), self.copylabel(),
+                           validate=False)
+
+    def __pos__(self):
+        return self.copy()
+
+    def __abs__(self):
+        return SparseLarry(np.abs(self.data), self.index.copy(),
+                           self.copylabel(), validate=False)
+
+    abs = __abs__
+
+    # Binary functions -------------------------------------------------------
+
+    def __binary(self, other, op):
+        "Binary operation; values are present only where both are present."
+        if isinstance(other, larry):
+            other = SparseLarry.fromlarry(other)
+        if isinstance(other, SparseLarry):
+            slar1, slar2 = self.__align(other)
+            index, i1, i2 = _intersect(slar1.index, slar2.index, slar1.size)
+            data = op(slar1.data[i1], slar2.data[i2])
+            label = slar1.label
+        elif np.isscalar(other):
+            index = self.index
+            data = op(self.data, other)
+            label = self.copylabel()
+        else:
+            raise TypeError, 'Input must be scalar, larry, or SparseLarry.'
+        return _dropmissing(data, index, label)
+
+    def __align(self, other):
+        "Align SparseLarrys for binary operations (inner join)."
+        if self.ndim != other.ndim:
+            msg = 'Binary operation on two larrys with different dimension'
+            raise IndexError, msg
+        slar1 = self
+        slar2 = other
+        for ax, (ls, lo) in enumerate(zip(self.label, other.label)):
+            if ls != lo:
+                lab = list(frozenset(ls) & frozenset(lo))
+                lab.sort()
+                slar1 = slar1.morph(lab, ax)
+                slar2 = slar2.morph(lab, ax)
+        return slar1, slar2
+
+    def __add__(self, other):
+        """
+        Sum a SparseLarry with another SparseLarry, larry, or scalar.
+
+        If two SparseLarrys are added then they are joined with an inner
+        join (i.e., the intersection of the labels). The sum is missing
+        where either value is missing.
+
+        """
+        return self.__binary(other, np.add)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        "Subtract a SparseLarry, larry, or scalar."
+        return self.__binary(other, np.subtract)
+
+    def __rsub__(self, other):
+        "Right subtract a SparseLarry, larry, or scalar."
+        return self.__binary(other, lambda x, y: np.subtract(y, x))
+
+    def __mul__(self, other):
+        "Multiply a SparseLarry with another SparseLarry, larry, or scalar."
+        return self.__binary(other, np.multiply)
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        "Divide by a SparseLarry, larry, or scalar."
+        return self.__binary(other, np.divide)
+
+    def __rdiv__(self, other):
+        "Right divide by a SparseLarry, larry, or scalar."
+        return self.__binary(other, lambda x, y: np.divide(y, x))
+
+    def __truediv__(self, other):
+        "Divide by a SparseLarry, larry, or scalar."
+        return self.__binary(other, np.true_divide)
+
+    def __rtruediv__(self, other):
+        "Right divide by a SparseLarry, larry, or scalar."
+        return self.__binary(other, lambda x, y: np.true_divide(y, x))
+
+    def __pow__(self, other):
+        "Raise to the power of a SparseLarry, larry, or scalar."
+        return self.__binary(other, np.power)
+
+    # Reduce functions -------------------------------------------------------
+
+    def sum(self, axis=None):
+        """
+        Sum of values along axis, ignoring missing values.
+
+        Parameters
+        ----------
+        axis : {None, integer}, optional
+            Axis to sum along or sum over all (None, default).
+
+        Returns
+        -------
+        d : {SparseLarry, scalar}
+            When axis is an integer a SparseLarry is returned. When axis is
+            None (default) a scalar is returned. The sum of only missing
+            values is missing (NaN), as it is for a larry.
+
+        """
+        return self.__reduce(axis, 'sum')
+
+    def mean(self, axis=None):
+        "Mean of values along axis, ignoring missing values."
+        return self.__reduce(axis, 'mean')
+
+    def var(self, axis=None):
+        "Variance (ddof=0) of values along axis, ignoring missing values."
+        return self.__reduce(axis, 'var')
+
+    def std(self, axis=None):
+        "Standard deviation (ddof=0) along axis, ignoring missing values."
+        return self.__reduce(axis, 'std')
+
+    def min(self, axis=None):
+        "Minimum of values along axis, ignoring missing values."
+        return self.__reduce(axis, 'min')
+
+    def max(self, axis=None):
+        "Maximum of values along axis, ignoring missing values."
+        return self.__reduce(axis, 'max')
+
+    def count(self, axis=None):
+        "Number of non-missing values along axis."
+        return self.__reduce(axis, 'count')
+
+    def __reduce(self, axis, func):
+        if axis is None or self.ndim == 1:
+            if axis not in (None, 0, -1):
+                raise ValueError, 'axis out of range'
+            return _reduce_all(self.data, func)
+        if not isscalar(axis):
+            raise ValueError, 'axis should be an integer or None'
+        if axis < 0:
+            axis += self.ndim
+        if (axis < 0) or (axis >= self.ndim):
+            raise ValueError, 'axis out of range'
+        codes = list(self._codes())
+        codes.pop(axis)
+        label = self.copylabel()
+        label.pop(axis)
+        shape = [len(lab) for lab in label]
+        key = np.ravel_multi_index(codes, shape)
+        data = self.data
+        if axis != self.ndim - 1:
+            # Group the values that reduce to the same element
+            order = key.argsort(kind='mergesort')
+            key = key[order]
+            data = data[order]
+        start = np.flatnonzero(np.diff(key)) + 1
+        start = np.concatenate(([0], start)) if key.size else start
+        index = key[start]
+        data = _reduce_groups(data, start, func)
+        return _dropmissing(data, index, label)
+
+    # Alignment --------------------------------------------------------------
+
+    def morph(self, label, axis):
+        """
+        Reorder the elements along specified axis to match the given label.
+
+        Elements of `label` that are not in the SparseLarry are missing;
+        elements of the SparseLarry that are not in `label` are dropped.
+
+        Parameters
+        ----------
+        label : list
+            The desired label along `axis`.
+        axis : int
+            The axis along which to morph.
+
+        Returns
+        -------
+        slar : SparseLarry
+            A morphed copy of the SparseLarry.
+
+        """
+        label = list(label)
+        if label == self.label[axis]:
+            return self.copy()
+        positions = [None] * self.ndim
+        positions[axis] = listmap_fill(self.label[axis], label, fill=-1)[0]
+        newlabel = [None] * self.ndim
+        newlabel[axis] = label
+        return self._take(positions, newlabel)
+
+    def morph_like(self, lar):
+        "Morph to match the label of a larry or SparseLarry."
+        if self.ndim != lar.ndim:
+            raise IndexError, 'Must have the same number of dimensions.'
+        slar = self
+        for ax in range(self.ndim):
+            slar = slar.morph(lar.label[ax], ax)
+        return slar
+
+    def align(self, other, join='inner'):
+        """
+        Align two SparseLarrys using one of four join methods.
+
+        Parameters
+        ----------
+        other : {SparseLarry, larry}
+            The other array to align with.
+        join : {'inner', 'outer', 'left', 'right'}, optional
+            The join method. The default is 'inner'.
+
+        Returns
+        -------
+        slar1 : SparseLarry
+            The aligned version of `self`.
+        slar2 : SparseLarry
+            The aligned version of `other`.
+
+        """
+        if isinstance(other, larry):
+            other = SparseLarry.fromlarry(other)
+        if self.ndim != other.ndim:
+            raise IndexError, 'Must have the same number of dimensions.'
+        slar1 = self
+        slar2 = other
+        for ax in range(self.ndim):
+            l1 = self.label[ax]
+            l2 = other.label[ax]
+            if l1 == l2:
+                continue
+            if join == 'inner':
+                lab = sorted(frozenset(l1) & frozenset(l2))
+            elif join == 'outer':
+                lab = sorted(frozenset(l1) | frozenset(l2))
+            elif join == 'left':
+                lab = l1
+            elif join == 'right':
+                lab = l2
+            else:
+                raise ValueError, 'join type not recognized'
+            slar1 = slar1.morph(lab, ax)
+            slar2 = slar2.morph(lab, ax)
+        return slar1, slar2
+
+    def merge(self, other, update=False):
+        """
+        Merge, or optionally update, a SparseLarry with a second SparseLarry.
+
+        Parameters
+        ----------
+        other : {SparseLarry, larry}
+            The array to merge or to use to update the values.
+        update : {False, True}, optional
+            Raise a ValueError (default) if there is any overlap in the two
+            arrays. An overlap is defined as a common label in both arrays
+            that contains a value in both arrays. If `update` is True then
+            the overlapping values are overwritten with the values in
+            `other`.
+
+        Returns
+        -------
+        slar : SparseLarry
+            The merged SparseLarry.
+
+        """
+        if isinstance(other, larry):
+            other = SparseLarry.fromlarry(other)
+        if self.ndim != other.ndim:
+            raise IndexError, 'larrys must be of the same dimension.'
+        slar1, slar2 = self.align(other, join='outer')
+        index, i1, i2 = _intersect(slar1.index, slar2.index, slar1.size)
+        if (not update) and (index.size > 0):
+            raise ValueError('Overlapping values')
+        keep = np.ones(slar1.nnz, dtype=bool)
+        keep[i1] = False
+        index = np.concatenate((slar1.index[keep], slar2.index))
+        data = np.concatenate((slar1.data[keep], slar2.data))
+        order = index.argsort(kind='mergesort')
+        return SparseLarry(data[order], index[order], slar1.copylabel(),
+                           validate=False)
+
+    # Get and set ------------------------------------------------------------
+
+    def labelindex(self, name, axis):
+        "Return index of given label element along specified axis."
+        try:
+            return self.label[axis].index(name)
+        except ValueError:
+            raise ValueError, 'Could not find name in label.'
+
+    @property
+    def lix(self):
+        """
+        Index into a SparseLarry using labels, as with larry.lix.
+
+        Examples
+        --------
+        >>> slar = SparseLarry([1.0, 2.0], [0, 3], [['a', 'b'], ['c', 'd']])
+        >>> slar.lix[['b'], ['d']]
+        2.0
+        >>> slar.lix[['a']:].shape
+        (2, 2)
+
+        """
+        return _SparseGetitemlabel(self)
+
+    def _codes(self):
+        "Position along each axis of each value."
+        return np.unravel_index(self.index, self.shape)
+
+    def _take(self, positions, newlabel=None, squeeze=()):
+        """
+        Take positions (None keeps the axis as is; -1 is missing) per axis.
+
+        The label along an axis is taken from `newlabel`, a list with one
+        entry (a list or None) per axis, if given; otherwise it is taken
+        from the positions, which then must not be missing. Axes listed in
+        `squeeze` must have exactly one position and are removed from the
+        result.
+
+        """
+        if newlabel is None:
+            newlabel = [None] * self.ndim
+        codes = list(self._codes())
+        keep = None
+        label = []
+        for ax, pos in enumerate(positions):
+            if pos is None:
+                label.append(list(self.label[ax]))
+                continue
+            pos = np.asarray(pos, dtype=np.int64).reshape(-1)
+            remap = -np.ones(self.shape[ax], dtype=np.int64)
+            present = pos >= 0
+            remap[pos[present]] = np.flatnonzero(present)
+            codes[ax] = remap[codes[ax]]
+            k = codes[ax] >= 0
+            keep = k if keep is None else keep & k
+            if newlabel[ax] is None:
+                lab = self.label[ax]
+                label.append([lab[p] for p in pos.tolist()])
+            else:
+                label.append(list(newlabel[ax]))
+        data = self.data
+        if keep is not None:
+            data = data[keep]
+            codes = [c[keep] for c in codes]
+        for ax in sorted(squeeze, reverse=True):
+            codes.pop(ax)
+            label.pop(ax)
+        if len(label) == 0:
+            if data.size == 0:
+                return np.nan
+            return data[0]
+        shape = [len(lab) for lab in label]
+        index = np.ravel_multi_index(codes, shape)
+        if index.size > 1 and (np.diff(index) <= 0).any():
+            order = index.argsort()
+            index = index[order]
+            data = data[order]
+        return SparseLarry(data, index, label, validate=False)
+
+    # Print ------------------------------------------------------------------
+
+    def __repr__(self):
+        x = []
+        pad = '    '
+        for i, label in enumerate(self.label):
+            x.append('label_%d\n' % i)
+            if len(label) > 10:
+                for l in label[:3]:
+                    x.append(pad + str(l) + '\n')
+                x.append(pad + '...\n')
+                for l in label[-3:]:
+                    x.append(pad + str(l) + '\n')
+            else:
+                for l in label:
+                    x.append(pad + str(l) + '\n')
+        x.append('data (%d of %d values present)\n' % (self.nnz, self.size))
+        x.append(repr(self.data) + '\n')
+        x.append('index\n')
+        x.append(repr(self.index))
+        return ''.join(x)
+
+
+# Support functions ----------------------------------------------------------
+
+def _intersect(index1, index2, size=None):
+    """
+    Common elements of two sorted, unique index arrays and their positions.
+
+    If `size`, the size of the dense array, is given and is not much larger
+    than the number of indices then the common elements are found with a
+    bool mask of length `size`, which is faster than searching.
+
+    """
+    if index1.size == 0 or index2.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    if size is not None and size <= _MASK_RATIO * (index1.size + index2.size):
+        mask = np.zeros(size, dtype=bool)
+        mask[index2] = True
+        pos1 = np.flatnonzero(mask[index1])
+        index = index1[pos1]
+        pos2 = np.searchsorted(index2, index)
+        return index, pos1, pos2
+    i1 = np.searchsorted(index2, index1)
+    i1 = np.minimum(i1, index2.size - 1)
+    match = index2[i1] == index1
+    pos1 = np.flatnonzero(match)
+    pos2 = i1[match]
+    return index1[pos1], pos1, pos2
+
+# _intersect uses a bool mask when the dense size is at most this many times
+# the number of indices
+_MASK_RATIO = 64
+
+def _dropmissing(data, index, label):
+    "SparseLarry from data and index with the missing values removed."
+    miss = ismissing(data)
+    if miss.any():
+        keep = ~miss
+        data = data[keep]
+        index = index[keep]
+    return SparseLarry(data, index, label, validate=False)
+
+def _reduce_all(data, func):
+    "Reduce all values in `data` to a scalar; missing if there are none."
+    if func == 'count':
+        return data.size
+    if data.size == 0:
+        return np.nan
+    if func == 'sum':
+        return data.sum()
+    elif func == 'mean':
+        return data.mean()
+    elif func == 'var':
+        return data.var()
+    elif func == 'std':
+        return data.std()
+    elif func == 'min':
+        return data.min()
+    elif func == 'max':
+        return data.max()
+    raise ValueError, 'Unknown reduction %s' % func
+
+def _reduce_groups(data, start, func):
+    "Reduce consecutive groups of `data` that begin at indices `start`."
+    count = np.diff(np.append(start, data.size))
+    if func == 'count':
+        return count
+    if func == 'min':
+        return np.minimum.reduceat(data, start)
+    if func == 'max':
+        return np.maximum.reduceat(data, start)
+    total = np.add.reduceat(data, start)
+    if func == 'sum':
+        return total
+    mean = total / count.astype(np.float64)
+    if func == 'mean':
+        return mean
+    dev = data - mean.repeat(count)
+    var = np.add.reduceat(dev * dev, start) / count
+    if func == 'var':
+        return var
+    if func == 'std':
+        return np.sqrt(var)
+    raise ValueError, 'Unknown reduction %s' % func
+
+
+class _SparseGetitemlabel(object):
+    "Utility class for the SparseLarry lix method."
+
+    def __init__(self, slar):
+        self.slar = slar
+
+    def __getitem__(self, index):
+        slar = self.slar
+        if type(index) != tuple:
+            index = (index,)
+        if len(index) > slar.ndim:
+            raise IndexError, 'Invalid index'
+        index = list(index) + [slice(None)] * (slar.ndim - len(index))
+        positions = []
+        squeeze = []
+        for ax, idx in enumerate(index):
+            typ = type(idx)
+            if typ == list:
+                try:
+                    pos = listmap(slar.label[ax], idx)
+                except KeyError:
+                    raise ValueError, 'Could not map label to index value.'
+                if len(idx) == 1:
+                    squeeze.append(ax)
+            elif typ == slice:
+                if idx == slice(None):
+                    pos = None
+                else:
+                    s = slicemaker(idx, slar.labelindex, ax)
+                    pos = range(*s.indices(slar.shape[ax]))
+            elif isscalar(idx):
+                pos = [idx % slar.shape[ax]]
+                squeeze.append(ax)
+            else:
+                raise IndexError, 'Unsupported indexing operation.'
+            positions.append(pos)
+        return slar._take(positions, squeeze=squeeze)
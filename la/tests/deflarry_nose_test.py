@@ -3,13 +3,17 @@
 from __future__ import with_statement
 
 import os
+import sys
 import tempfile
+import cPickle
+import datetime
 from copy import deepcopy
 from StringIO import StringIO
 
 import numpy as np
 nan = np.nan
-from numpy.testing import assert_, assert_equal
+from numpy.testing import (assert_, assert_equal, assert_raises,
+                           assert_array_almost_equal)
 
 from la import larry
 from la.util.testing import (printfail, noreference, nocopy)
@@ -512,6 +516,7 @@ def test_binary_regression():
 #             fromtuples, totuples
 #             fromlist,   tolist
 #             fromdict,   todict 
+#             frombytes,  tobytes
 #
 # Make sure that larrys don't change after a round trip:
 
@@ -536,7 +541,29 @@ def test_conversion():
         y2 = y2.maplabel(int) # labels loaded as strings; convert to int
         os.unlink(filename)
         yield ale, y1, y2, msg % ('csv', str(shape)), False                
+        y2 = larry.frombytes(y1.copy().tobytes())
+        yield ale, y1, y2, msg % ('bytes', str(shape)), False
+        y2 = cPickle.loads(cPickle.dumps(y1, cPickle.HIGHEST_PROTOCOL))
+        yield ale, y1, y2, msg % ('pickle', str(shape)), False
         
+def test_itertuples():
+    "Test lar.itertuples() and lar.iteritems()"
+    lar = larry([[1.0, nan, 3.0], [4.0, 5.0, nan]],
+                [['a', 'b'], ['c', 'd', 'e']])
+    actual = list(lar.itertuples(batchsize=2, skipna=True))
+    desired = [[('a', 'c', 1.0)], [('a', 'e', 3.0), ('b', 'c', 4.0)],
+               [('b', 'd', 5.0)]]
+    yield assert_equal, actual, desired, 'itertuples failed'
+    actual = list(lar.iteritems(skipna=True))
+    desired = [(('a', 'c'), 1.0), (('a', 'e'), 3.0), (('b', 'c'), 4.0),
+               (('b', 'd'), 5.0)]
+    yield assert_equal, actual, desired, 'iteritems failed'
+    actual = [row[:2] for row in lar.itertuples()]
+    desired = [('a', 'c'), ('a', 'd'), ('a', 'e'), ('b', 'c'), ('b', 'd'),
+               ('b', 'e')]
+    yield assert_equal, actual, desired, 'itertuples failed'
+    assert_raises(ValueError, list, lar.itertuples(batchsize=0))
+
 # tofile does not yet have a from file, so it cannot be tested with the
 # roundtrip method above. (Besides it only supports 1d and 2d larrys).
 # Test separately:
@@ -560,6 +587,141 @@ def test_tofile():
     desired = ',c1,c2\nr1,1,2\nr2,3,4\n'
     yield assert_equal, actual, desired, "tofile failed on 2d input"
 
+    # fmt and nanrep
+    f = StringIO()
+    lar = larry([[1.0, nan], [3.0, 4.5]], [['r1', 'r2'], ['c1', 'c2']])
+    lar.tofile(f, delimiter=';', fmt='%.2f', nanrep='NA')
+    actual = f.getvalue()
+    desired = ';c1;c2\nr1;1.00;NA\nr2;3.00;4.50\n'
+    yield assert_equal, actual, desired, "tofile failed with fmt and nanrep"
+
+def test_tocsv():
+    "Test lar.tocsv()"
+    filename = tempfile.mktemp(suffix='.csv', prefix='la_csv_unittest')
+    lar = larry([[1.0, nan], [3.0, 0.1]], [['a,b', 'c'], [1, 2]])
+    lar.tocsv(filename)
+    actual = open(filename).read()
+    desired = '"a,b",1,1.0\r\n"a,b",2,nan\r\nc,1,3.0\r\nc,2,0.1\r\n'
+    yield assert_equal, actual, desired, "tocsv failed"
+    lar.tocsv(filename, fmt='%.2f', nanrep='')
+    actual = open(filename).read()
+    desired = '"a,b",1,1.00\r\n"a,b",2,\r\nc,1,3.00\r\nc,2,0.10\r\n'
+    yield assert_equal, actual, desired, "tocsv failed with fmt and nanrep"
+    os.unlink(filename)
+
+def test_inplace():
+    "Test in-place binary operators and out="
+    y1 = larry([1.0, 2.0, 3.0], [['a', 'b', 'c']])
+    x = y1.x
+    y1 += 1
+    y1 *= np.array([1.0, 2.0, 3.0])
+    y1 -= larry([1.0, 1.0, 1.0], [['c', 'b', 'a']])
+    y1 /= 2
+    desired = larry([0.5, 2.5, 5.5], [['a', 'b', 'c']])
+    yield ale, y1, desired, "in-place operators failed"
+    yield assert_, y1.x is x, "in-place operators made a copy"
+    y1 += larry([1.0, 1.0], [['c', 'd']])
+    desired = larry([nan, nan, 6.5], [['a', 'b', 'c']])
+    yield ale, y1, desired, "in-place add with left join failed"
+    y2 = larry([1, 2])
+    yield assert_raises, TypeError, y2.__iadd__, 0.5
+    yield assert_raises, IndexError, y2.__iadd__, larry([[1, 2]])
+    y3 = larry([1.0, 4.0])
+    out = larry([0.0, 0.0])
+    yield assert_, y3.sqrt(out=out) is out, "out is not returned"
+    yield ale, out, larry([1.0, 2.0]), "sqrt with out failed"
+    y3.clip(1.5, 3.0, out=y3)
+    yield ale, y3, larry([1.5, 3.0]), "clip in-place failed"
+    out = larry([0.0, 0.0], [['a', 'b']])
+    yield assert_raises, ValueError, y3.log, out
+
+def test_apply_parallel():
+    "Test lar.apply_parallel()"
+    lar = larry(np.random.rand(4, 5, 6))
+    for axis in range(lar.ndim):
+        for processes in (1, 3):
+            actual = lar.apply_parallel(np.cumsum, axis, processes)
+            desired = lar.cumsum(axis)
+            msg = "apply_parallel failed along axis %d" % axis
+            yield ale, actual, desired, msg
+            actual = lar.apply_parallel(np.max, axis, processes)
+            desired = lar.max(axis)
+            yield ale, actual, desired, msg
+    actual = larry([1, 2, 3]).apply_parallel(np.sum, processes=2)
+    yield assert_equal, actual, 6, "apply_parallel failed on 1d larry"
+    lar = larry([[1.0, 2.0]])
+    yield assert_raises, ValueError, lar.apply_parallel, np.diff
+    lar = larry([['a', None]], dtype=object)
+    yield assert_raises, TypeError, lar.apply_parallel, len
+    lar = larry([[1.0, 2.0], [3.0, 4.0]])
+    func = lambda x: str(x[0])
+    yield assert_raises, TypeError, lar.apply_parallel, func
+    func = lambda x: np.array(['a', 'bb'])
+    yield assert_raises, TypeError, lar.apply_parallel, func
+    lar.apply_parallel(np.sum, processes=1)
+    yield assert_, sys.modules['la.parallel']._state is None, \
+                   "worker state kept"
+
+def test_tobytes():
+    "Test lar.tobytes() and larry.frombytes()"
+    d = datetime
+    label = [[d.date(2010, 1, 1), d.date(2010, 1, 2)],
+             [d.datetime(2010, 1, 1, 9, 30, 0, 1), d.datetime(2011, 1, 1)],
+             [d.time(9, 30), d.time(16, 0, 0, 1)],
+             ['a', 'bb'], [u'a', u'bb'], [1.5, 2.5], [True, False],
+             [(1, 2), (2, 1)], [1, 'a']]
+    lar = larry(np.random.rand(*[2] * len(label)), label)
+    data = lar.tobytes()
+    actual = larry.frombytes(data)
+    yield ale, actual, lar, 'tobytes failed on mixed labels', False
+    yield assert_, not actual.x.flags.writeable, 'x should be a view'
+    actual = larry.frombytes(memoryview(bytearray(data)))
+    yield ale, actual, lar, 'frombytes failed on memoryview', False
+    yield assert_, actual.x.flags.writeable, 'x should be writeable'
+    actual = cPickle.loads(cPickle.dumps(lar, cPickle.HIGHEST_PROTOCOL))
+    yield ale, actual, lar, 'pickle failed on mixed labels', False
+    yield assert_, actual.x.flags.writeable, 'unpickled x is read-only'
+    lar = larry(np.asfortranarray(np.arange(6.0).reshape(2, 3)))
+    actual = larry.frombytes(lar.tobytes())
+    yield ale, actual, lar, 'tobytes failed on Fortran ordered x', False
+    lar = larry(np.array(['a', None], dtype=object))
+    actual = larry.frombytes(lar.tobytes())
+    yield ale, actual, lar, 'tobytes failed on object x', False
+
+def test_fromcsv():
+    "Test larry.fromcsv() options"
+    filename = tempfile.mktemp(suffix='.csv', prefix='la_csv_unittest')
+    f = open(filename, 'w')
+    f.write('skip\nb,2010-01-02,1,1.5\na,2010-01-01,2,2\n')
+    f.write('b,2010-01-01,10,3\na,2010-01-02,1,4\n')
+    f.close()
+    d = datetime.date
+    desired = larry([[[nan, nan, 2], [4, nan, nan]],
+                     [[nan, 3, nan], [1.5, nan, nan]]],
+                    [['a', 'b'], ['2010-01-01', '2010-01-02'],
+                     ['1', '10', '2']])
+    for chunksize in (1, 3, 100):
+        actual = larry.fromcsv(filename, skiprows=1, chunksize=chunksize)
+        yield ale, actual, desired, 'fromcsv chunksize %d' % chunksize
+    converters = {1: '%Y-%m-%d', 2: int}
+    actual = larry.fromcsv(filename, skiprows=1, usecols=[1, 2, 3],
+                           converters=converters, chunksize=2)
+    desired = larry([[nan, 2, 3], [4, nan, nan]],
+                    [[d(2010, 1, 1), d(2010, 1, 2)], [1, 2, 10]])
+    yield ale, actual, desired, 'fromcsv usecols and converters'
+    actual = larry.fromcsv(filename, skiprows=1, usecols=[0, 2],
+                           converters={0: str.upper})
+    desired = larry([1.0, 10.0], [['A', 'B']])
+    yield ale, actual, desired, 'fromcsv usecols and converters'
+    assert_raises(ValueError, larry.fromcsv, filename)
+    os.unlink(filename)
+
+def test_frombytes_raises():
+    "Test larry.frombytes() raises"
+    data = larry([1, 2]).tobytes()
+    assert_raises(ValueError, larry.frombytes, 'not a larry')
+    assert_raises(ValueError, larry.frombytes, data[:6] + '\xff' + data[7:])
+
 # --------------------------------------------------------------------------
 
 # larry dtype test
@@ -619,3 +781,41 @@ def test_comparison():
             desired = comp(1)
             yield ale, actual, desired, msg % (fnc, right)
              
+            
+# --------------------------------------------------------------------------
+
+# larry float32 test
+#
+# Make sure float32 input gives float32 output that agrees, to float32
+# precision, with float64 input
+
+def test_float32():
+    "larry float32 test"
+    x = np.random.rand(6, 5)
+    x[1, 2] = nan
+    lar64 = larry(x)
+    lar32 = larry(x.astype(np.float32))
+    group = larry(['a', 'b', 'a', 'b', 'a', 'c'])
+    methods = [('demean', (1,)), ('zscore', (1,)), ('ranking', (0,)),
+               ('push', (2,)), ('group_ranking', (group,)),
+               ('group_mean', (group,)), ('group_median', (group,)),
+               ('move_sum', (2,)), ('move_mean', (2,)), ('move_min', (2,)),
+               ('move_max', (2,)), ('move_ranking', (3,)),
+               ('move_median', (3,)), ('lastrank', ()), ('sum', (0,)),
+               ('std', (0,)), ('cumsum', (0,)), ('quantile', (1,))]
+    msg = 'larry.%s with float32 input failed'
+    for method, args in methods:
+        actual = getattr(lar32, method)(*args)
+        desired = getattr(lar64, method)(*args)
+        yield assert_equal, actual.dtype, np.float32, msg % method
+        yield assert_equal, actual.label, desired.label, msg % method
+        yield assert_array_almost_equal, actual.x, desired.x, 5, msg % method
+    for axis in (None, 0, 1):
+        actual = lar32.geometric_mean(axis)
+        desired = lar64.geometric_mean(axis)
+        if axis is None:
+            actual = larry([actual])
+            desired = larry([desired])
+        yield assert_equal, actual.dtype, np.float32, msg % 'geometric_mean'
+        yield assert_array_almost_equal, actual.x, desired.x, 5, \
+              msg % 'geometric_mean'
@@ -3,6 +3,7 @@
 # For support of python 2.5
 from __future__ import with_statement
 
+import sys
 import datetime
 import unittest
 
@@ -15,6 +16,8 @@ import la
 from la import larry
 from la.util.testing import printfail, noreference
 from la.util.testing import assert_larry_equal as ale
+from la.deflarry import _nomissing
+from la.missing import ismissing
 
 
 class Test_init(unittest.TestCase):
@@ -3728,6 +3731,20 @@ class Test_alignment(unittest.TestCase):
         desired = larry([[1, 2, 3]], [[1], [0, 1, 2]])
         actual = original.lag(1, axis=0)
         ale(actual, desired, 'positive lag', original=desired)
+
+    def test_lag_7(self):
+        "larry.lag_7"
+        original = larry(np.arange(12.0).reshape(2, 3, 2))
+        desired = larry(original.x[:, :, 1:], [[0, 1], [0, 1, 2], [0]])
+        actual = original.lag(-1)
+        ale(actual, desired, 'negative lag, axis=-1', original=original)
+        desired = larry(original.x[:, :2], [[0, 1], [1, 2], [0, 1]])
+        actual = original.lag(1, axis=1)
+        ale(actual, desired, 'positive lag, axis=1', original=original)
+        ale(original.lag(0), original, 'zero lag', original=original)
+        original = larry([1, 2, 3], valid=[True, False, True])
+        desired = larry([1, 2], [[1, 2]], valid=[True, False])
+        ale(original.lag(1), desired, 'lag with mask', original=original)
         
     def test_flatten_1(self):
         "larry.flatten_1"
@@ -4330,6 +4347,28 @@ class Test_vacuum(unittest.TestCase):
         assert_almost_equal(larv.x, larr.x)
         assert_(larv.label == larr.label)
         
+    def test_vacuum6b(self):
+        "larry.vacuum_6b" 
+        # Count the present values a few elements at a time
+        module = sys.modules['la.deflarry']
+        block = module._PRESENT_BLOCK
+        module._PRESENT_BLOCK = 5
+        try:
+            x = self.la1_3d.x.copy()
+            x[1, 2] = nan
+            lar = larry(x, self.la1_3d.label)
+            desired = larry(x[:, :, [0, 2, 3]],
+                            [[0, 1], [0, 1, 2], ['A', 'C', 'D']])
+            ale(lar.vacuum(), desired, 'vacuum', original=lar)
+            desired = larry(x[:, :2, [0, 2, 3]],
+                            [[0, 1], [0, 1], ['A', 'C', 'D']])
+            ale(lar.cut_missing(0.6, axis=0), desired, 'cut_missing',
+                original=lar)
+            ale(lar.cut_missing(0.6, axis=2), lar[:, :2],
+                'cut_missing, axis=2')
+        finally:
+            module._PRESENT_BLOCK = block
+
     def test_vacuum7(self):
         "larry.vacuum_7" 
         larr = larry(
@@ -4359,8 +4398,205 @@ class Test_vacuum(unittest.TestCase):
         larv = self.la1_3d.vacuum(axis=(0,1))
         assert_almost_equal(larv.x, larr.x)
         assert_(larv.label == larr.label)
+
+    def test_vacuum9(self):
+        "larry.vacuum_9"
+        # inf is not present; the answer does not depend on has_missing
+        for check in (False, True):
+            lar = larry([[np.inf, -np.inf], [1.0, 2.0]])
+            if check:
+                self.assert_(not lar.has_missing, 'has_missing')
+            ale(lar.vacuum(), lar[1:], 'vacuum, check=%s' % check)
+            ale(lar.cut_missing(0.5, axis=1), lar[1:],
+                'cut_missing, check=%s' % check)
  
            
+class Test_has_missing(unittest.TestCase):
+    "Test larry.has_missing and the faster paths it enables"
+
+    def setUp(self):
+        self.x = np.array([[ 2.0, 3.0, 1.0, 5.0],
+                           [ 3.0, 2.0, 2.0, 1.0],
+                           [ 1.0, 4.0, 1.0, 6.0]])
+        self.label = [['a', 'b', 'c'], [1, 2, 3, 4]]
+
+    def known(self):
+        "larry of self.x known to have no missing values"
+        lar = larry(self.x.copy(), self.label)
+        self.assert_(not lar.has_missing, 'has_missing should be False')
+        return lar
+
+    def unknown(self):
+        "larry of self.x that has not been checked for missing values"
+        return larry(self.x.copy(), self.label)
+
+    def test_has_missing_1(self):
+        "larry.has_missing_1"
+        lar = larry([1.0, nan])
+        self.assert_(lar.has_missing, 'has_missing should be True')
+        lar[1] = 2.0
+        self.assert_(not lar.has_missing, 'cache not cleared by setitem')
+        lar.x[0] = nan
+        lar.has_missing = None
+        self.assert_(lar.has_missing, 'has_missing should be True')
+        lar.fill(1.0)
+        self.assert_(not lar.has_missing, 'cache not cleared by fill')
+        lar += larry([nan, 1.0])
+        self.assert_(lar.has_missing, 'cache not cleared by +=')
+        lar.x = np.array([1.0, 2.0])
+        self.assert_(not lar.has_missing, 'cache not cleared by new x')
+        self.assert_(not larry([1, 2]).has_missing, 'int larry')
+        lar = larry([1, 2], valid=[True, False])
+        self.assert_(lar.has_missing, 'int larry with mask')
+
+    def test_has_missing_2(self):
+        "larry.has_missing_2"
+        # Larrys with data of their own inherit the flag; views do not,
+        # since NaN may be written to their data through another larry
+        lar = self.known()
+        for y in (lar[[0, 2]], lar[np.array([2, 1])], lar.take([1, 0], axis=1),
+                  lar.astype(np.float32), -lar, lar.abs(), lar.sign(),
+                  lar.nan_replace(), lar.ranking()):
+            self.assert_(_nomissing(y), 'flag not kept')
+        for y in (lar[1:], lar[:, 1:], lar[::2], lar.T, lar.swapaxes(0, 1),
+                  lar.insertaxis(0, 'z')):
+            self.assert_(not _nomissing(y), 'flag passed on to a view')
+        lar = larry([nan, 1.0])
+        self.assert_(not lar.nan_replace().has_missing, 'nan_replace')
+        self.assert_(not _nomissing(lar[[1]]), 'flag made up')
+        self.assert_(_nomissing(larry([3.0, 1.0, 2.0]).ranking()),
+                     'ranking without NaN')
+
+    def test_has_missing_3(self):
+        "larry.has_missing_3"
+        known = self.known()
+        unknown = self.unknown()
+        for name in ('sum', 'mean', 'std', 'var', 'max', 'min', 'prod',
+                     'median'):
+            for axis in (None, 0, 1):
+                actual = getattr(known, name)(axis=axis)
+                desired = getattr(unknown, name)(axis=axis)
+                msg = 'larry.%s, axis=%s' % (name, axis)
+                if axis is None:
+                    assert_almost_equal(actual, desired, err_msg=msg)
+                else:
+                    ale(actual, desired, msg)
+        ale(known.std(axis=0, ddof=1), unknown.std(axis=0, ddof=1), 'ddof')
+
+    def test_has_missing_4(self):
+        "larry.has_missing_4"
+        known = self.known()
+        unknown = self.unknown()
+        for norm in ('-1,1', '0,N-1'):
+            for axis in (None, 0, 1, -1):
+                ale(known.ranking(axis, norm), unknown.ranking(axis, norm),
+                    'ranking, axis=%s, norm=%s' % (axis, norm))
+        known = larry([3.0])
+        known.has_missing = False
+        ale(known.ranking(), larry([0.0]), 'ranking of one element')
+        group = larry(['x', 'y', 'x'], [['a', 'b', 'c']])
+        ale(self.known().group_mean(group), unknown.group_mean(group),
+            'group_mean')
+        assert_equal(ismissing(self.known()), np.zeros((3, 4), bool))
+
+    def test_has_missing_5(self):
+        "larry.has_missing_5"
+        for check in (False, True):
+            lar1 = larry([1.0, 2.0], [['a', 'b']])
+            lar2 = larry([3.0, 4.0], [['c', 'd']])
+            lar3 = larry([5.0, 6.0], [['a', 'b']])
+            if check:
+                lar1.has_missing
+                lar2.has_missing
+                lar3.has_missing
+            desired = larry([1.0, 2.0, 3.0, 4.0], [['a', 'b', 'c', 'd']])
+            ale(lar1.merge(lar2), desired, 'merge')
+            assert_raises(ValueError, lar1.merge, lar3)
+            assert_raises(ValueError, lar1.merge, lar1)
+            ale(lar1.merge(lar3, update=True), lar3, 'merge update')
+            lar4 = larry([nan, nan], [['a', 'b']])
+            ale(lar4.merge(lar3), lar3, 'merge into NaN')
+
+    def test_has_missing_6(self):
+        "larry.has_missing_6"
+        lar1 = larry([1.0, 2.0], [['a', 'b']])
+        lar2 = larry([3.0, nan], [['b', 'c']])
+        for check in (False, True):
+            if check:
+                lar1.has_missing
+                lar2.has_missing
+            y = la.add(lar1, lar2, join='outer', missone=0)
+            ale(y, larry([1.0, 5.0, nan], [['a', 'b', 'c']]), 'outer')
+            y = la.add(lar1, lar1, missone=0, misstwo=0)
+            ale(y, larry([2.0, 4.0], [['a', 'b']]), 'inner')
+            y = la.add(lar1, lar2, join='left', missone=0)
+            ale(y, larry([1.0, 5.0], [['a', 'b']]), 'left')
+
+    def test_has_missing_7(self):
+        "larry.has_missing_7"
+        # NaN written through x into larrys made from ones without NaN
+        f = larry(np.arange(12).reshape(3, 4)).astype(float)
+        f.x[0, 0] = nan
+        g = larry(f.x.copy())
+        assert_equal(f.sum(), 66.0)
+        ale(f.mean(0), g.mean(0), 'mean')
+        ale(f.ranking(1), g.ranking(1), 'ranking')
+        assert_equal(f.ranking(1).x[0, 0], nan)
+        assert_equal(ismissing(f)[0, 0], True)
+        assert_equal(f.nan_replace().x[0, 0], 0.0)
+        self.assert_(f.has_missing, 'has_missing')
+        lar = self.known()
+        lar[0, 0] = nan
+        y = lar[:, :2]
+        assert_equal(y.sum(), np.nansum(self.x[:, :2]) - 2.0)
+        assert_equal(ismissing(y)[0, 0], True)
+        self.assert_(y.has_missing, 'has_missing of slice')
+        lar = self.known()
+        y = lar[:, :2]
+        y.x[0, 0] = nan
+        assert_equal(y.sum(), np.nansum(self.x[:, :2]) - 2.0)
+        self.assert_(y.has_missing, 'has_missing of slice')
+
+    def test_has_missing_9(self):
+        "larry.has_missing_9"
+        # NaN written through x after the flag was set: merge, vacuum,
+        # cut_missing and la.binaryop do not trust the flag
+        lar = self.known()
+        lar.x[:, 0] = nan
+        ale(lar.vacuum(), lar[:, 1:], 'vacuum')
+        ale(lar.cut_missing(0.5, axis=0), lar[:, 1:], 'cut_missing')
+        other = larry([[7.0], [8.0], [9.0]], [['a', 'b', 'c'], [1]])
+        y = lar.merge(other)
+        assert_equal(y.x[:, 0], [7.0, 8.0, 9.0])
+        y = la.add(lar, lar, missone=0)
+        assert_equal(y.x[:, 0], [nan, nan, nan])
+        y = la.add(lar, larry(self.x, self.label), missone=0)
+        assert_equal(y.x[:, 0], self.x[:, 0])
+        lar = self.known()
+        lar.x[1, 1] = nan
+        assert_equal(la.add(lar, lar, misstwo=0).x[1, 1], 0.0)
+        y = la.add(lar, larry(self.x, self.label), missone=0)
+        assert_equal(y.x[1, 1], self.x[1, 1])
+
+    def test_has_missing_8(self):
+        "larry.has_missing_8"
+        # NaN written through x after the flag was set: reductions notice
+        # the NaN in their fast result and start over
+        for name in ('sum', 'mean', 'std', 'max', 'min', 'prod'):
+            for axis in (None, 0, 1):
+                lar = self.known()
+                lar.x[1, 1] = nan
+                x = self.x.copy()
+                x[1, 1] = nan
+                actual = getattr(lar, name)(axis=axis)
+                desired = getattr(larry(x, self.label), name)(axis=axis)
+                msg = 'larry.%s, axis=%s' % (name, axis)
+                if axis is None:
+                    assert_almost_equal(actual, desired, err_msg=msg)
+                else:
+                    ale(actual, desired, msg)
+                self.assert_(lar.has_missing, 'cache not cleared')
+
 def suite():
     s = []
     u = unittest.TestLoader().loadTestsFromTestCase
@@ -4375,6 +4611,7 @@ def suite():
     s.append(u(Test_calc))
     s.append(u(Test_alignment))
     s.append(u(Test_properties_01))      
+    s.append(u(Test_has_missing))
     return unittest.TestSuite(s)
 
 def run():
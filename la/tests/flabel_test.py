@@ -3,7 +3,12 @@
 import numpy as np
 from numpy.testing import assert_equal
 
+import datetime
+
+import la
 from la.flabel import listmap, listmap_fill         
+from la.flabel import (flattenlabel, flattencodes, decodelabel, encodelabel,
+                       list2index)
 
 # ---------------------------------------------------------------------------
 
@@ -70,3 +75,98 @@ def listmap_fill_unmappable_test():
     msg = "listmap_fill failed on list1=%s and list2=%s"
     yield assert_equal, idx, idx2, msg % (list1, list2)
     yield assert_equal, idx_unmappable, idx2_unmappable, msg % (list1, list2)
+
+# ---------------------------------------------------------------------------
+
+# flattenlabel
+#
+# test to make sure flattenlabel returns the same output as the nested loop
+# it replaced and that the label codes round trip
+
+def flattenlabel_nested_loop(label, order='C'):
+    "The la 0.5 flattenlabel."
+    label = list(label)
+    if order == 'C':
+        label = label[::-1]
+    idx = [[]]
+    for x in label:
+        t = []
+        for y in x:
+            for i in idx:
+                t.append(i+[y])
+        idx = t
+    if order == 'C':
+        idx = [i[::-1] for i in idx]
+    idx = [tuple(i) for i in idx]     
+    return [idx]
+
+def flattenlabel_test():
+    "flattenlabel test"
+    d = datetime.date
+    labels = [[['a', 'b']],
+              [['a', 'b'], [1, 2, 3]],
+              [[d(2010, 1, 1), d(2010, 1, 2)], [(1, 2), 'x'], [0.5, 1.5]],
+              [['a', 'b'], []]]
+    msg = "flattenlabel failed on label=%s and order=%s"
+    for label in labels:
+        for order in ('C', 'F'):
+            actual = flattenlabel(label, order)
+            desired = flattenlabel_nested_loop(label, order)
+            yield assert_equal, actual, desired, msg % (label, order)
+            codes = flattencodes(label, order)
+            actual = decodelabel(label, codes)
+            yield assert_equal, actual, desired[0], msg % (label, order)
+
+def encodelabel_test():
+    "encodelabel test"
+    d = datetime.date
+    flatlabel = [('b', d(2010, 1, 2)), ('a', d(2010, 1, 1)),
+                 ('b', d(2010, 1, 1))]
+    label, codes = encodelabel(flatlabel)
+    desired = [['a', 'b'], [d(2010, 1, 1), d(2010, 1, 2)]]
+    yield assert_equal, label, desired, "encodelabel label failed"
+    desired = [[1, 0, 1], [1, 0, 0]]
+    yield assert_equal, [c.tolist() for c in codes], desired, \
+                        "encodelabel codes failed"
+    yield assert_equal, decodelabel(label, codes), flatlabel, \
+                        "decodelabel failed"
+
+def list2index_test():
+    "list2index test"
+    lists = [[3, 1, 2, 1], ['b', 'a', 'b'], [2.5, 1.5], [(1,), (0,), (1,)],
+             [1, 'a', 1], [True, False]]
+    msg = "list2index failed on L=%s"
+    for L in lists:
+        idx, uL = list2index(L)
+        yield assert_equal, uL, sorted(set(L)), msg % L
+        yield assert_equal, [uL[i] for i in idx], L, msg % L
+
+
+class _TZ(datetime.tzinfo):
+    "Fixed UTC offset of 5 hours"
+    def utcoffset(self, dt):
+        return datetime.timedelta(hours=5)
+    def dst(self, dt):
+        return datetime.timedelta(0)
+    def tzname(self, dt):
+        return 'TZ'
+
+def list2index_lossless_test():
+    "list2index lossless test"
+    tz = _TZ()
+    dt = datetime.datetime
+    lists = [[dt(2010, 1, 1, 9, tzinfo=tz), dt(2010, 1, 1, 8, tzinfo=tz)],
+             [datetime.time(9, tzinfo=tz), datetime.time(8, tzinfo=tz)],
+             ['a\x00', 'a', 'b'], [u'a\x00', u'a']]
+    msg = "list2index changed the elements of L=%r"
+    for L in lists:
+        idx, uL = list2index(L)
+        yield assert_equal, uL, sorted(set(L)), msg % L
+        actual = [uL[i] for i in idx]
+        yield assert_equal, actual, L, msg % L
+        tzs = [getattr(e, 'tzinfo', None) for e in actual]
+        yield assert_equal, tzs, [getattr(e, 'tzinfo', None) for e in L], \
+                            msg % L
+    lar = la.larry.fromtuples([('a\x00', 1.0), ('a', 2.0)])
+    yield assert_equal, sorted(lar.label[0]), ['a', 'a\x00'], \
+                        "fromtuples lost a trailing NUL"
@@ -10,7 +10,8 @@ from numpy.testing import assert_array_equal
 from la import larry, rand
 from la import (union, intersection, panel, stack, cov, align, isaligned,
                 binaryop, add, subtract, multiply, divide, unique, sortby,
-                align_axis, lrange, ones, zeros, empty)
+                align_axis, lrange, ones, zeros, empty, nary, sum_larrys,
+                mean_larrys)
 from la.util.testing import assert_larry_equal as ale
 
 
@@ -1228,7 +1229,72 @@ class Test_divide(unittest.TestCase):
         msg = "divide failed"
         ale(actual, desired, msg, original=y1)
         ale(actual, desired, msg, original=y2)
+
+    def test_divide_02(self):
+        "divide test #02"
+        y1 = larry([1.0, 2.0, 4.0], [['a', 'b', 'c']])
+        y2 = larry([2.0, 4.0], [['a', 'c']])
+        out = larry([0.0, 0.0], [['a', 'c']])
+        actual = divide(y1, y2, out=out)
+        desired = larry([0.5, 1.0], [['a', 'c']])
+        msg = "divide failed"
+        self.assert_(actual is out, 'out is not returned')
+        ale(actual, desired, msg, original=y1)
+        out = larry([0.0, 0.0], [['a', 'b']])
+        self.assertRaises(ValueError, divide, y1, y2, out=out)
+        actual = divide(y1, y1, out=y1)
+        ale(actual, larry([1.0, 1.0, 1.0], [['a', 'b', 'c']]), msg)
                     
+class Test_nary(unittest.TestCase):
+    "Test la.nary(), la.sum_larrys() and la.mean_larrys()"
+
+    def setUp(self):
+        self.y1 = larry([1, 2, 3], [['a', 'b', 'c']])
+        self.y2 = larry([1.0, nan], [['c', 'b']])
+        self.y3 = larry([4.0, 5.0], [['c', 'd']])
+
+    def test_nary_01(self):
+        "nary test #01"
+        y1, y2, y3 = self.y1, self.y2, self.y3
+        for join in ('inner', 'outer', 'left', 'right'):
+            actual = nary(np.add, [y1, y2, y3], join=join)
+            desired = add(add(y1, y2, join=join), y3, join=join)
+            msg = "nary failed with join='%s'" % join
+            ale(actual, desired, msg, original=y1)
+            ale(actual, desired, msg, original=y2)
+
+    def test_nary_02(self):
+        "nary test #02"
+        y1 = self.y1
+        actual = nary(np.multiply, [y1, y1[::-1], y1])
+        desired = larry([1, 8, 27], [['a', 'b', 'c']])
+        ale(actual, desired, "nary failed", original=y1)
+        y4 = larry([1], [['e']])
+        self.assertRaises(TypeError, nary, np.add, [y1, y4], 'outer', False)
+        self.assertRaises(TypeError, nary, np.negative, [y1, y1])
+        self.assertRaises(IndexError, nary, np.add, [y1, larry([[1]])])
+
+    def test_sum_larrys_01(self):
+        "sum_larrys test #01"
+        y1, y2, y3 = self.y1, self.y2, self.y3
+        actual = sum_larrys([y1, y2, y3], join='outer')
+        desired = larry([1.0, 2.0, 8.0, 5.0], [['a', 'b', 'c', 'd']])
+        ale(actual, desired, "sum_larrys failed", original=y2)
+        actual = sum_larrys([y2, y2])
+        desired = larry([2.0, nan], [['c', 'b']])
+        ale(actual, desired, "sum_larrys failed", original=y2)
+        actual = sum_larrys([y1, y1])
+        ale(actual, y1 * 2, "sum_larrys failed", original=y1)
+
+    def test_mean_larrys_01(self):
+        "mean_larrys test #01"
+        y1, y2, y3 = self.y1, self.y2, self.y3
+        actual = mean_larrys([y1, y2, y3], join='outer')
+        desired = larry([1.0, 2.0, 8.0 / 3, 5.0], [['a', 'b', 'c', 'd']])
+        ale(actual, desired, "mean_larrys failed", original=y3)
+        actual = mean_larrys([y1, y1])
+        ale(actual, y1.astype(float), "mean_larrys failed", original=y1)
+
 class Test_sortby(unittest.TestCase):
     "Test la.sortby()"
     
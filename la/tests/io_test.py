@@ -3,15 +3,20 @@
 import unittest
 import tempfile
 import os
+import time
 import datetime
+import multiprocessing
 
 import numpy as np
 nan = np.nan
+import h5py
 
 import la
 from la import larry
 from la import IO
-from la.io import datetime2tuple, tuple2datetime, time2tuple, tuple2time
+from la.io import (datetime2tuple, tuple2datetime, time2tuple, tuple2time,
+                   time2int)
+from la.flabel import label2array, array2label
 from la.util.testing import assert_larry_equal
 
 
@@ -94,7 +99,361 @@ class Test_io(unittest.TestCase):
         io['desired'] = desired
         actual = io['desired'][:]
         assert_larry_equal(actual, desired)
+
+    def test_io_7(self):
+        "io_format_version_1"
+        # Archive written with the tuple layout used before format version 2
+        f = h5py.File(self.filename)
+        g = f.create_group('old')
+        g.attrs['larry'] = True
+        g['x'] = np.array([[1, 2, 3], [4, 5, 6]])
+        dates = [datetime.date(2010, 3, 1), datetime.date(2010, 3, 2)]
+        g['0'] = np.array(map(datetime.date.toordinal, dates))
+        g['0'].attrs['datetime_type'] = 'date'
+        dts = [datetime.datetime(2010, 3, 1, 13, 15, 59, 9998),
+               datetime.datetime(2010, 3, 2, 11, 23),
+               datetime.datetime(1960, 1, 1)]
+        g['1'] = np.asarray(map(datetime2tuple, dts), dtype=','.join(['i4']*7))
+        g['1'].attrs['datetime_type'] = 'datetime'
+        f.close()
+        desired = larry([[1, 2, 3], [4, 5, 6]], [dates, dts])
+        actual = la.load(self.filename, 'old')
+        assert_larry_equal(actual, desired)
+        io = IO(self.filename)
+        io['new'] = actual
+        assert_larry_equal(io['new'][:], desired)
+        self.assert_(io.f['new/0'].attrs['format_version'] == 2, 'version')
+
+    def test_io_8(self):
+        "io_datetime_precision"
+        io = IO(self.filename)
+        dd = datetime.datetime
+        dt = datetime.time
+        label = [[dd(1900, 1, 1), dd(1969, 12, 31, 23, 59, 59, 999999),
+                  dd(2038, 1, 19, 3, 14, 8, 1)],
+                 [dt(0, 0), dt(23, 59, 59, 999999)],
+                 [datetime.date(1, 1, 1), datetime.date(9999, 12, 31)]]
+        desired = larry(np.arange(12).reshape(3, 2, 2), label)
+        io['desired'] = desired
+        actual = io['desired'][:]
+        assert_larry_equal(actual, desired)
+
+    def test_io_9(self):
+        "io_mmap"
+        io = IO(self.filename)
+        desired = la.rand(10, 3)
+        io['desired'] = desired
+        actual = io.load('desired', mmap=True)
+        assert_larry_equal(actual, desired)
+        self.assert_(not actual.x.flags.writeable, 'mmap is writeable')
+        self.assert_(isinstance(actual.x.base, np.memmap), 'not a memmap')
+        actual = la.load(self.filename, 'desired', mmap=True)
+        assert_larry_equal(actual, desired)
+        io.f.create_dataset('chunked/x', data=desired.x, chunks=(5, 3))
+        io.f['chunked/0'], t = label2array(desired.label[0])
+        io.f['chunked/0'].attrs['datetime_type'] = t 
+        io.f['chunked/1'], t = label2array(desired.label[1])
+        io.f['chunked/1'].attrs['datetime_type'] = t 
+        io.f['chunked'].attrs['larry'] = True
+        self.assertRaises(ValueError, io.load, 'chunked', mmap=True)
+        assert_larry_equal(io.load('chunked'), desired)
+
+    def test_io_10(self):
+        "io_load_many"
+        lars = {'a': la.rand(3, 2), 'b/c': larry([1, 2]), 'd': la.rand(2)}
+        la.save_many(self.filename, lars)
+        keys = ['d', 'b/c', 'a']
+        actual = la.load_many(self.filename, keys)
+        for key, lar in zip(keys, actual):
+            assert_larry_equal(lar, lars[key])
+        io = IO(self.filename)
+        actual = io.load_many(keys, mmap=True)
+        for key, lar in zip(keys, actual):
+            assert_larry_equal(lar, lars[key])
+        self.assertRaises(KeyError, io.load_many, ['a', 'e'])
+
+    def test_io_11(self):
+        "io_freespace"
+        io = IO(self.filename)
+        io['a'] = la.rand(100, 100)
+        io['b'] = la.rand(50, 10)
+        fs = io.freespace
+        io['c'] = la.rand(100, 100)
+        io['a'] = la.rand(10, 10)
+        del io['b']
+        actual = io.freespace
+        desired = io.space - la.io._storage_size(io.f)
+        self.assert_(actual == desired, 'freespace is out of date')
+        self.assert_(actual > fs, 'freespace did not grow')
         
+    def test_io_12(self):
+        "io_repack_conditional"
+        io = IO(self.filename, max_freespace=50000)
+        io['a'] = la.rand(100, 100)
+        io['b'] = larry([1, 2, 3])
+        sp = io.space
+        del io['a']
+        self.assert_(io.space < sp, 'archive was not repacked')
+        self.assert_(io.freespace < 50000, 'freespace too large')
+        self.assert_(io.keys() == ['b'], 'keys are different')
+        assert_larry_equal(io['b'][:], larry([1, 2, 3]))
+
+    def test_io_13(self):
+        "io_repack_background"
+        io = IO(self.filename)
+        lars = {}
+        for i in range(5):
+            lars[str(i)] = la.rand(100, 10)
+            io[str(i)] = lars[str(i)]
+        del io['0'], lars['0']
+        fs = io.freespace
+        io.repack(background=True).join()
+        self.assert_(io.freespace < fs, 'repack did not reduce freespace')
+        thread = io.repack(background=True)
+        io['1'] = lars['1'] = la.rand(2, 2)
+        del io['2']
+        del lars['2']
+        io['a/b'] = lars['a/b'] = larry([1, 2])
+        thread.join()
+        self.assert_(io._repacker is None, 'repack did not finish')
+        keys = io.keys()
+        keys.sort()
+        self.assert_(keys == sorted(lars), 'keys are different')
+        for key in lars:
+            assert_larry_equal(io[key][:], lars[key])
+            
+    def test_io_14(self):
+        "io_repack_incremental"
+        io = IO(self.filename)
+        lars = {}
+        for i in range(4):
+            lars[str(i)] = la.rand(100, 10)
+            io[str(i)] = lars[str(i)]
+        del io['0'], lars['0']
+        fs = io.freespace
+        ncall = 1
+        while not io.repack_incremental(maxbytes=1):
+            ncall += 1
+            io['new'] = lars['new'] = la.rand(3)
+        self.assert_(ncall == 3, 'wrong number of incremental steps')
+        self.assert_(io.freespace < fs, 'repack did not reduce freespace')
+        keys = io.keys()
+        keys.sort()
+        self.assert_(keys == sorted(lars), 'keys are different')
+        for key in lars:
+            assert_larry_equal(io[key][:], lars[key])
+
+    def test_io_15(self):
+        "io_manifest"
+        io = IO(self.filename)
+        io['a'] = la.rand(2, 3)
+        io['b'] = larry([1, 2, 3])
+        io['b/c'] = larry([1, 2], [[datetime.date(2010, 1, 1),
+                                    datetime.date(2010, 1, 2)]])
+        io['b/d'] = larry([1.0])
+        manifest = la.io._read_manifest(io.f)
+        self.assert_(sorted(manifest) == ['a', 'b', 'b/c', 'b/d'], 'keys')
+        self.assert_(manifest['a']['shape'] == [2, 3], 'shape')
+        self.assert_(manifest['b/c']['dtype'] == 'int64', 'dtype')
+        self.assert_(manifest['b/c']['datetime_types'] == ['date'], 'date')
+        # Larrys written without going through la are not in the manifest
+        # but an archive without a manifest is searched
+        del io.f[la.io._MANIFEST]
+        keys = ['a', 'b', 'b/c', 'b/d']
+        self.assert_(io.keys() == keys, 'keys without manifest')
+        del io['b']
+        self.assert_(io.keys() == ['a'], 'nested keys not deleted')
+        self.assert_(la.io._MANIFEST not in io.keys(), 'manifest is a key')
+
+    def test_io_22(self):
+        "io_manifest_entries"
+        io = IO(self.filename)
+        io.freespace  # Start keeping track of freespace
+        io['a'] = larry([1.0, 2.0])
+        io['b'] = larry([1, 2, 3])
+        io['b/c'] = larry([1.0])
+        manifest = io.f[la.io._MANIFEST]
+        self.assert_(isinstance(manifest, h5py.Group), 'one entry per larry')
+        self.assert_(len(manifest) == 3, 'wrong number of entries')
+        # Saving a larry writes its entry only
+        addr = h5py.h5o.get_info(manifest['a'].id).addr
+        io['d'] = larry([4.0])
+        self.assert_(h5py.h5o.get_info(manifest['a'].id).addr == addr,
+                     'other entries rewritten')
+        del io['b']
+        self.assert_(io.keys() == ['a', 'd'], 'nested keys not deleted')
+        desired = io.space - la.io._storage_size(io.f)
+        self.assert_(io.freespace == desired, 'freespace is out of date')
+        # A manifest kept in one JSON dataset is converted on the next save
+        old = la.io._read_manifest(io.f)
+        del io.f[la.io._MANIFEST]
+        io.f[la.io._MANIFEST] = np.string_(la.io.json.dumps(old))
+        self.assert_(io.keys() == ['a', 'd'], 'old manifest not read')
+        io['e'] = larry([5.0])
+        self.assert_(isinstance(io.f[la.io._MANIFEST], h5py.Group),
+                     'old manifest not converted')
+        self.assert_(io.keys() == ['a', 'd', 'e'], 'keys lost converting')
+
+    def test_io_16(self):
+        "io_shared_labels"
+        io = IO(self.filename)
+        dates = [datetime.date(2010, 1, 1), datetime.date(2010, 1, 4)]
+        tickers = ['a', 'b', 'c']
+        a = larry(np.ones((3, 2)), [tickers, dates])
+        b = larry(np.zeros((3, 2)), [list(tickers), list(dates)])
+        c = larry([1, 2], [dates])
+        io.freespace  # Start keeping track of freespace
+        io['a'] = a
+        io['b'] = b
+        io['c'] = c
+        labels = io.f[la.io._LABELS]
+        self.assert_(len(labels) == 2, 'labels are not shared')
+        rc = h5py.h5o.get_info(labels[io.f['c/0'].attrs['label_hash']].id).rc
+        self.assert_(rc == 4, 'wrong number of links to label')
+        a2, b2, c2 = io.load_many(['a', 'b', 'c'])
+        assert_larry_equal(a2, a)
+        assert_larry_equal(b2, b)
+        assert_larry_equal(c2, c)
+        self.assert_(a2.label[1] is b2.label[1], 'label lists not shared')
+        self.assert_(a2.label[1] is c2.label[0], 'label lists not shared')
+        io.repack()
+        labels = io.f[la.io._LABELS]
+        self.assert_(len(labels) == 2, 'repack unshared labels')
+        del io['a'], io['b']
+        self.assert_(len(labels) == 1, 'unused label not deleted')
+        assert_larry_equal(io['c'][:], c)
+        del io['c']
+        self.assert_(len(labels) == 0, 'unused label not deleted')
+        desired = io.space - la.io._storage_size(io.f)
+        self.assert_(io.freespace == desired, 'freespace is out of date')
+
+    def test_io_17(self):
+        "io_append"
+        io = IO(self.filename)
+        d = datetime.date
+        a = larry([[1.0, 2.0], [3.0, 4.0]], [['a', 'b'], [d(2010, 1, 1),
+                                                         d(2010, 1, 2)]])
+        b = larry([[5.0], [6.0]], [['a', 'b'], [d(2010, 1, 3)]])
+        io.save('a', a, appendable=True)
+        io.append('a', b)
+        assert_larry_equal(io['a'][:], a.merge(b))
+        self.assert_(la.io._read_manifest(io.f)['a']['shape'] == [2, 3],
+                     'manifest not updated')
+        self.assertRaises(ValueError, io.append, 'a', b)
+        c = larry([[7.0]], [['c'], [d(2010, 1, 4)]])
+        self.assertRaises(ValueError, io.append, 'a', c)
+        c = larry([[7.0, 8.0, 9.0]], [['cc'], list(io['a'].label[1])])
+        self.assertRaises(ValueError, io.append, 'a', c, axis=0)
+        io['b'] = b
+        self.assertRaises(ValueError, io.append, 'b', b)
+        
+    def test_io_18(self):
+        "io_swmr"
+        io = IO(self.filename, libver='latest')
+        label = [['a', 'b'], [datetime.date(2000, 1, 1)]]
+        io.save('x', larry([[0.0], [0.0]], label), appendable=True)
+        io.f.close()
+        started = multiprocessing.Event()
+        writer = multiprocessing.Process(target=swmr_writer,
+                                         args=(self.filename, started))
+        readers = [multiprocessing.Process(target=swmr_reader,
+                                           args=(self.filename, started))
+                   for i in range(3)]
+        writer.start()
+        for reader in readers:
+            reader.start()
+        writer.join(60)
+        for reader in readers:
+            reader.join(60)
+        self.assert_(writer.exitcode == 0, 'writer failed')
+        for reader in readers:
+            self.assert_(reader.exitcode == 0, 'reader failed')
+        io = IO(self.filename)
+        self.assert_(io['x'].shape == (2, SWMR_NAPPEND + 1), 'wrong shape')
+
+    def test_io_19(self):
+        "io_valid"
+        io = IO(self.filename)
+        d = datetime.date
+        a = larry([[1, 2], [3, 4]], [['a', 'b'], [d(2010, 1, 1),
+                                                 d(2010, 1, 2)]],
+                  valid=[[True, False], [True, True]])
+        b = larry([[5], [6]], [['a', 'b'], [d(2010, 1, 3)]],
+                  valid=[[False], [True]])
+        io.save('a', a, appendable=True)
+        assert_larry_equal(io['a'][:], a)
+        assert_larry_equal(io['a'][1:], a[1:])
+        io.append('a', b)
+        assert_larry_equal(io['a'][:], a.merge(b))
+        io['c'] = larry([[1, 2]], [['a'], [d(2010, 1, 1), d(2010, 1, 2)]])
+        self.assert_(io['c'].valid is None, 'c should not have a mask')
+        self.assertRaises(ValueError, io.append, 'c', b)
+        
+    def test_io_20(self):
+        "io_append_axis"
+        x = larry([[1.0, 2.0], [3.0, 4.0]], [['a', 'b'], [1, 2]])
+        y = larry([[5.0], [6.0]], [['a', 'b'], [3]])
+        la.save(self.filename, x, 'x', appendable=True)
+        self.assertRaises(ValueError, la.append, self.filename, y, 'x', 2)
+        self.assertRaises(ValueError, la.append, self.filename, y, 'x', -3)
+        assert_larry_equal(la.load(self.filename, 'x'), x)
+        
+    def test_io_21(self):
+        "io_data_ahead_of_labels"
+        # What a SWMR reader sees while an append is between writing the
+        # data and writing the labels
+        x = larry([[1.0, 2.0], [3.0, 4.0]], [['a', 'b'], [1, 2]],
+                  valid=[[True, False], [True, True]])
+        la.save(self.filename, x, 'x', appendable=True)
+        f = h5py.File(self.filename, 'a')
+        f['x']['x'].resize((2, 3))
+        f['x']['x'][:, 2] = [5.0, 6.0]
+        f['x']['valid'].resize((2, 3))
+        f['x']['valid'][:, 2] = True
+        f.close()
+        assert_larry_equal(la.load(self.filename, 'x'), x)
+        io = IO(self.filename)
+        lara = io['x']
+        self.assertEqual(lara.shape, (2, 2))
+        assert_larry_equal(lara[:], x)
+        assert_larry_equal(lara[:, -1], x[:, -1])
+        assert_larry_equal(lara[:, [0, -1]], x[:, [0, -1]])
+        assert_larry_equal(lara[0], x[0])
+        self.assertRaises(IndexError, lara.__getitem__, (0, 2))
+        io.f.close()
+        
+SWMR_NAPPEND = 50
+
+def swmr_writer(filename, started):
+    "Append one column at a time to larry x in archive."
+    io = IO(filename, mode='swmr-write')
+    started.set()
+    date = datetime.date(2000, 1, 1)
+    for i in range(1, SWMR_NAPPEND + 1):
+        label = [['a', 'b'], [date + datetime.timedelta(i)]]
+        io.append('x', larry([[i], [-i]], label))
+        time.sleep(0.002)
+
+def swmr_reader(filename, started):
+    "Read larry x until all appended columns are seen; exit 1 if corrupt."
+    started.wait(30)
+    io = IO(filename, mode='swmr-read')
+    date = datetime.date(2000, 1, 1)
+    t0 = time.time()
+    n = 0
+    while n < SWMR_NAPPEND + 1:
+        if time.time() - t0 > 30:
+            os._exit(1)
+        io.refresh()
+        lar = io['x'][:]
+        n = lar.shape[1]
+        dates = [date + datetime.timedelta(i) for i in range(n)]
+        ok = lar.label[1] == dates and lar.label[0] == ['a', 'b']
+        ok &= (lar.x[0] == np.arange(n)).all()
+        ok &= (lar.x[1] == -np.arange(n)).all()
+        if not ok:
+            os._exit(1)
+
 def testsuite():
     s = []
     u = unittest.TestLoader().loadTestsFromTestCase
@@ -139,3 +498,7 @@ def time_test():
         t = tuple2time(i)
         msg = "datetime.datetime to tuple roundtrip failed."
         np.testing.assert_equal(t, time, msg)
+        i = np.array([time2int(time)])
+        t = array2label(i, 'time')[0]
+        msg = "datetime.time to int roundtrip failed."
+        np.testing.assert_equal(t, time, msg)
@@ -0,0 +1,52 @@
+"lazy unit tests."
+
+import unittest
+
+import numpy as np
+nan = np.nan
+
+import la
+from la import larry, lazy
+from la.util.testing import assert_larry_equal as ale
+
+
+class Test_lazy(unittest.TestCase):
+    "Test lazy evaluation of larry arithmetic."
+
+    def setUp(self):
+        self.a = la.rand(300, 200)
+        self.b = la.rand(300, 200).morph(range(299, -1, -1), 0)
+        self.c = la.rand(250, 210)
+        self.d = larry(np.arange(60000).reshape(300, 200) % 7 + 1)
+
+    def test_lazy_1(self):
+        "lazy_arithmetic"
+        a, b, c, d = self.a, self.b, self.c, self.d
+        a0 = a.copy()
+        b0 = b.copy()
+        actual = ((lazy(a) - b) / c * d + lazy(a).exp()).compute()
+        ale(actual, (a - b) / c * d + a.exp())
+        ale(a, a0, 'input changed')
+        ale(b, b0, 'input changed')
+        ale((lazy(a) * a - 1).compute(), a * a - 1)
+        ale((1 - lazy(d)).compute(), 1 - d)
+        ale((lazy(d) / 2).compute(), d / 2)
+        ale((2 * -abs(lazy(b))).compute(), 2 * -abs(b))
+        ale((lazy(a) ** 2).sqrt().compute(), (a ** 2).sqrt())
+
+    def test_lazy_2(self):
+        "lazy_alignment"
+        x = la.rand(3, 4, 5)
+        y = la.rand(3, 4, 5)
+        y.label[2] = [4, 3, 2, 1, 9]
+        ale((lazy(x) * y - x).compute(), x * y - x)
+        ale(lazy(y).compute(), y)
+        e = la.rand(0, 3)
+        ale((lazy(e) + e).compute(), e + e)
+
+    def test_lazy_3(self):
+        "lazy_raises"
+        self.assertRaises(TypeError, lazy, np.array([1, 2]))
+        self.assertRaises(TypeError, lazy(self.a).__add__, np.array([1]))
+        x = lazy(self.a) + la.rand(2)
+        self.assertRaises(IndexError, x.compute)
@@ -1,11 +1,15 @@
 "Unit tests of array functions."
 
+import os
 import unittest
+import tempfile
+import cPickle
 
 import numpy as np
 from numpy.testing import assert_almost_equal, assert_equal, assert_raises
 nan = np.nan
 
+import la
 from la import larry
 from la.missing import nans, missing_marker, ismissing
                                        
@@ -199,6 +203,187 @@ class Test_ismissing(unittest.TestCase):
         "afunc.ismissing_9a"
         assert_equal(ismissing(np.array([True])), np.array([False])) 
 
+
+class Test_valid(unittest.TestCase):
+    "Test larrys with a validity mask"
+
+    def setUp(self):
+        self.x = np.array([[1, 2, 3], [4, 5, 6]], dtype=np.int8)
+        self.valid = np.array([[True, False, True], [False, False, True]])
+        self.lar = larry(self.x, [['a', 'b'], [1, 2, 3]], valid=self.valid)
+
+    def test_valid_1(self):
+        "valid_1"
+        assert_raises(ValueError, larry, [1, 2], valid=[True])
+        assert_equal(larry([1, 2]).valid, None)
+        
+    def test_valid_2(self):
+        "valid_2"
+        assert_equal(ismissing(self.lar), ~self.valid)
+        assert_equal(self.lar.ismissing().x, ~self.valid)
+        
+    def test_valid_3(self):
+        "valid_3"
+        y = self.lar.morph(['b', 'c', 'a'], axis=0)
+        assert_equal(y.dtype, np.int8)
+        desired = np.array([[False, False, True], [False, False, False],
+                            [True, False, True]])
+        assert_equal(y.valid, desired)
+        assert_equal(y.x[[0, 2]], self.x[::-1])
+
+    def test_valid_4(self):
+        "valid_4"
+        lar1 = larry([1, 2], [['a', 'b']], dtype=np.int8)
+        lar2 = larry([3, 4], [['b', 'c']], dtype=np.int8)
+        y1, y2 = la.align(lar1, lar2, join='outer', cast='mask')
+        assert_equal(y1.x, np.array([1, 2, 0], dtype=np.int8))
+        assert_equal(y1.valid, np.array([True, True, False]))
+        assert_equal(y2.x, np.array([0, 3, 4], dtype=np.int8))
+        assert_equal(y2.valid, np.array([False, True, True]))
+        y = y1.merge(y2.morph(['d'], axis=0))
+        assert_equal(y.dtype, np.int8)
+        assert_equal(y.valid, np.array([True, True, False, False]))
+        y = la.add(lar1, lar2, join='outer', cast='mask')
+        assert_equal(y.x[1], 5)
+        assert_equal(y.valid, np.array([False, True, False]))
+        y = la.add(y1, y2, join='outer', missone=0)
+        assert_equal(y.x, np.array([1, 5, 4], dtype=np.int8))
+        assert_equal(y.valid, np.array([True, True, True]))
+        x1, x2, label, v1, v2 = la.align_raw(y1, y2, join='inner')
+        assert_equal(x1, np.array([1, 2, nan]))
+        assert_equal(x2, np.array([nan, 3, 4]))
+        
+    def test_valid_5(self):
+        "valid_5"
+        lar = self.lar
+        assert_equal(lar.sum(), 10)
+        assert_almost_equal(lar.mean(), 10 / 3.0)
+        assert_equal(lar.max(), 6)
+        y = lar.sum(axis=0)
+        assert_equal(y.x, np.array([1, 0, 9]))
+        assert_equal(y.valid, None)
+        y = lar.min(axis=0)
+        assert_equal(y.x, np.array([1, 0, 3], dtype=np.int8))
+        assert_equal(y.valid, np.array([True, False, True]))
+        y = lar.mean(axis=0)
+        assert_almost_equal(y.x, np.array([1.0, nan, 4.5]))
+        assert_equal(y.valid, None)
+        assert_equal(larry([1], valid=[False]).mean(), nan)
+
+    def test_valid_6(self):
+        "valid_6"
+        lar = self.lar
+        y = lar + lar.morph([1, 3], axis=1)
+        assert_equal(y.x, np.array([[2, 6], [8, 12]], dtype=np.int8))
+        assert_equal(y.valid, np.array([[True, True], [False, True]]))
+        y = lar * 2.5
+        assert_almost_equal(y.x, np.array([[2.5, nan, 7.5], [nan, nan, 15]]))
+        assert_equal(y.valid, None)
+        y = lar > 2
+        assert_equal(y.valid, self.valid)
+        assert_equal(lar[0, 1], nan)
+        assert_equal(lar[0, 2], 3)
+        assert_equal(lar[:, 1:].valid, self.valid[:, 1:])
+
+    def test_valid_7(self):
+        "valid_7"
+        y = self.lar.vacuum()
+        assert_equal(y.label, [['a', 'b'], [1, 3]])
+        assert_equal(y.valid, self.valid[:, [0, 2]])
+        y = self.lar.nan_replace(0)
+        assert_equal(y.x, np.array([[1, 0, 3], [0, 0, 6]], dtype=np.int8))
+        assert_equal(y.valid, None)
+        y = self.lar.astype(float)
+        assert_almost_equal(y.x, np.array([[1, nan, 3], [nan, nan, 6]]))
+        assert_equal(y.valid, None)
+
+    def test_valid_8(self):
+        "valid_8"
+        y = larry.frombytes(self.lar.tobytes())
+        assert_equal(y.x, self.x)
+        assert_equal(y.valid, self.valid)
+        y = cPickle.loads(cPickle.dumps(self.lar))
+        assert_equal(y.valid, self.valid)
+
+    def test_valid_9(self):
+        "valid_9"
+        # Methods that are not mask aware work on a NaN-filled float copy
+        lar = self.lar
+        f = lar.astype(float)
+        group = larry(['g', 'g', 'h'], [[1, 2, 3]])
+        for method, args in [('ranking', (1,)), ('ranking', (0,)),
+                             ('demean', (1,)), ('zscore', (1,)),
+                             ('demedian', (1,)), ('movingsum', (2,)),
+                             ('movingsum_forward', (2,)),
+                             ('lastrank', ()),
+                             ('push', (1,)), ('move_sum', (2,)),
+                             ('move_mean', (2,)), ('move_std', (2,)),
+                             ('move_min', (2,)), ('move_max', (2,)),
+                             ('move_ranking', (2,)), ('move_median', (2,)),
+                             ('move_func', (np.nansum, 2)),
+                             ('group_ranking', (group, 1)),
+                             ('group_mean', (group, 1)),
+                             ('group_median', (group, 1))]:
+            actual = getattr(lar, method)(*args)
+            desired = getattr(f, method)(*args)
+            msg = 'larry.%s ignored the validity mask' % method
+            assert_equal(actual.label, desired.label, msg)
+            assert_almost_equal(actual.x, desired.x, err_msg=msg)
+            assert_equal(actual.valid, None, msg)
+
+    def test_valid_10(self):
+        "valid_10"
+        lar = self.lar
+        assert_equal(lar.isnan().x, ~self.valid)
+        assert_equal(lar.isfinite().x, self.valid)
+        assert_equal(lar.isinf().x, np.zeros(lar.shape, dtype=bool))
+
+    def test_valid_11(self):
+        "valid_11"
+        lar = self.lar
+        desired = [('a', 1, 1), ('a', 2, None), ('a', 3, 3), ('b', 1, None),
+                   ('b', 2, None), ('b', 3, 6)]
+        assert_equal(lar.totuples(), desired)
+        assert_equal(list(lar.itertuples(skipna=True)),
+                     [t for t in desired if t[-1] is not None])
+        assert_equal(lar.tolist()[0], [1, None, 3, None, None, 6])
+        assert_equal(lar.todict()[('a', 2)], None)
+        assert_equal(lar.todict()[('b', 3)], 6)
+        fd, filename = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            lar.tocsv(filename, nanrep='NA')
+            lines = open(filename).read().split()
+            assert_equal(lines, ['a,1,1', 'a,2,NA', 'a,3,3', 'b,1,NA',
+                                 'b,2,NA', 'b,3,6'])
+            lar.tocsv(filename)
+            y = larry.fromcsv(filename)
+            assert_almost_equal(y.x, lar.astype(float).x)
+            lar.tofile(filename, nanrep='NA')
+            lines = open(filename).read().split()
+            assert_equal(lines, [',1,2,3', 'a,1,NA,3', 'b,NA,NA,6'])
+        finally:
+            os.remove(filename)
+
+    def test_valid_12(self):
+        "valid_12"
+        lar = self.lar
+        f = lar.astype(float)
+        y = lar.flatten().unflatten()
+        assert_almost_equal(y.x, f.x)
+        y = la.panel(lar.insertaxis(0, 'z'))
+        desired = la.panel(f.insertaxis(0, 'z'))
+        assert_almost_equal(y.astype(float).x, desired.x)
+        assert_equal(y.valid, self.valid.reshape(-1, 1))
+        m = lar > 1
+        y = ~m
+        assert_equal(y.x[self.valid], ~m.x[self.valid])
+        assert_equal(y.valid, self.valid)
+        assert_equal(lar.get(['a', 2]), nan)
+        assert_equal(lar.get(['a', 3]), 3)
+        y = larry([1, 2, 3], valid=[True, False, True])
+        assert_almost_equal(y.movingsum(2).x, np.array([nan, 1, 3]))
+
 # Unit tests ----------------------------------------------------------------        
     
 def suite():
@@ -208,6 +393,7 @@ def suite():
     s.append(unit(Test_nans)) 
     s.append(unit(Test_missing_marker))
     s.append(unit(Test_ismissing))             
+    s.append(unit(Test_valid))
     return unittest.TestSuite(s)
 
 def run():   
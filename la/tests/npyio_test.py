@@ -0,0 +1,121 @@
+"npyio unit tests."
+
+import unittest
+import tempfile
+import shutil
+import os
+import datetime
+
+import numpy as np
+nan = np.nan
+
+import la
+from la import larry
+from la import NpyIO
+from la.util.testing import assert_larry_equal
+
+
+class Test_npyio(unittest.TestCase):
+    "Test npyio."
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp(prefix='la_npyio_unittest')
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_npyio_1(self):
+        "npyio_general"
+        io = NpyIO(self.dirname)
+        x = larry([1,2,3])
+        io['x'] = x
+        self.assert_('x' in io, 'key missing')
+        self.assert_((x == io['x']).all(), 'save and load difference')
+        self.assert_(['x'] == io.keys(), 'keys are different')
+        self.assert_(x.dtype == io['x'].dtype, 'dtype changed')
+        io['x'] = larry([4.0])
+        assert_larry_equal(io['x'], larry([4.0]))
+        del io['x']
+        self.assert_(io.keys() == [], 'key still present')
+        self.assert_(os.listdir(self.dirname) == [], 'files left behind')
+
+    def test_npyio_2(self):
+        "npyio_keys"
+        io = NpyIO(self.dirname)
+        io['1'] = larry([1,2,3])
+        io['2'] = larry([1,2,3])
+        io['1/2/3/4'] = larry([1,2,3])
+        os.mkdir(os.path.join(self.dirname, 'notalarry'))
+        self.assert_(io.keys() == ['1', '1/2/3/4', '2'], 'keys do not match')
+        self.assert_('notalarry' not in io, 'directory is not a larry')
+        self.assertRaises(KeyError, io.__getitem__, 'notalarry')
+
+    def test_npyio_3(self):
+        "npyio_labels"
+        io = NpyIO(self.dirname)
+        dd = datetime.datetime
+        label = [[datetime.date(2010, 3, 1), datetime.date(2010, 3, 2)],
+                 ['a', 'bb', 'ccc'],
+                 [dd(2010, 3, 1, 13, 15, 59, 9998), dd(2010, 3, 2, 11, 23)],
+                 [datetime.time(13, 15, 59, 9998), datetime.time(11, 23)]]
+        desired = larry(np.random.rand(2, 3, 2, 2), label)
+        io['desired'] = desired
+        assert_larry_equal(io['desired'], desired)
+        assert_larry_equal(io.load('desired', mmap=False), desired)
+
+    def test_npyio_4(self):
+        "npyio_mmap"
+        io = NpyIO(self.dirname)
+        desired = la.rand(10, 3)
+        io['desired'] = desired
+        actual = io['desired']
+        assert_larry_equal(actual, desired)
+        self.assert_(not actual.x.flags.writeable, 'mmap is writeable')
+        self.assert_(isinstance(actual.x.base, np.memmap), 'not a memmap')
+        actual = io.load('desired', mmap=False)
+        self.assert_(actual.x.flags.writeable, 'data is read-only')
+        io['empty'] = larry(np.zeros((0, 2)), [[], [0, 1]])
+        self.assert_(io['empty'].shape == (0, 2), 'empty larry')
+
+    def test_npyio_5(self):
+        "npyio_append"
+        io = NpyIO(self.dirname)
+        d = datetime.date
+        a = larry([[1.0, 2.0], [3.0, 4.0]], [['a', 'b'], [d(2010, 1, 1),
+                                                         d(2010, 1, 2)]])
+        io.save('a', a, appendable=True)
+        desired = a
+        for i in range(3, 20):
+            b = larry([[i], [-i]], [['a', 'b'], [d(2010, 1, i)]])
+            io.append('a', b)
+            desired = desired.merge(b)
+        assert_larry_equal(io['a'], desired)
+        self.assertRaises(ValueError, io.append, 'a', b)
+        c = larry([[7.0]], [['c'], [d(2010, 2, 1)]])
+        self.assertRaises(ValueError, io.append, 'a', c)
+        io['b'] = a
+        b = larry([[5.0], [6.0]], [['a', 'b'], [d(2010, 1, 3)]])
+        self.assertRaises(ValueError, io.append, 'b', b)
+        io.save('s', larry([1, 2], [['a', 'b']]), appendable=True)
+        io.append('s', larry([3], [['a long label']]))
+        assert_larry_equal(io['s'], larry([1, 2, 3], [['a', 'b',
+                                                         'a long label']]))
+
+    def test_npyio_6(self):
+        "npyio_repr"
+        io = NpyIO(self.dirname)
+        io['x'] = larry([1, 2, 3])
+        io['y'] = la.rand(2, 3)
+        self.assert_(len(io) == 2, 'wrong number of larrys')
+        table = repr(io).split('\n')
+        self.assert_(table[2].split() == ['x', 'int64', '(3,)'], 'repr')
+        self.assert_(table[3].split() == ['y', 'float64', '(2,', '3)'],
+                     'repr')
+
+    def test_npyio_7(self):
+        "npyio_valid"
+        io = NpyIO(self.dirname)
+        x = larry([1, 2, 3], valid=[True, False, True])
+        io['x'] = x
+        assert_larry_equal(io['x'], x)
+        self.assertRaises(ValueError, io.append, 'x', larry([4], [[3]]))
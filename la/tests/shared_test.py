@@ -0,0 +1,101 @@
+"shared unit tests."
+
+import os
+import stat
+import unittest
+import cPickle
+import datetime
+import subprocess
+import sys
+
+import numpy as np
+nan = np.nan
+
+import la
+from la import larry
+from la import shared
+from la.util.testing import assert_larry_equal
+
+
+class Test_shared(unittest.TestCase):
+    "Test la.shared."
+
+    def setUp(self):
+        self.name = 'la_shared_unittest'
+
+    def tearDown(self):
+        if self.name in shared.names():
+            shared.unlink(self.name)
+
+    def test_shared_1(self):
+        "shared_attach"
+        label = [['a', 'b'], [datetime.date(2010, 1, i) for i in (1, 2, 3)]]
+        desired = larry(np.random.rand(2, 3), label)
+        shared.larry_to_shm(desired, self.name)
+        self.assert_(self.name in shared.names(), 'name missing')
+        actual = shared.attach(self.name)
+        assert_larry_equal(actual, desired)
+        self.assert_(not actual.x.flags.writeable, 'view is writeable')
+        self.assertRaises(ValueError, shared.larry_to_shm, desired, self.name)
+        shared.unlink(self.name)
+        self.assert_(self.name not in shared.names(), 'name not removed')
+        assert_larry_equal(actual, desired)
+        self.assertRaises(KeyError, shared.attach, self.name)
+        self.assertRaises(KeyError, shared.unlink, self.name)
+
+    def test_shared_2(self):
+        "shared_layout"
+        x = np.asfortranarray(np.arange(6, dtype=np.int32).reshape(2, 3))
+        for desired in (larry(x), larry(np.zeros((0, 2)), [[], [1, 2]]),
+                        larry([True, False])):
+            shared.larry_to_shm(desired, self.name)
+            assert_larry_equal(shared.attach(self.name), desired)
+            shared.unlink(self.name)
+        lar = larry([None, 'a'], dtype=object)
+        self.assertRaises(TypeError, shared.larry_to_shm, lar, self.name)
+        self.assertRaises(ValueError, shared.attach, 'a/b')
+
+    def test_shared_3(self):
+        "shared_process"
+        desired = la.rand(10, 3)
+        shared.larry_to_shm(desired, self.name)
+        code = "from la import shared; print repr(shared.attach('%s').sum())"
+        out = subprocess.check_output([sys.executable, '-c', code % self.name])
+        self.assert_(float(out) == desired.sum(), 'other process')
+
+    def test_shared_4(self):
+        "shared_mode"
+        lar = larry([1.0, 2.0])
+        path = os.path.join(shared._DIR, shared._PREFIX + self.name)
+        shared.larry_to_shm(lar, self.name)
+        self.assert_(stat.S_IMODE(os.stat(path).st_mode) == 0600, 'mode')
+        shared.unlink(self.name)
+        shared.larry_to_shm(lar, self.name, mode=0644)
+        self.assert_(stat.S_IMODE(os.stat(path).st_mode) == 0644, 'mode')
+
+    def test_shared_5(self):
+        "shared_cleanup"
+        # A label that cannot be encoded makes larry_to_shm fail after the
+        # temporary file is made; neither the file nor its fd may be left
+        lar = larry([1.0, 2.0], [[lambda: 1, 2]])
+        fds = os.listdir('/proc/self/fd') if os.path.isdir('/proc') else []
+        files = os.listdir(shared._DIR)
+        self.assertRaises(cPickle.PicklingError, shared.larry_to_shm, lar,
+                          self.name)
+        if fds:
+            self.assert_(len(os.listdir('/proc/self/fd')) == len(fds),
+                         'fd leaked')
+        self.assert_(sorted(os.listdir(shared._DIR)) == sorted(files),
+                     'temporary file left')
+        self.assert_(self.name not in shared.names(), 'segment made')
+
+    def test_shared_6(self):
+        "shared_not_posix"
+        posix = shared._POSIX
+        shared._POSIX = False
+        try:
+            self.assertRaises(NotImplementedError, shared.larry_to_shm,
+                              larry([1.0, 2.0]), self.name)
+        finally:
+            shared._POSIX = posix
+        self.assert_(self.name not in shared.names(), 'segment made')
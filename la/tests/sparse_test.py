@@ -0,0 +1,102 @@
+"SparseLarry unit tests."
+
+import unittest
+
+import numpy as np
+nan = np.nan
+
+import la
+from la import larry, SparseLarry
+from la.util.testing import assert_larry_equal as ale
+
+
+def sparse_larry(shape, density, seed):
+    "A larry of given shape whose fraction `density` of values are not NaN."
+    rs = np.random.RandomState(seed)
+    x = rs.rand(*shape)
+    x[rs.rand(*shape) > density] = nan
+    return larry(x)
+
+
+class Test_sparse(unittest.TestCase):
+    "Test SparseLarry."
+
+    def setUp(self):
+        self.a = sparse_larry((4, 5, 3), 0.3, 1)
+        self.b = sparse_larry((4, 5, 3), 0.5, 2).morph([3, 1, 0, 7], 0)
+        self.sa = SparseLarry.fromlarry(self.a)
+        self.sb = SparseLarry.fromlarry(self.b)
+
+    def test_sparse_1(self):
+        "sparse_conversion"
+        ale(self.sa.tolarry(), self.a)
+        self.assert_(self.sa.nnz == np.isfinite(self.a.x).sum(), 'nnz')
+        self.assert_(self.sa.shape == self.a.shape, 'shape')
+        slar = SparseLarry([1, 2], [1, 2], [['a', 'b'], ['c', 'd']])
+        desired = larry([[nan, 1], [2, nan]], [['a', 'b'], ['c', 'd']])
+        ale(slar.tolarry(), desired)
+        self.assertRaises(ValueError, SparseLarry, [1, 2], [2, 1], [[0, 1]])
+        self.assertRaises(IndexError, SparseLarry, [1], [2], [[0, 1]])
+
+    def test_sparse_2(self):
+        "sparse_binary"
+        a, b, sa, sb = self.a, self.b, self.sa, self.sb
+        ale((sa + sb).tolarry(), a + b)
+        ale((sa - sb).tolarry(), a - b)
+        ale((sa * sb).tolarry(), a * b)
+        ale((sa / sb).tolarry(), a / b)
+        ale((sa + b).tolarry(), a + b)
+        ale((2 - sa).tolarry(), 2 - a)
+        ale((2 / sa).tolarry(), 2 / a)
+        ale((-sa).tolarry(), -a)
+        ale((sa ** 2).tolarry(), a ** 2)
+
+    def test_sparse_3(self):
+        "sparse_reduce"
+        a, sa = self.a, self.sa
+        for func in ('sum', 'mean', 'std', 'var', 'min', 'max'):
+            for axis in (0, 1, 2, -1):
+                actual = getattr(sa, func)(axis).tolarry()
+                desired = getattr(a, func)(axis)
+                ale(actual, desired, func)
+            actual = getattr(sa, func)()
+            desired = getattr(a, func)()
+            self.assertAlmostEqual(actual, desired)
+        self.assert_(sa.count() == sa.nnz, 'count')
+        slar = SparseLarry([], [], [[0, 1]])
+        self.assert_(np.isnan(slar.sum()), 'sum of no values')
+
+    def test_sparse_4(self):
+        "sparse_alignment"
+        a, b, sa, sb = self.a, self.b, self.sa, self.sb
+        ale(sa.morph([2, 9, 0], 1).tolarry(), a.morph([2, 9, 0], 1))
+        for join in ('inner', 'outer', 'left', 'right'):
+            s1, s2 = sa.align(sb, join)
+            d1, d2 = la.align(a, b, join)
+            ale(s1.tolarry(), d1, join)
+            ale(s2.tolarry(), d2, join)
+
+    def test_sparse_5(self):
+        "sparse_merge"
+        lar1 = sparse_larry((3, 2), 1, 3)
+        lar2 = larry([[1.0, 2.0]], [[5], [0, 1]])
+        slar1 = SparseLarry.fromlarry(lar1)
+        ale(slar1.merge(SparseLarry.fromlarry(lar2)).tolarry(),
+            lar1.merge(lar2))
+        self.assertRaises(ValueError, slar1.merge, lar1)
+        ale(slar1.merge(lar1 + 1, update=True).tolarry(), lar1 + 1)
+
+    def test_sparse_6(self):
+        "sparse_lix"
+        lar = self.a.copy()
+        lar.label = [['a', 'b', 'c', 'd'], ['e', 'f', 'g', 'h', 'i'],
+                     [1, 2, 3]]
+        slar = SparseLarry.fromlarry(lar)
+        indices = [(['b', 'a'],), (['a'],), (slice(['b'], ['d']), ['e', 'i']),
+                   (slice(None), ['g']), (1, slice(None), [3])]
+        for index in indices:
+            ale(slar.lix[index].tolarry(), lar.lix[index], str(index))
+        desired = lar.lix[['a'], ['e'], [1]]
+        actual = slar.lix[['a'], ['e'], [1]]
+        self.assert_(actual == desired or
+                     (np.isnan(actual) and np.isnan(desired)), 'lix scalar')
@@ -0,0 +1,123 @@
+"Unit tests of multithreaded larry math."
+
+import os
+import time
+import signal
+import unittest
+import threading
+
+import numpy as np
+nan = np.nan
+
+import la
+from la import larry
+from la.util.testing import assert_larry_equal as ale
+
+
+class Test_threads(unittest.TestCase):
+    "Test la.set_num_threads()"
+
+    def setUp(self):
+        x = np.random.rand(300, 400)
+        x[x < 0.1] = nan
+        self.lar = larry(x)
+        self.lar2 = larry(np.random.rand(300, 400) + 1)
+
+    def tearDown(self):
+        la.set_num_threads(1)
+
+    def check(self, func):
+        la.set_num_threads(1)
+        desired = func()
+        for n in (2, 3, 7):
+            la.set_num_threads(n)
+            actual = func()
+            msg = "%d threads gave a different result" % n
+            ale(actual, desired, msg)
+
+    def test_threads_1(self):
+        "threads_elementwise"
+        lar, lar2 = self.lar, self.lar2
+        self.check(lambda: lar.log())
+        self.check(lambda: lar.sqrt())
+        self.check(lambda: lar.abs())
+        self.check(lambda: lar + lar2)
+        self.check(lambda: lar / lar2[::-1])
+        self.check(lambda: lar * 2.0)
+        self.check(lambda: la.binaryop(np.maximum, lar, lar2))
+        y = lar.copy()
+        y += lar2
+        la.set_num_threads(4)
+        z = lar.copy()
+        z += lar2
+        ale(z, y, "in-place add failed")
+
+    def test_threads_2(self):
+        "threads_alongaxis"
+        lar = self.lar
+        for axis in (0, 1):
+            self.check(lambda: lar.sum(axis))
+            self.check(lambda: lar.std(axis, ddof=1))
+            self.check(lambda: lar.ranking(axis))
+            self.check(lambda: lar.zscore(axis))
+            self.check(lambda: lar.demean(axis))
+            self.check(lambda: lar.move_sum(3, axis))
+            self.check(lambda: lar.move_ranking(3, axis))
+        self.check(lambda: lar.sum())
+        self.check(lambda: lar.demean())
+
+    def test_threads_3(self):
+        "threads_num_threads"
+        la.set_num_threads(3)
+        self.assert_(la.get_num_threads() == 3, 'number of threads')
+        la.set_num_threads(1)
+        self.assert_(la.get_num_threads() == 1, 'number of threads')
+        self.assertRaises(ValueError, la.set_num_threads, 0)
+
+    def test_threads_4(self):
+        "threads_fork"
+        lar, lar2 = self.lar, self.lar2
+        la.set_num_threads(2)
+        desired = lar + lar2
+        pid = os.fork()
+        if pid == 0:
+            # Child: the parent's pool threads do not exist here
+            code = 1
+            try:
+                ale(lar + lar2, desired)
+                code = 0
+            finally:
+                os._exit(code)
+        status = None
+        for i in range(300):
+            wpid, status = os.waitpid(pid, os.WNOHANG)
+            if wpid != 0:
+                break
+            time.sleep(0.1)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.fail("larry math hung in a forked child")
+        self.assert_(status == 0, "larry math failed in a forked child")
+
+    def test_threads_5(self):
+        "threads_replace_pool"
+        lar, lar2 = self.lar, self.lar2
+        la.set_num_threads(1)
+        desired = lar + lar2
+        errors = []
+        def work():
+            try:
+                for i in range(20):
+                    ale(lar + lar2, desired, "threaded add failed")
+            except Exception, e:
+                errors.append(e)
+        threads = [threading.Thread(target=work) for i in range(3)]
+        for t in threads:
+            t.start()
+        for n in (2, 3, 1, 4, 2, 1):
+            la.set_num_threads(n)
+            time.sleep(0.01)
+        for t in threads:
+            t.join()
+        self.assert_(not errors, str(errors))
@@ -0,0 +1,222 @@
+"Blocked, multithreaded execution of array functions"
+
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+__all__ = ['set_num_threads', 'get_num_threads']
+
+# Arrays with fewer elements than this are not worth splitting into blocks
+_MINSIZE = 65536
+
+_num_threads = 1
+_pool = None
+_lock = threading.Lock()
+# Number of calls that are running blocks on each pool; a pool replaced by
+# set_num_threads is closed when its last call is done
+_inuse = {}
+# Process that owns _pool and _lock; a forked child makes its own
+_pid = os.getpid()
+
+
+def set_num_threads(n):
+    """
+    Set the number of threads used by larry math.
+
+    By default (n=1) all larry math runs in the calling thread. With n > 1,
+    elementwise operations (the unary methods such as log and sqrt, the
+    arithmetic operators and la.binaryop), reductions along an axis (sum,
+    mean, std, ...), ranking, zscore, demean and the move_* methods split
+    large arrays into n blocks along an axis that is not being reduced (or
+    moved along) and process the blocks on a pool of n threads. Most Numpy
+    ufuncs release the GIL so the blocks run concurrently. Results do not
+    depend on the number of threads.
+
+    Parameters
+    ----------
+    n : int
+        Number of threads; 1 turns multithreading off.
+
+    See Also
+    --------
+    la.get_num_threads: Number of threads used by larry math.
+
+    Examples
+    --------
+    >>> la.set_num_threads(4)
+    >>> la.get_num_threads()
+    4
+    >>> la.set_num_threads(1)
+
+    """
+    global _num_threads, _pool
+    if not isinstance(n, (int, long)) or n < 1:
+        raise ValueError, 'n must be a positive integer.'
+    _checkfork()
+    with _lock:
+        if _pool is not None and _pool not in _inuse:
+            _pool.close()
+        _pool = None
+        _num_threads = n
+
+def get_num_threads():
+    """
+    Number of threads used by larry math.
+
+    See Also
+    --------
+    la.set_num_threads: Set the number of threads used by larry math.
+
+    """
+    return _num_threads
+
+def elementwise(func, arrays, out=None):
+    """
+    func(*arrays, out=out), computed in blocks of rows on the thread pool.
+
+    `func` is a ufunc; `arrays` are arrays of the same shape or scalars. If
+    `out` is None a new array is returned.
+
+    """
+    shape = None
+    for a in arrays:
+        if isinstance(a, np.ndarray):
+            if shape is None:
+                shape = a.shape
+            elif a.shape != shape:
+                # Broadcasting; not worth blocking
+                shape = ()
+                break
+    pool, nthreads = _getpool(shape)
+    if pool is None:
+        if out is None:
+            return func(*arrays)
+        return func(*arrays, out=out)
+    try:
+        return _elementwise(pool, nthreads, func, arrays, out, shape)
+    finally:
+        _release(pool)
+
+def _elementwise(pool, nthreads, func, arrays, out, shape):
+    "elementwise on the given pool."
+    if out is None:
+        dtype = func(*[_empty(a) for a in arrays]).dtype
+        out = np.empty(shape, dtype)
+    bax = np.argmax(shape)
+    def run(block):
+        index = [slice(None)] * len(shape)
+        index[bax] = block
+        index = tuple(index)
+        args = [a[index] if isinstance(a, np.ndarray) else a for a in arrays]
+        func(*(args + [out[index]]))
+    pool.map(run, _blocks(shape[bax], nthreads))
+    return out
+
+def alongaxis(func, x, axis, *args, **kwargs):
+    """
+    func(x, *args, axis=axis, **kwargs), computed in blocks on the thread pool.
+
+    `func` works independently along `axis`: it either reduces `axis` or
+    returns an array of the same shape as `x`. The blocks are taken along
+    the longest of the other axes.
+
+    """
+    pool = None
+    if axis is not None and x.ndim > 1:
+        pool, nthreads = _getpool(x.shape)
+    if pool is None:
+        return func(x, *args, axis=axis, **kwargs)
+    try:
+        return _alongaxis(pool, nthreads, func, x, axis, args, kwargs)
+    finally:
+        _release(pool)
+
+def _alongaxis(pool, nthreads, func, x, axis, args, kwargs):
+    "alongaxis on the given pool."
+    if axis < 0:
+        axis += x.ndim
+    bax = max([ax for ax in range(x.ndim) if ax != axis],
+              key=lambda ax: x.shape[ax])
+    # The dtype and shape of the output come from a block of length one
+    index = [slice(None)] * x.ndim
+    index[bax] = slice(0, 1)
+    probe = func(x[tuple(index)], *args, axis=axis, **kwargs)
+    shape = list(x.shape)
+    oax = bax
+    if probe.ndim != x.ndim:
+        shape.pop(axis)
+        if bax > axis:
+            oax -= 1
+    out = np.empty(shape, probe.dtype)
+    def run(block):
+        index = [slice(None)] * x.ndim
+        index[bax] = block
+        oindex = [slice(None)] * out.ndim
+        oindex[oax] = block
+        out[tuple(oindex)] = func(x[tuple(index)], *args, axis=axis, **kwargs)
+    pool.map(run, _blocks(x.shape[bax], nthreads))
+    return out
+
+def _checkfork():
+    "Drop the pool and lock inherited from the parent of a forked process."
+    global _pool, _lock, _inuse, _pid
+    pid = os.getpid()
+    if pid != _pid:
+        # The threads of the parent's pool do not exist in the child, and
+        # the lock may have been held by a thread of the parent
+        _pool = None
+        _lock = threading.Lock()
+        _inuse = {}
+        _pid = pid
+
+def _getpool(shape):
+    """
+    (pool, number of threads) to split an array of the given shape into
+    blocks; (None, 1) if the array should not be split.
+    
+    The pool is made on first use in each process, so a forked child gets
+    its own. The pool and the number of threads are read together under
+    the lock, so a concurrent set_num_threads cannot change them halfway.
+    A pool that is returned must be given back with _release.
+    
+    """
+    global _pool
+    if _num_threads == 1 or not shape:
+        return None, 1
+    _checkfork()
+    with _lock:
+        n = _num_threads
+        if n == 1:
+            return None, 1
+        size = np.prod(shape, dtype=np.int64)
+        if size < _MINSIZE or max(shape) < n:
+            return None, 1
+        if _pool is None:
+            _pool = ThreadPool(n)
+        _inuse[_pool] = _inuse.get(_pool, 0) + 1
+        return _pool, n
+
+def _release(pool):
+    "Give back a pool from _getpool; close it if it was replaced and unused."
+    with _lock:
+        if pool not in _inuse:
+            # Made by the parent of this (forked) process
+            return
+        _inuse[pool] -= 1
+        if _inuse[pool] == 0:
+            del _inuse[pool]
+            if pool is not _pool:
+                pool.close()
+
+def _blocks(n, nthreads):
+    "Split range(n) into one slice per thread."
+    step = -(-n // nthreads)
+    return [slice(i, min(i + step, n)) for i in xrange(0, n, step)]
+
+def _empty(a):
+    "Empty array of the dtype of `a` (or `a` itself if a scalar)."
+    if isinstance(a, np.ndarray):
+        return np.empty((0,) * a.ndim, a.dtype)
+    return a
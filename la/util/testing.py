@@ -55,6 +55,9 @@ def assert_larry_equal(actual, desired, msg='', dtype=True, original=None,
     -----           
     If either `actual` or `desired` has a dtype that is inexact, such as
     float, then almost-equal is asserted; otherwise, equal is asserted.
+    The validity masks of two larrys (see `valid` in larry.__init__) must
+    also be equal, in which case only the valid elements of the data are
+    compared; a larry without a mask only equals a larry without one.
             
     Examples
     --------    
@@ -154,19 +157,27 @@ def assert_larry_equal(actual, desired, msg='', dtype=True, original=None,
             fail.append(heading('LABEL') + str(err))       
 
         # Data array, x
+        ax = actual.x
+        dx = desired.x
+        if actual.valid is not None and desired.valid is not None:
+            if (ax.shape == dx.shape and
+                (actual.valid == desired.valid).all()):
+                # Invalid elements can hold any value
+                ax = ax[actual.valid]
+                dx = dx[desired.valid]
         try:
             # Does one larrys have inexact dtype?
-            if (issubclass(actual.x.dtype.type, np.inexact) or
-                issubclass(desired.x.dtype.type, np.inexact)): 
+            if (issubclass(ax.dtype.type, np.inexact) or
+                issubclass(dx.dtype.type, np.inexact)): 
                 # Yes, so check for almost equal
                 try:
-                    assert_almost_equal(actual.x, desired.x, decimal=13)
+                    assert_almost_equal(ax, dx, decimal=13)
                 except TypeError:
                     # One of the larrys probably has a weird type like str
-                    assert_equal(actual.x, desired.x)     
+                    assert_equal(ax, dx)     
             else:
                 # No, so check for exactly equal
-                assert_equal(actual.x, desired.x)     
+                assert_equal(ax, dx)     
         except AssertionError, err:
             fail.append(heading('X DATA ARRAY') + str(err))
          
@@ -177,6 +188,13 @@ def assert_larry_equal(actual, desired, msg='', dtype=True, original=None,
             except AssertionError, err:
                 fail.append(heading('DTYPE') + str(err))            
 
+        # Validity mask
+        if actual.valid is not None or desired.valid is not None:
+            try:
+                assert_equal(actual.valid, desired.valid)
+            except AssertionError, err:
+                fail.append(heading('VALIDITY MASK') + str(err))
+
         # If original is not None, assert copies or views
         if not original is None:   
             if iscopy:
@@ -0,0 +1,33 @@
+
+import csv
+import tempfile
+
+import la
+
+from autotimeit import autotimeit
+
+def fromcsv_tuples(filename, delimiter=','):
+    "The la 0.5 fromcsv: read all rows into tuples, then call fromtuples."
+    fid = open(filename, 'r')
+    reader = csv.reader(fid, delimiter=delimiter)
+    data = [row for row in reader]
+    fid.close()
+    return la.larry.fromtuples(data)
+
+def bench(shape=(1000, 250), verbose=True):
+    "Time larry.fromcsv versus reading all rows and calling fromtuples."
+    filename = tempfile.mktemp(suffix='.csv', prefix='la_csv_bench')
+    la.rand(*shape).tocsv(filename)
+    setup = "import la; from csv_bench import fromcsv_tuples; "
+    setup += "filename = '%s'" % filename
+    statements = ['fromcsv_tuples(filename)',
+                  'la.larry.fromcsv(filename)']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results
@@ -0,0 +1,25 @@
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(n=500, shape=(1000, 100), verbose=True):
+    """
+    Time an accumulation loop with + versus +=.
+
+    The loop adds `n` aligned larrys of shape `shape` to a total.
+
+    """
+    setup = "import la; n = %d; shape = %s; " % (n, str(shape))
+    setup += "lars = [la.rand(*shape) for i in range(n)]"
+    statements = ['y = la.zeros(shape)\nfor lar in lars: y = y + lar',
+                  'y = la.zeros(shape)\nfor lar in lars: y += lar']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt.replace('\n', '; ')
+            print '\t' + str(t)
+    return results
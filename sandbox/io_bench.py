@@ -0,0 +1,27 @@
+
+import tempfile
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(nlarrys=60, shape=(100, 100), verbose=True):
+    "Time loading many larrys one by one versus la.load_many."
+    filename = tempfile.mktemp(suffix='.hdf5', prefix='la_io_bench')
+    lars = {}
+    for i in range(nlarrys):
+        lars['x%d' % i] = la.rand(*shape)
+    la.save_many(filename, lars)
+    setup = "import la; filename = '%s'; keys = %s" % (filename, lars.keys())
+    statements = ['[la.load(filename, key) for key in keys]',
+                  'la.load_many(filename, keys)',
+                  'la.load_many(filename, keys, mmap=True)']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results
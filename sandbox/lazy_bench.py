@@ -0,0 +1,27 @@
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(shape=(4000, 4000), verbose=True):
+    """
+    Time eager versus lazy evaluation of (a - b) / c * d + a.
+
+    Use a shape that makes each operand several GB to see the effect of
+    the full-size temporaries of eager evaluation on memory.
+
+    """
+    setup = "import la; shape = %s; " % str(shape)
+    setup += "a = la.rand(*shape); b = la.rand(*shape); "
+    setup += "c = la.rand(*shape); d = la.rand(*shape)"
+    statements = ['(a - b) / c * d + a',
+                  '((la.lazy(a) - b) / c * d + a).compute()']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results
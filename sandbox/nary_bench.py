@@ -0,0 +1,31 @@
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(k=30, shape=(1000, 500), verbose=True):
+    """
+    Time summing `k` partially overlapping larrys with an outer join.
+
+    The row labels of each larry are shifted by 100 from those of the
+    previous larry, so every chained outer join regrows the label of the
+    partial sum.
+
+    """
+    setup = "import numpy as np; import la; k = %d; shape = %s; " % (k,
+                                                                   str(shape))
+    setup += "lars = [la.larry(np.random.rand(*shape), [range(100 * i, "
+    setup += "100 * i + shape[0]), range(shape[1])]) for i in range(k)]"
+    statements = ['y = lars[0]\n'
+                  'for lar in lars[1:]: y = la.add(y, lar, join="outer")',
+                  'la.nary(np.add, lars, join="outer")',
+                  'la.sum_larrys(lars, join="outer")']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt.replace('\n', '; ')
+            print '\t' + str(t)
+    return results
@@ -0,0 +1,35 @@
+
+import numpy as np
+
+import la
+
+from autotimeit import autotimeit
+
+def model(a):
+    "A per-slice function: the maximum drawdown of a price series."
+    return (np.maximum.accumulate(a) - a).max()
+
+def bench(processes=4, shape=(2000, 2000), verbose=True):
+    """
+    Time larry.apply_parallel versus pickling the rows to a process pool.
+
+    The per-row function is cheap so the time of the process pool is
+    dominated by interprocess communication.
+
+    """
+    setup = "import multiprocessing; import la; "
+    setup += "from parallel_bench import model; "
+    setup += "lar = la.rand(*%s); " % str(shape)
+    setup += "pool = multiprocessing.Pool(%d)" % processes
+    statements = ['lar.apply_parallel(model, processes=1)',
+                  'lar.apply_parallel(model, processes=%d)' % processes,
+                  'la.larry(pool.map(model, lar.x), [lar.label[0]])']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results
@@ -0,0 +1,39 @@
+
+import numpy as np
+
+import la
+
+from autotimeit import autotimeit
+
+def fx(shape, density):
+    "Panel of given shape whose fraction `density` of values are not NaN."
+    lar = la.rand(*shape)
+    lar.x[np.random.rand(*shape) > density] = np.nan
+    return lar
+
+def bench(shape=(200, 20, 500), densities=(0.01, 0.05, 0.2, 0.5),
+          verbose=True):
+    "Memory use and speed of SparseLarry versus larry at several densities."
+    statements = ['x.sum(axis=2)', 'x + y', 'x.morph(idx, 0)']
+    results = []
+    for density in densities:
+        setup = "import la; from sparse_bench import fx; "
+        setup += "x = fx(%s, %s); y = fx(%s, %s); " % (shape, density,
+                                                        shape, density)
+        setup += "idx = range(%d)[::-1]; " % shape[0]
+        ssetup = setup + "x = la.SparseLarry.fromlarry(x); "
+        ssetup += "y = la.SparseLarry.fromlarry(y)"
+        x = fx(shape, density)
+        sx = la.SparseLarry.fromlarry(x)
+        if verbose:
+            print
+            print 'density %g' % density
+            print '\tmemory (MB)  larry %8.2f  sparse %8.2f' % (
+                                      x.x.nbytes / 1e6, sx.nbytes / 1e6)
+        for stmt in statements:
+            t1 = autotimeit(stmt, setup)
+            t2 = autotimeit(stmt, ssetup)
+            results.append((density, stmt, t1, t2))
+            if verbose:
+                print '\t%-16s larry %8.5f  sparse %8.5f' % (stmt, t1, t2)
+    return results
@@ -0,0 +1,25 @@
+
+import tempfile
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(shape=(500, 800), verbose=True):
+    "Time larry.tofile and larry.tocsv with and without a float format."
+    filename = tempfile.mktemp(suffix='.csv', prefix='la_text_bench')
+    setup = "import la; lar = la.rand%s; " % str(shape)
+    setup += "filename = '%s'" % filename
+    statements = ['lar.tofile(filename)',
+                  "lar.tofile(filename, fmt='%.6g')",
+                  'lar.tocsv(filename)',
+                  "lar.tocsv(filename, fmt='%.6g')"]
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results
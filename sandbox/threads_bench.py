@@ -0,0 +1,30 @@
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(maxthreads=4, shape=(5000, 8000), verbose=True):
+    """
+    Time larry math with 1 to `maxthreads` threads.
+
+    See la.set_num_threads.
+
+    """
+    setup = "import la; shape = %s; " % str(shape)
+    setup += "a = la.rand(*shape); b = la.rand(*shape)"
+    statements = ['a.log()', 'a * b', 'a.sum(axis=0)', 'a.std(axis=1)',
+                  'a.zscore(axis=1)', 'a.ranking(axis=0)',
+                  'a.move_mean(10, axis=1)']
+    results = []
+    for stmt in statements:
+        if verbose:
+            print
+            print '\t' + stmt
+        for n in range(1, maxthreads + 1):
+            la.set_num_threads(n)
+            t = autotimeit(stmt, setup)
+            results.append((stmt, n, t))
+            if verbose:
+                print '\t%2d threads  %s' % (n, str(t))
+    la.set_num_threads(1)
+    return results
@@ -0,0 +1,29 @@
+
+import la
+
+from autotimeit import autotimeit
+
+def bench(shape=(200, 500, 250), verbose=True):
+    """
+    Time lag, vacuum and cut_missing on a 3d panel with missing values.
+
+    The panel (e.g. dates by stocks by fields) has about 10% NaNs, one
+    all-NaN date and one all-NaN stock so that vacuum has slices to cut.
+
+    """
+    setup = "import la; import numpy as np; shape = %s; " % str(shape)
+    setup += "a = la.rand(*shape); "
+    setup += "a[np.random.rand(*shape) < 0.1] = np.nan; "
+    setup += "a[3] = np.nan; a[:, 7] = np.nan"
+    statements = ['a.lag(1, axis=0)', 'a.lag(1, axis=-1)', 'a.vacuum()',
+                  'a.vacuum(axis=0)', 'a.cut_missing(0.9)',
+                  'a.cut_missing(0.9, axis=1)']
+    results = []
+    for stmt in statements:
+        t = autotimeit(stmt, setup)
+        results.append((stmt, t))
+        if verbose:
+            print
+            print '\t' + stmt
+            print '\t' + str(t)
+    return results